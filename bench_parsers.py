@@ -0,0 +1,245 @@
+# bench_parsers.py
+# Parser benchmark: every tier of every field (run_benchmark.FIELD_RULES) against
+# the per-bank fixture dumps in benchmarks/fixtures, plus synthetic copies of
+# them scaled 10x / 100x. Field values are checked against benchmarks/golden.json
+# first, so a speedup that changes a result fails the run.
+#
+#   python bench_parsers.py                  # golden check + timings at 1x, 10x, 100x
+#   python bench_parsers.py --scales 1,10    # skip the slow pass
+#   python bench_parsers.py --record         # copy ./fees_*.txt into the fixtures, rewrite golden.json
+#   python bench_parsers.py --update-golden  # accept the current parser output as golden
+#
+# run_benchmark.parse_fee / compare_banks are checked against FEE_CASES and
+# RANK_CASES on every run as well.
+
+import argparse
+import json
+import math
+import re
+import shutil
+import sys
+import tempfile
+import time
+from decimal import Decimal
+from pathlib import Path
+
+import run_benchmark as rb
+
+FIXTURES = Path(__file__).resolve().parent / "benchmarks" / "fixtures"
+GOLDEN = Path(__file__).resolve().parent / "benchmarks" / "golden.json"
+
+ENTRY_POINTS = {
+    "parse_dump": lambda path, bank: rb.parse_dump(path),
+    "parse_dump_with_fallback": lambda path, bank: rb.parse_dump_with_fallback(path),
+    "parse_dump_ziraat": lambda path, bank: rb.parse_dump_ziraat(path),
+    "parse_bank_dump": rb.parse_bank_dump,
+}
+
+# flag a field/tier whose time grows faster than n^SUPERLINEAR with dump size,
+# once it costs at least NOISE_MS at the largest scale
+SUPERLINEAR = 1.3
+NOISE_MS = 1.0
+
+def fixture_path(bank_label):
+    return FIXTURES / f"fees_{rb.safe_name(bank_label)}.txt"
+
+def fixtures():
+    out = {}
+    for bank_label in rb.list_of_banks:
+        path = fixture_path(bank_label)
+        if path.exists():
+            out[bank_label] = path
+        else:
+            print(f"[WARN] No fixture for {bank_label}: {path.name}")
+    return out
+
+def golden_values(bank_label, path):
+    return {name: fn(str(path), bank_label) for name, fn in ENTRY_POINTS.items()}
+
+def check_golden(paths):
+    if not GOLDEN.exists():
+        print(f"[WARN] {GOLDEN.name} missing; run with --update-golden")
+        return 1
+    golden = json.loads(GOLDEN.read_text(encoding="utf-8"))
+    failures = 0
+    for bank_label, path in paths.items():
+        got = golden_values(bank_label, path)
+        want = golden.get(bank_label, {})
+        for name in ENTRY_POINTS:
+            for field in rb.ROW_ORDER:
+                a, b = want.get(name, {}).get(field), got[name].get(field)
+                if a != b:
+                    failures += 1
+                    print(f"[FAIL] {bank_label} {name} {field}: expected {a!r}, got {b!r}")
+    if not failures:
+        print(f"[OK] Golden: {len(paths)} banks x {len(ENTRY_POINTS)} entry points match")
+    return failures
+
+# display string -> (shape, key, bands, minimum, maximum)
+FEE_CASES = {
+    "8,50 TL - 8,50 TL - 86,50 TL": ("bands/3", "34.50", ("8.50", "8.50", "86.50"), None, None),
+    "86,50 TL - 86,50 TL": ("bands/2", "86.50", ("86.50", "86.50"), None, None),
+    # a range: its ends are bounds, not two fees
+    "Diğer: 1.250,00 TL–5 TL": ("minimum", "1250.00", (), "1250.00", "5"),
+    "WU: 15,5 USD–150 USD; Diğer: 8,50 TL–5 TL": ("minimum", "8.50", (), "8.50", "5"),
+    # thresholds of the amount bands are not fees
+    "0-10.000 TL: 5 TL / 10.000+ TL: 12 TL": ("bands/2", "8.5", ("5", "12"), None, None),
+    "Hesaba: Asgari 3,25 TL | Azami 5 TL": ("minimum", "3.25", (), "3.25", "5"),
+    "%0,2 Asgari Tutar: 12,75 TL Azami Tutar: 12,75 TL": ("percent", "0.2", (), "12.75", "12.75"),
+    " Asgari Tutar:  Azami Tutar: ": (None, None, (), None, None),
+}
+
+# {bank: value} of one field -> (shape ranked, cheapest, priciest)
+RANK_CASES = [
+    # bands/3 is the common shape; the 2-band cell and the range are not ranked against it
+    ({"A": "8,50 TL - 8,50 TL - 86,50 TL", "B": "5 TL - 5 TL - 8,50 TL", "C": "49,50 TL - 8,50 TL - 8,50 TL",
+      "D": "86,50 TL - 86,50 TL", "E": "Diğer: 1.250,00 TL–5 TL"}, "bands/3", ["B"], ["A"]),
+    ({"A": "Diğer: 1.250,00 TL–5 TL", "B": "Diğer: 8,50 TL–5 TL", "C": "0-10.000 TL: 5 TL / 10.000+ TL: 12 TL"},
+     "minimum", ["B"], ["A"]),
+]
+
+def check_fee_numbers():
+    failures = 0
+    for text, (shape, key, bands, minimum, maximum) in FEE_CASES.items():
+        v = rb.parse_fee(text)
+        dec = lambda x: None if x is None else Decimal(x)
+        want = (shape, dec(key), tuple(Decimal(b) for b in bands), dec(minimum), dec(maximum))
+        got = (v.shape, v.key(), v.bands, v.minimum, v.maximum)
+        if got != want:
+            failures += 1
+            print(f"[FAIL] parse_fee({text!r}): expected {want}, got {got}")
+    for values, shape, cheapest, priciest in RANK_CASES:
+        st = rb.compare_banks({b: {"F": v} for b, v in values.items()}, fields=["F"]).get("F", {})
+        got = (st.get("shape"), st.get("cheapest"), st.get("priciest"))
+        if got != (shape, cheapest, priciest):
+            failures += 1
+            print(f"[FAIL] compare_banks({values!r}): expected {(shape, cheapest, priciest)}, got {got}")
+    if not failures:
+        print(f"[OK] Fee numbers: {len(FEE_CASES)} parse_fee and {len(RANK_CASES)} compare_banks cases match")
+    return failures
+
+def write_golden(paths):
+    golden = {bank_label: golden_values(bank_label, path) for bank_label, path in paths.items()}
+    GOLDEN.write_text(json.dumps(golden, ensure_ascii=False, indent=1, sort_keys=True) + "\n", encoding="utf-8")
+    print(f"[OK] Wrote {GOLDEN} ({len(golden)} banks)")
+
+def record():
+    FIXTURES.mkdir(parents=True, exist_ok=True)
+    for bank_label in rb.list_of_banks:
+        src = Path(f"fees_{rb.safe_name(bank_label)}.txt")
+        if src.exists():
+            shutil.copyfile(src, fixture_path(bank_label))
+            print(f"[OK] Recorded {src}")
+        else:
+            print(f"[WARN] Dump not found: {src} (keeping old fixture)")
+
+# ── synthetic dumps: the fixture body preceded by n-1 decoy copies with every
+# amount and rate blanked, so each heading/label anchor occurs n times and the
+# searches have to walk past them before reaching the real table
+_PRICE = re.compile(r"%\s*\d[\d.,]*|\d[\d.,]*(?:\s|\xa0)*(?:TRY|TL|USD)")
+
+def scaled(text, n):
+    if n <= 1:
+        return text
+    head, _, body = text.partition("\n")
+    decoy = _PRICE.sub("-", body)
+    return "\n".join([head] + [decoy] * (n - 1) + [body])
+
+def _best(fn, repeat):
+    best = math.inf
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t)
+    return best * 1000
+
+def time_tiers(bank_label, text, repeat):
+    """{(field, tier): ms} for every tier that applies to this bank, plus the text views."""
+    tiers = rb.tiers_for(bank_label)
+    out = {("(views)", "all"): _best(lambda: [rb._DumpText(text).view(t) for t in tiers], repeat)}
+    for field, compiled in rb._FIELDS.fields.items():
+        for tier, run in compiled:
+            if tier not in tiers:
+                continue
+            best = math.inf
+            for _ in range(repeat):
+                view = rb._DumpText(text).view(tier)
+                t = time.perf_counter()
+                run(view)
+                best = min(best, time.perf_counter() - t)
+            out[(field, tier)] = best * 1000
+    return out
+
+def time_entry_points(bank_label, text, repeat, tmp):
+    path = Path(tmp) / "dump.txt"
+    path.write_text(text, encoding="utf-8")
+    return {name: _best(lambda: fn(str(path), bank_label), repeat) for name, fn in ENTRY_POINTS.items()}
+
+def _add(total, key, ms):
+    total[key] = total.get(key, 0.0) + ms
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Parser benchmark with golden-value check")
+    ap.add_argument("--scales", default="1,10,100", help="comma-separated dump size multipliers")
+    ap.add_argument("--repeat", type=int, default=3, help="best of N timings")
+    ap.add_argument("--record", action="store_true", help="copy ./fees_*.txt into the fixtures first")
+    ap.add_argument("--update-golden", action="store_true", help="accept the current output as golden")
+    ap.add_argument("--strict", action="store_true", help="exit non-zero on super-linear scaling too")
+    args = ap.parse_args(argv)
+    scales = sorted({max(1, int(s)) for s in args.scales.split(",") if s.strip()})
+
+    if args.record:
+        record()
+    paths = fixtures()
+    if args.record or args.update_golden:
+        write_golden(paths)
+    failures = check_golden(paths) + check_fee_numbers()
+
+    per_field = {scale: {} for scale in scales}    # (field, tier) -> ms, summed over banks
+    per_tier = {scale: {} for scale in scales}
+    per_entry = {scale: {} for scale in scales}
+    with tempfile.TemporaryDirectory() as tmp:
+        for bank_label, path in paths.items():
+            text = rb._read_dump(path)
+            for scale in scales:
+                big = scaled(text, scale)
+                for key, ms in time_tiers(bank_label, big, args.repeat).items():
+                    _add(per_field[scale], key, ms)
+                    _add(per_tier[scale], key[1], ms)
+                for name, ms in time_entry_points(bank_label, big, args.repeat, tmp).items():
+                    _add(per_entry[scale], name, ms)
+
+    cols = "".join(f"{f'{s}x ms':>12}" for s in scales)
+    print(f"\n[BENCH] Entry points, all {len(paths)} banks\n{'':44}{cols}")
+    for name in ENTRY_POINTS:
+        print(f"  {name:42}" + "".join(f"{per_entry[s][name]:12.2f}" for s in scales))
+    print(f"\n[BENCH] Per tier\n{'':44}{cols}")
+    for tier in ("all",) + rb.TIERS:
+        label = "(text views)" if tier == "all" else tier
+        print(f"  {label:42}" + "".join(f"{per_tier[s].get(tier, 0.0):12.2f}" for s in scales))
+    print(f"\n[BENCH] Per field and tier\n{'':44}{cols}{'growth':>10}")
+
+    # growth is taken between the two largest scales: at 1x many searches hit
+    # near the top of the dump, which says nothing about the asymptotic cost
+    flagged = 0
+    lo, hi = scales[-2:] if len(scales) > 1 else (scales[0], scales[0])
+    for key in per_field[scales[0]]:
+        times = [per_field[s][key] for s in scales]
+        growth = ""
+        if hi > lo and per_field[lo][key] > 0:
+            exponent = math.log(max(times[-1], 1e-9) / per_field[lo][key]) / math.log(hi / lo)
+            growth = f"n^{exponent:.2f}"
+            if exponent > SUPERLINEAR and times[-1] >= NOISE_MS:
+                flagged += 1
+                growth += " !"
+        print(f"  {key[0][:32]:32} {key[1]:9}" + "".join(f"{t:12.3f}" for t in times) + f"{growth:>10}")
+
+    if flagged:
+        print(f"[WARN] {flagged} field/tier timings grow faster than n^{SUPERLINEAR} (marked !)")
+    if failures:
+        print(f"[FAIL] {failures} field values differ from {GOLDEN.name} or the fee cases")
+        return 1
+    return 2 if flagged and args.strict else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
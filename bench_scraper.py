@@ -0,0 +1,136 @@
+# bench_scraper.py
+# End-to-end scraper benchmark against the offline fixture server: serves the
+# dumps in benchmarks/fixtures, points run_benchmark at that server and scrapes
+# every fixture bank once per mode (CAPTURE_MODE x PANE_EXTRACT), reporting ms
+# per bank and per tab. Each scraped dump is compared with the fixture it was
+# served from, and its parsed values with benchmarks/golden.json.
+#
+#   python bench_scraper.py
+#   python bench_scraper.py --modes dom/browser,network/python --latency-ms 120 --jitter-ms 60
+#   python bench_scraper.py --lazy-tabs --workers 1
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import fixture_server
+import run_benchmark as rb
+
+GOLDEN = Path(__file__).resolve().parent / "benchmarks" / "golden.json"
+MODES = ("dom/browser", "dom/python", "network/browser", "network/python")
+
+def run_mode(mode, banks, base_url, workers):
+    """Scrape banks in a scratch folder; returns (wall ms, timings, {bank: dump text})."""
+    rb.CAPTURE_MODE, rb.PANE_EXTRACT = mode.split("/")
+    rb.URL = base_url.rstrip("/") + fixture_server.LIST_PATH
+    rb.USE_CACHE = False    # every mode starts cold
+    rb.ROWS_DB = ""
+    timings = []
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            t = time.perf_counter()
+            asyncio.run(rb.scrape_banks(banks, workers=workers, timings=timings))
+            wall = (time.perf_counter() - t) * 1000
+            dumps = {}
+            for bank_label in banks:
+                path = Path(f"fees_{rb.safe_name(bank_label)}.txt")
+                if path.exists():
+                    dumps[bank_label] = (rb._read_dump(path), rb.parse_bank_dump(str(path), bank_label))
+        finally:
+            os.chdir(cwd)
+    return wall, timings, dumps
+
+def check(mode, banks, dumps, golden):
+    failures = 0
+    for bank_label in banks:
+        if bank_label not in dumps:
+            failures += 1
+            print(f"[FAIL] {mode} {bank_label}: no dump written")
+            continue
+        text, values = dumps[bank_label]
+        served = rb._read_dump(fixture_server.FIXTURES / f"fees_{rb.safe_name(bank_label)}.txt")
+        if text != served:
+            print(f"[WARN] {mode} {bank_label}: dump differs from the fixture it was served from")
+        want = golden.get(bank_label, {}).get("parse_bank_dump", {})
+        for field in rb.ROW_ORDER:
+            if want.get(field) != values.get(field):
+                failures += 1
+                print(f"[FAIL] {mode} {bank_label} {field}: expected {want.get(field)!r}, got {values.get(field)!r}")
+    return failures
+
+def report(results, banks):
+    modes = list(results)
+    cols = "".join(f"{m:>17}" for m in modes)
+
+    print(f"\n[BENCH] Wall time, {len(banks)} banks\n{'':42}{cols}")
+    print(f"  {'(all)':40}" + "".join(f"{results[m][0]:17.0f}" for m in modes))
+
+    def cell(m, bank_label, tab):
+        hits = [t for t in results[m][1] if t["bank"] == bank_label and t["tab"] == tab]
+        if not hits:
+            return f"{'-':>17}"
+        via = " n" if hits[0]["via"] == "network" else "  "
+        return f"{hits[0]['ms']:15.0f}{via}"
+
+    print(f"\n[BENCH] Per bank (ms)\n{'':42}{cols}")
+    for bank_label in banks:
+        print(f"  {bank_label[:40]:40}" + "".join(cell(m, bank_label, None) for m in modes))
+
+    print(f"\n[BENCH] Per tab (ms; n = taken from a network payload)\n{'':42}{cols}")
+    for bank_label in banks:
+        tabs = []
+        for m in modes:
+            for t in results[m][1]:
+                if t["bank"] == bank_label and t["tab"] is not None and t["tab"] not in tabs:
+                    tabs.append(t["tab"])
+        for tab in tabs:
+            print(f"  {bank_label[:24]:24} {tab[:15]:15}" + "".join(cell(m, bank_label, tab) for m in modes))
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="End-to-end scraper benchmark on the offline fixture server")
+    ap.add_argument("--modes", default=",".join(MODES), help="comma-separated CAPTURE_MODE/PANE_EXTRACT pairs")
+    ap.add_argument("--workers", type=int, default=rb.SCRAPE_WORKERS)
+    ap.add_argument("--latency-ms", type=float, default=50)
+    ap.add_argument("--jitter-ms", type=float, default=25)
+    ap.add_argument("--lazy-tabs", action="store_true", help="server loads every tab but the first on click")
+    args = ap.parse_args(argv)
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    for m in modes:
+        if m not in MODES:
+            ap.error(f"unknown mode {m!r}; choose from {', '.join(MODES)}")
+
+    site = fixture_server.FixtureSite(lazy_tabs=args.lazy_tabs)
+    banks = [b for b in rb.list_of_banks if b in site.banks]
+    if not banks:
+        print(f"[FAIL] No fixtures in {fixture_server.FIXTURES}")
+        return 1
+    golden = json.loads(GOLDEN.read_text(encoding="utf-8")) if GOLDEN.exists() else {}
+    server, base_url = fixture_server.start_in_thread(site, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms)
+    print(f"[OK] Fixture server at {base_url} ({args.latency_ms:g} ms + 0..{args.jitter_ms:g} ms per request)")
+
+    results, failures = {}, 0
+    try:
+        for mode in modes:
+            print(f"\n[BENCH] {mode}")
+            wall, timings, dumps = run_mode(mode, banks, base_url, args.workers)
+            results[mode] = (wall, timings)
+            failures += check(mode, banks, dumps, golden)
+    finally:
+        server.shutdown()
+
+    report(results, banks)
+    if failures:
+        print(f"[FAIL] {failures} scraped values differ from {GOLDEN.name}")
+        return 1
+    print(f"[OK] All modes reproduce {GOLDEN.name}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
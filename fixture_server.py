@@ -0,0 +1,233 @@
+# fixture_server.py
+# Offline stand-in for the fee site. Serves the per-bank dumps in
+# benchmarks/fixtures back as the page the scraper drives: #bankList, nav tabs,
+# .table_item/.card panes behind collapses, and a select in the last tab, all
+# loaded through fetch() like the live site. Every response can be delayed by
+# a fixed latency plus random jitter.
+#
+#   python fixture_server.py --port 8765 --latency-ms 80 --jitter-ms 40
+#   BASE_URL=http://127.0.0.1:8765 python run_benchmark.py
+#
+# Stdlib only (run_benchmark imports nothing else up front), so it runs
+# anywhere the scraper does.
+
+import argparse
+import html
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+from run_benchmark import read_dump_tables as read_dump   # the inverse of run_benchmark._write_tab
+
+FIXTURES = Path(__file__).resolve().parent / "benchmarks" / "fixtures"
+LIST_PATH = "/bireysel-ucret/liste"
+
+# ── tabs/tables -> markup
+def _cells(tag, cells):
+    return "".join(f"<{tag}>{html.escape(c)}</{tag}>" for c in cells)
+
+def _table_html(t):
+    head = f"<thead><tr>{_cells('th', t['headers'])}</tr></thead>" if t["headers"] else ""
+    body = "".join(f"<tr>{_cells('td', row)}</tr>" for row in t["rows"])
+    return f'<table class="table">{head}<tbody>{body}</tbody></table>'
+
+def pane_html(tab, with_select=False):
+    """
+    One tab pane. Tables sharing a section sit in one .table_item under its
+    heading; TABLE n > 1 joins the previous card, as the scraper numbered it.
+    The first card is open, the rest start collapsed.
+    """
+    pane_id = tab["href"].lstrip("#")
+    items, cards = [], 0
+    for t in tab["tables"]:
+        if t["section"] is None:    # a dump's fallback table (no .card markup)
+            items.append(["", [[_table_html(t)]], True])
+            continue
+        section = "" if t["section"] == "(no section title)" else t["section"]
+        if not items or items[-1][0] != section or items[-1][2]:
+            items.append([section, [], False])
+        if t["n"] > 1 and items[-1][1]:
+            items[-1][1][-1].append(_table_html(t))
+        else:
+            items[-1][1].append([t["sub_heading"], _table_html(t)])
+
+    out = [f'<div class="tab-pane" id="{html.escape(pane_id)}" role="tabpanel">']
+    for section, card_list, bare in items:
+        if bare:
+            out.append(card_list[0][0])
+            continue
+        out.append('<div class="table_item">')
+        if section:
+            out.append(f"<h4>{html.escape(section)}</h4>")
+        for sub_heading, *tables in card_list:
+            cards += 1
+            body_id = f"{pane_id}-c{cards}"
+            is_open = cards == 1
+            header = ""
+            if sub_heading and sub_heading != "(no sub-heading)":
+                header = (f'<div class="card-header"><button class="btn btn-link" data-toggle="collapse"'
+                          f' aria-expanded="{"true" if is_open else "false"}" aria-controls="{body_id}">'
+                          f"{html.escape(sub_heading)}</button></div>")
+            out.append(f'<div class="card">{header}<div id="{body_id}" class="collapse{" show" if is_open else ""}">'
+                       f'<div class="card-body">{"".join(tables)}</div></div></div>')
+        out.append("</div>")
+    if with_select:
+        out.append('<select class="form-control"><option>Seçiniz</option>'
+                   '<option>TRY</option><option>USD</option></select>')
+    out.append("</div>")
+    return "".join(out)
+
+_PAGE = """<!doctype html>
+<html lang="tr"><head><meta charset="utf-8"><title>Bireysel Ücret Listesi (fixture)</title>
+<style>.tab-pane{display:none}.tab-pane.active{display:block}.collapse:not(.show){display:none}</style>
+</head><body>
+<select id="bankList"><option value="">Seçiniz</option>%(options)s</select>
+<ul class="nav nav-tabs" id="tabs" role="tablist"></ul>
+<div class="tab-content" id="panes"></div>
+<script>
+const tabsEl = document.getElementById('tabs'), panesEl = document.getElementById('panes');
+let bank = '';
+function show(href) {
+  tabsEl.querySelectorAll('a[role="tab"]').forEach(a => a.classList.toggle('active', a.getAttribute('href') === href));
+  panesEl.querySelectorAll('.tab-pane').forEach(p => p.classList.toggle('active', '#' + p.id === href));
+}
+document.getElementById('bankList').addEventListener('change', async e => {
+  bank = e.target.value;
+  const data = await (await fetch('/api/bank?name=' + encodeURIComponent(bank))).json();
+  tabsEl.innerHTML = data.tabs;
+  panesEl.innerHTML = data.panes.join('');
+  const first = tabsEl.querySelector('a[role="tab"]');
+  if (first) show(first.getAttribute('href'));
+});
+tabsEl.addEventListener('click', async e => {
+  const a = e.target.closest('a[role="tab"]');
+  if (!a) return;
+  e.preventDefault();
+  const href = a.getAttribute('href');
+  const pane = panesEl.querySelector(href);
+  if (pane && pane.dataset.lazy) {
+    const url = '/api/pane?name=' + encodeURIComponent(bank) + '&id=' + encodeURIComponent(pane.id);
+    pane.outerHTML = (await (await fetch(url)).json()).html;
+  }
+  show(href);
+});
+document.addEventListener('click', e => {
+  const t = e.target.closest('[data-toggle="collapse"]');
+  if (!t) return;
+  const open = t.getAttribute('aria-expanded') !== 'true';
+  t.setAttribute('aria-expanded', String(open));
+  const body = document.getElementById(t.getAttribute('aria-controls'));
+  if (body) body.classList.toggle('show', open);
+});
+document.addEventListener('change', e => {
+  if (e.target.matches('.tab-pane select')) fetch('/api/ping');
+});
+</script>
+</body></html>
+"""
+
+class FixtureSite:
+    """The fixture dumps of one directory, pre-rendered per bank."""
+    def __init__(self, fixtures=FIXTURES, lazy_tabs=False):
+        self.lazy_tabs = lazy_tabs
+        self.banks = {}
+        for path in sorted(Path(fixtures).glob("fees_*.txt")):
+            bank_label, tabs = read_dump(path.read_text(encoding="utf-8"))
+            if bank_label and tabs:
+                self.banks[bank_label] = tabs
+
+    def page(self):
+        options = "".join(f'<option value="{html.escape(b)}">{html.escape(b)}</option>' for b in self.banks)
+        return _PAGE % {"options": options}
+
+    def pane(self, bank_label, pane_id):
+        tabs = self.banks.get(bank_label, [])
+        for i, tab in enumerate(tabs):
+            if tab["href"] == "#" + pane_id:
+                return pane_html(tab, with_select=i == len(tabs) - 1)
+        return None
+
+    def bank(self, bank_label):
+        tabs = self.banks.get(bank_label, [])
+        links = "".join(
+            f'<li class="nav-item"><a class="nav-link" role="tab" data-toggle="tab" '
+            f'href="{html.escape(t["href"])}">{html.escape(t["title"])}</a></li>' for t in tabs)
+        panes = []
+        for i, tab in enumerate(tabs):
+            if self.lazy_tabs and i:
+                panes.append(f'<div class="tab-pane" id="{html.escape(tab["href"].lstrip("#"))}" data-lazy="1"></div>')
+            else:
+                panes.append(pane_html(tab, with_select=i == len(tabs) - 1))
+        return {"tabs": links, "panes": panes}
+
+def make_server(site, host="127.0.0.1", port=8765, latency_ms=0, jitter_ms=0):
+    rng = random.Random()
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, body, content_type):
+            delay = latency_ms + (rng.uniform(0, jitter_ms) if jitter_ms else 0)
+            if delay:
+                time.sleep(delay / 1000)
+            data = body.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.send_header("Cache-Control", "no-store")
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            q = {k: v[0] for k, v in parse_qs(url.query).items()}
+            if url.path in ("/", LIST_PATH):
+                return self._send(200, site.page(), "text/html; charset=utf-8")
+            if url.path == "/api/bank" and q.get("name") in site.banks:
+                return self._send(200, json.dumps(site.bank(q["name"]), ensure_ascii=False),
+                                  "application/json; charset=utf-8")
+            if url.path == "/api/pane":
+                pane = site.pane(q.get("name", ""), q.get("id", ""))
+                if pane is not None:
+                    return self._send(200, json.dumps({"html": pane}, ensure_ascii=False),
+                                      "application/json; charset=utf-8")
+            if url.path == "/api/ping":
+                return self._send(200, "{}", "application/json")
+            self._send(404, "not found", "text/plain")
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
+
+def start_in_thread(site, host="127.0.0.1", port=0, latency_ms=0, jitter_ms=0):
+    """Serve in a daemon thread; returns (server, base_url). port=0 picks a free port."""
+    server = make_server(site, host, port, latency_ms, jitter_ms)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Offline fixture server for the fee site")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--fixtures", default=str(FIXTURES))
+    ap.add_argument("--latency-ms", type=float, default=0, help="added to every response")
+    ap.add_argument("--jitter-ms", type=float, default=0, help="random 0..N ms on top of the latency")
+    ap.add_argument("--lazy-tabs", action="store_true", help="load every tab but the first on click")
+    args = ap.parse_args(argv)
+
+    site = FixtureSite(args.fixtures, args.lazy_tabs)
+    server = make_server(site, args.host, args.port, args.latency_ms, args.jitter_ms)
+    print(f"[OK] Serving {len(site.banks)} banks at http://{args.host}:{args.port}{LIST_PATH}")
+    print(f"     BASE_URL=http://{args.host}:{args.port} python run_benchmark.py")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
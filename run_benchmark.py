@@ -1,13 +1,36 @@
 # run_benchmark.py
 # One-shot: scrape -> dumps/fees_<bank>.txt -> parse (strict + fallback) -> build template -> fill -> save Benchmark_Results.xlsx
+#
+#   python run_benchmark.py                  # all three stages
+#   python run_benchmark.py parse render     # reuse the fees_*.txt dumps already on disk
+#   python run_benchmark.py render           # re-render from PARSED_FILE only
+#   python run_benchmark.py --all-banks      # every bank in #bankList, not just list_of_banks
+#   python run_benchmark.py --resume         # rescrape only the banks MANIFEST_FILE lacks as "ok"
+#   DAEMON_URL=http://127.0.0.1:8766 python run_benchmark.py --bank "Akbank T.A.Ş."   # via scrape_daemon.py
+#   python run_benchmark.py history --history-layout fields   # Fee_History.xlsx from HISTORY_DB
+#   python run_benchmark.py --force-render   # render even if the workbook would come out the same
+#
+# Importing this module has no side effects. playwright, bs4 and openpyxl are
+# imported by the stage that needs them, so parse + render start without them.
 
 # ───────────────────── BEGIN: YOUR SCRAPER (HARDENED FOR CI) ─────────────────
-from playwright.sync_api import sync_playwright
-from bs4 import BeautifulSoup
+import asyncio
+import contextlib
+import contextvars
+import hashlib
+import json
+import math
 import re
 import os
+import sqlite3
+import sys
+import threading
+import time
 
-URL = "https://www.bankacilikurunvehizmetucretleri.org.tr/bireysel-ucret/liste"
+# BASE_URL points the scraper at another host, e.g. the offline fixture server
+# (python fixture_server.py) for repeatable end-to-end benchmarks
+BASE_URL = os.environ.get("BASE_URL", "https://www.bankacilikurunvehizmetucretleri.org.tr")
+URL = BASE_URL.rstrip("/") + "/bireysel-ucret/liste"
 
 list_of_banks = [
     "Akbank T.A.Ş.",
@@ -21,305 +44,1438 @@ list_of_banks = [
     "QNB Bank A.Ş.",
 ]
 
+# ALL_BANKS=1 (or --all-banks): scrape every institution #bankList offers, not
+# just list_of_banks. The discovered list is kept in BANKS_FILE so the parse
+# and render stages, and later runs, see the same banks.
+ALL_BANKS = os.environ.get("ALL_BANKS", "0") == "1"
+BANKS_FILE = os.environ.get("BANKS_FILE", "banks.json")
+
+# Number of isolated browser contexts scraping in parallel (1 = serial run).
+# Each worker owns one page and writes whole fees_<bank>.txt files, so the
+# dumps are identical whatever the worker count.
+SCRAPE_WORKERS = max(1, int(os.environ.get("SCRAPE_WORKERS", "1") or 1))
+
+# Each worker holds one browser context of roughly CONTEXT_MB, so
+# MEMORY_BUDGET_MB (0 = none) caps the worker count. A worker also swaps its
+# page for a fresh one every RECYCLE_AFTER banks, so memory stays flat
+# however many banks a run has.
+MEMORY_BUDGET_MB = int(os.environ.get("MEMORY_BUDGET_MB", "0") or 0)
+CONTEXT_MB = 250
+RECYCLE_AFTER = max(1, int(os.environ.get("RECYCLE_AFTER", "10") or 10))
+
+# "dom": click every tab and read the rendered pane (original behaviour).
+# "network": take panes from the XHR/fetch payloads seen after selecting a bank
+# and only fall back to the DOM for tabs no usable payload covered.
+CAPTURE_MODE = os.environ.get("CAPTURE_MODE", "dom").strip().lower()
+
+# Resource filter (BLOCK_RESOURCES=0 turns it off). Only these resource types
+# are fetched; anything else, and any URL matching BLOCK_URL_RE, is aborted.
+BLOCK_RESOURCES = os.environ.get("BLOCK_RESOURCES", "1") != "0"
+ALLOWED_RESOURCE_TYPES = {
+    t.strip() for t in os.environ.get("ALLOWED_RESOURCE_TYPES", "document,script,xhr,fetch").split(",")
+    if t.strip()
+}
+BLOCK_URL_RE = os.environ.get(
+    "BLOCK_URL_RE",
+    r"google-analytics\.com|googletagmanager\.com|doubleclick\.net|facebook\.net"
+    r"|hotjar\.com|clarity\.ms|yandex\.ru/metrika|mc\.yandex",
+)
+
+# "browser": pull each pane's tables with one page.evaluate call;
+# "python": copy the pane HTML and walk it with BeautifulSoup + lxml.
+PANE_EXTRACT = os.environ.get("PANE_EXTRACT", "browser").strip().lower()
+
+# Persistent pane/parse cache (USE_CACHE=0 disables it). Entries are keyed by
+# bank (+ tab) and a content hash and are dropped whenever this file changes.
+USE_CACHE = os.environ.get("USE_CACHE", "1") != "0"
+CACHE_DIR = os.environ.get("CACHE_DIR", ".cache")
+
+# Structured copy of every dump: one row per table row, indexed by bank +
+# sub-heading and bank + row label (ROWS_DB="" turns it off)
+ROWS_DB = os.environ.get("ROWS_DB", "fees_rows.sqlite")
+
+# Timed spans of every scrape step, appended as JSON lines across runs
+# (TRACE_FILE="" turns it off); `python scrape_trace.py summary` aggregates them
+TRACE_FILE = os.environ.get("TRACE_FILE", "scrape_trace.jsonl")
+
+# Per-bank checkpoint: status, dump sha256, duration and attempts, rewritten
+# after every bank. `--resume` scrapes only the banks not recorded as "ok"
+# (or whose dump changed since). A failing bank is retried on a fresh page
+# SCRAPE_RETRIES times before it is recorded as "failed".
+MANIFEST_FILE = os.environ.get("MANIFEST_FILE", "scrape_manifest.json")
+SCRAPE_RETRIES = max(0, int(os.environ.get("SCRAPE_RETRIES", "1") or 0))
+
+# Adaptive deadlines: a step's timeout is the p99 of its spans for the same
+# bank + tab over the last ADAPTIVE_RUNS runs in TRACE_FILE, times
+# ADAPTIVE_FACTOR, kept between ADAPTIVE_MIN_MS and STEP_BUDGETS_MS.
+# ADAPTIVE_RUNS=0 keeps the static budgets.
+ADAPTIVE_RUNS = int(os.environ.get("ADAPTIVE_RUNS", "20") or 0)
+ADAPTIVE_FACTOR = float(os.environ.get("ADAPTIVE_FACTOR", "3"))
+ADAPTIVE_MIN_MS = int(os.environ.get("ADAPTIVE_MIN_MS", "2000"))
+ADAPTIVE_MIN_SAMPLES = 5   # fewer spans for a bank + tab -> the step's p99 over all banks
+# Wall-clock budget (s) for the whole scrape, shared by every bank: no
+# deadline outlives it and banks not started in time are recorded as
+# failed for --resume. 0 = no budget.
+RUN_BUDGET_S = float(os.environ.get("RUN_BUDGET_S", "0") or 0)
+
+# Hand the scrape to a running scrape_daemon.py (warm Chromium, landing page
+# already loaded) instead of launching a browser; unset = always launch one
+DAEMON_URL = os.environ.get("DAEMON_URL", "")
+
+# PROGRESS=1 (set by run_benchmark_gui.py): print one "@progress {json}" line per
+# run/bank/tab event and stop the scrape when stdin sends a "cancel" line
+PROGRESS = os.environ.get("PROGRESS", "0") == "1"
+PROGRESS_PREFIX = "@progress "
+
+BROWSER_ARGS = [
+    "--disable-blink-features=AutomationControlled",
+    "--no-sandbox",
+    "--disable-dev-shm-usage",
+]
+
+CONTEXT_OPTIONS = dict(
+    locale="tr-TR",
+    timezone_id="Europe/Istanbul",
+    viewport={"width": 1440, "height": 2600},
+    user_agent=("Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+                "(KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36"),
+    extra_http_headers={"Accept-Language": "tr-TR,tr;q=0.9,en;q=0.8"},
+)
+
 def safe_name(s: str) -> str:
     return re.sub(r"[^\w\-\.]+", "_", s.strip())
 
-def _snap(page, name):
-    os.makedirs("artifacts", exist_ok=True)
-    page.screenshot(path=f"artifacts/{safe_name(name)}.png", full_page=True)
-    with open(f"artifacts/{safe_name(name)}.html", "w", encoding="utf-8") as f:
-        f.write(page.content())
-
-def wait_pane_ready(page, href, bank_label):
-    # Pane must be visible
-    page.locator(href).wait_for(state="visible", timeout=30000)
-    # Wait until we actually see a money token (TL/TRY/USD) in that pane
+def bank_roster():
+    """list_of_banks, then every other bank discovered into BANKS_FILE."""
     try:
-        page.wait_for_function(
-            """(sel) => {
-                const n = document.querySelector(sel);
-                if (!n) return false;
-                const t = (n.innerText || '').replace(/\\u00a0/g,' ');
-                return /\\d[\\d.,]*\\s*(TL|TRY|USD)/.test(t);
-            }""",
-            href,
-            timeout=30000,
-        )
-    except Exception:
-        print(f"[WARN] No currency text yet for {bank_label} {href}; snapshot saved.")
-        _snap(page, f"{bank_label}_{href}_empty")
-
-with sync_playwright() as pw:
-    browser = pw.chromium.launch(
-        headless=True,
-        args=[
-            "--disable-blink-features=AutomationControlled",
-            "--no-sandbox",
-            "--disable-dev-shm-usage",
-        ],
-    )
-    context = browser.new_context(
-        locale="tr-TR",
-        timezone_id="Europe/Istanbul",
-        viewport={"width": 1440, "height": 2600},
-        user_agent=("Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
-                    "(KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36"),
-        extra_http_headers={"Accept-Language": "tr-TR,tr;q=0.9,en;q=0.8"},
-    )
-    page = context.new_page()
-    page.set_default_timeout(45000)
-    page.set_default_navigation_timeout(45000)
-
-    page.goto(URL, wait_until="load")
-    page.wait_for_load_state("networkidle")
+        with open(BANKS_FILE, encoding="utf-8") as f:
+            found = json.load(f)["banks"]
+    except (OSError, ValueError, KeyError):
+        found = []
+    return list_of_banks + [b for b in found if b not in list_of_banks]
+
+def _worker_count(workers, n_banks=None):
+    n = max(1, workers if n_banks is None else min(workers, n_banks))
+    if MEMORY_BUDGET_MB:
+        n = min(n, max(1, MEMORY_BUDGET_MB // CONTEXT_MB))
+    return n
+
+with open(__file__, "rb") as _f:
+    _CODE_FINGERPRINT = hashlib.sha1(_f.read()).hexdigest()
+
+class _Cache:
+    """
+    One JSON file under CACHE_DIR mapping key -> {"hash", "value"}.
+    get() only returns a value when the stored hash matches; every put()
+    is a miss that was recomputed.
+    """
+    def __init__(self, name):
+        self.path = os.path.join(CACHE_DIR, f"{name}.json")
+        self.name = name
+        self.hits = self.misses = 0
+        self.entries = {}
+        if not USE_CACHE:
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("code") == _CODE_FINGERPRINT:
+            self.entries = data.get("entries", {})
+
+    def known(self, key):
+        return self.entries.get(key, {}).get("hash")
+
+    def get(self, key, h):
+        e = self.entries.get(key)
+        if e and e["hash"] == h:
+            self.hits += 1
+            return e["value"]
+        return None
+
+    def put(self, key, h, value):
+        self.misses += 1
+        self.entries[key] = {"hash": h, "value": value}
+
+    def save(self):
+        if not USE_CACHE:
+            return
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"code": _CODE_FINGERPRINT, "entries": self.entries}, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+        print(f"[CACHE] {self.name}: {self.hits} hits, {self.misses} misses")
+
+# ── TRACE: one JSON line per timed scrape step
+# (bank, tab href) of the running worker task; every span picks it up
+_trace_where = contextvars.ContextVar("trace_where", default=(None, None))
+
+class _Trace:
+    """
+    Appends {"run", "bank", "tab", "step", "start", "ms", "ok", ...} lines to
+    TRACE_FILE. A no-op until open() is given a path.
+    """
+    def __init__(self):
+        self._f = None
+        self.run = None
+        self.spans = 0
+        self._runs = 0    # several runs may share a process and a second
+
+    def open(self, path):
+        if path:
+            self._f = open(path, "a", encoding="utf-8")
+            self._runs += 1
+            self.run = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{self._runs}"
+            self.spans = 0
+
+    def close(self):
+        if self._f:
+            self._f.close()
+            self._f = None
+            print(f"[OK] Trace: {self.spans} spans appended to {TRACE_FILE} (run {self.run})")
+
+    @contextlib.contextmanager
+    def span(self, step, **fields):
+        """Time the block; it may add fields to the yielded dict (ok=False marks a miss)."""
+        rec = {"ok": True}
+        if self._f is None:
+            yield rec
+            return
+        bank, tab = _trace_where.get()
+        start, t0 = time.time(), time.perf_counter()
+        try:
+            yield rec
+        except BaseException:
+            rec["ok"] = False
+            raise
+        finally:
+            if self._f:
+                ev = {"run": self.run, "bank": bank, "tab": tab, "step": step,
+                      "start": round(start, 3), "ms": round((time.perf_counter() - t0) * 1000, 2)}
+                ev.update(fields, **rec)
+                self._f.write(json.dumps(ev, ensure_ascii=False) + "\n")
+                self.spans += 1
+
+_trace = _Trace()
+
+# ── PROGRESS: machine-readable events for the GUI, and its cancel line
+def _progress(event, **fields):
+    if PROGRESS:
+        print(PROGRESS_PREFIX + json.dumps(dict(event=event, **fields), ensure_ascii=False), flush=True)
+
+def _watch_stdin(loop, cancel):
+    for line in sys.stdin:
+        if line.strip().lower() == "cancel":
+            loop.call_soon_threadsafe(cancel.set)
+            return
+
+@contextlib.contextmanager
+def _dump_file(path):
+    """Write to path + ".part" and only replace the dump once the bank is complete."""
+    part = path + ".part"
+    try:
+        with open(part, "w", encoding="utf-8") as out:
+            yield out
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(part)
+        raise
+    os.replace(part, path)
+
+# ── MANIFEST: per-bank checkpoint, so a rerun only scrapes what is missing
+def _sha256_file(path):
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
 
-    for BANK_LABEL in list_of_banks:
-        outfile = f"fees_{safe_name(BANK_LABEL)}.txt"
-        with open(outfile, "w", encoding="utf-8") as out:
-            out.write(f"=== BANK: {BANK_LABEL} ===\n")
+class _Manifest:
+    """
+    MANIFEST_FILE maps bank -> {"status", "dump", "sha256", "ms", "attempts",
+    "at", "error"}; rewritten after every attempt (kept in memory only when
+    path is ""). A fresh run starts it empty.
+    """
+    def __init__(self, path=MANIFEST_FILE, resume=False):
+        self.path = path
+        self.banks = {}
+        if not resume:
+            self._save()
+            return
+        try:
+            with open(path, encoding="utf-8") as f:
+                self.banks = json.load(f).get("banks", {})
+        except (OSError, ValueError):
+            pass
+
+    def checkpointed(self, bank_label):
+        """True when the bank finished and its dump is still the one recorded."""
+        e = self.banks.get(bank_label)
+        return bool(e and e["status"] == "ok" and _sha256_file(e["dump"]) == e.get("sha256"))
+
+    def failed(self):
+        return [b for b, e in self.banks.items() if e["status"] == "failed"]
+
+    def record(self, bank_label, status, ms, attempts, error=None):
+        dump = f"fees_{safe_name(bank_label)}.txt"
+        e = {"status": status, "dump": dump, "ms": round(ms), "attempts": attempts,
+             "at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+        if status == "ok":
+            e["sha256"] = _sha256_file(dump)
+        else:
+            e["error"] = (f"{type(error).__name__}: {error}" if isinstance(error, BaseException) else str(error))[:500]
+        self.banks[bank_label] = e
+        self._save()
+
+    def _save(self):
+        if not self.path:
+            return
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"banks": self.banks}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.path)
+
+async def _snap(page, name):
+    os.makedirs("artifacts", exist_ok=True)
+    await page.screenshot(path=f"artifacts/{safe_name(name)}.png", full_page=True)
+    html = await page.content()
+    with open(f"artifacts/{safe_name(name)}.html", "w", encoding="utf-8") as f:
+        f.write(html)
+
+# Per-step readiness budgets (ms), the ceilings of the adaptive deadlines. A
+# step that runs out of budget logs a warning and the scrape moves on instead
+# of sleeping or failing the run; "action" is Playwright's default timeout.
+STEP_BUDGETS_MS = {
+    "action": 45000,
+    "goto": 45000,
+    "bank_select": 20000,
+    "tab": 10000,
+    "pane_ready": 30000,
+    "collapse": 5000,
+    "select": 5000,
+}
+# How long the network must stay quiet before a step counts as settled
+QUIET_MS = int(os.environ.get("QUIET_MS", "150"))
+
+_PANE_READY_JS = """([sel, ms]) => new Promise(resolve => {
+    const ready = () => {
+        const n = document.querySelector(sel);
+        if (!n || !(n.offsetWidth || n.offsetHeight || n.getClientRects().length)) return false;
+        const t = (n.innerText || '').replace(/\\u00a0/g, ' ');
+        return /\\d[\\d.,]*\\s*(TL|TRY|USD)/.test(t);
+    };
+    if (ready()) return resolve(true);
+    const obs = new MutationObserver(() => { if (ready()) done(true); });
+    const timer = setTimeout(() => done(false), ms);
+    function done(v) { obs.disconnect(); clearTimeout(timer); resolve(v); }
+    obs.observe(document.body, {subtree: true, childList: true, characterData: true, attributes: true});
+})"""
+
+class _Deadlines:
+    """
+    Timeouts learned from TRACE_FILE (see ADAPTIVE_RUNS), shared by every
+    worker, and the clock of RUN_BUDGET_S. ms() never exceeds the ceiling
+    it is given nor what is left of the run budget.
+    """
+    def __init__(self, trace_file=TRACE_FILE, runs=ADAPTIVE_RUNS, run_budget_s=RUN_BUDGET_S):
+        self.samples, self.p99 = {}, {}
+        self.end = time.monotonic() + run_budget_s if run_budget_s > 0 else None
+        if not (trace_file and runs > 0 and os.path.exists(trace_file)):
+            return
+        import scrape_trace
+        events = scrape_trace.read_trace(trace_file)
+        keep = set(scrape_trace.run_order(events)[-runs:])
+        # timed-out spans count too (at their budget), so deadlines do not
+        # shrink just because the slow cases were cut off
+        for ev in events:
+            if ev["run"] in keep:
+                self.samples.setdefault((ev["step"], ev["bank"], ev["tab"]), []).append(ev["ms"])
+                self.samples.setdefault((ev["step"],), []).append(ev["ms"])
+        for ms in self.samples.values():
+            ms.sort()
+        self.p99 = {k: scrape_trace.percentile(ms, 99) for k, ms in self.samples.items()
+                    if len(ms) >= ADAPTIVE_MIN_SAMPLES}
+        print(f"[OK] Adaptive deadlines from {len(keep)} runs in {trace_file} "
+              f"({sum(1 for k in self.p99 if len(k) == 3)} bank/tab/step keys)")
+
+    def typical_ms(self, step, bank_label):
+        """Median of a bank's step-level spans (tab None); inf when never seen."""
+        ms = self.samples.get((step, bank_label, None))
+        return ms[len(ms) // 2] if ms else float("inf")
+
+    def remaining_ms(self):
+        return float("inf") if self.end is None else max(0.0, (self.end - time.monotonic()) * 1000)
+
+    def exhausted(self):
+        return self.remaining_ms() <= 0
+
+    def ms(self, step, ceiling):
+        """Deadline for the trace step `step` of the current bank + tab."""
+        bank, tab = _trace_where.get()
+        learned = self.p99.get((step, bank, tab), self.p99.get((step,)))
+        ms = ceiling if learned is None else min(ceiling, max(ADAPTIVE_MIN_MS, learned * ADAPTIVE_FACTOR))
+        return int(max(1, min(ms, self.remaining_ms())))
+
+class _Readiness:
+    """
+    Event-driven replacement for fixed sleeps and networkidle: tracks the
+    page's in-flight document/XHR/fetch requests and watches pane mutations,
+    returning as soon as the condition holds or the step's deadline runs out.
+    """
+    def __init__(self, page, budgets=None, deadlines=None):
+        self.page = page
+        self.budgets = dict(STEP_BUDGETS_MS, **(budgets or {}))
+        self.deadlines = deadlines or _Deadlines(trace_file="", run_budget_s=0)
+        self._inflight = set()
+        self._changed = asyncio.Event()
+        page.on("request", self._on_request)
+        page.on("requestfinished", self._on_done)
+        page.on("requestfailed", self._on_done)
+
+    def _on_request(self, request):
+        if request.resource_type in ("document", "xhr", "fetch"):
+            self._inflight.add(request)
+            self._changed.set()
+
+    def _on_done(self, request):
+        if request in self._inflight:
+            self._inflight.discard(request)
+            self._changed.set()
+
+    async def settle(self, step):
+        """Wait until no tracked request has been in flight for QUIET_MS."""
+        with _trace.span(f"settle.{step}") as rec:
+            rec["ok"] = await self._settle(step)
+        return rec["ok"]
+
+    async def _settle(self, step):
+        loop = asyncio.get_running_loop()
+        budget = self.deadlines.ms(f"settle.{step}", self.budgets[step])
+        deadline = loop.time() + budget / 1000
+        while True:
+            self._changed.clear()
+            remaining = deadline - loop.time()
+            if remaining > 0:
+                wait = remaining if self._inflight else min(QUIET_MS / 1000, remaining)
+                try:
+                    await asyncio.wait_for(self._changed.wait(), wait)
+                    continue
+                except asyncio.TimeoutError:
+                    if not self._inflight:
+                        return True
+            print(f"[WARN] '{step}' not settled within {budget} ms "
+                  f"({len(self._inflight)} requests in flight); continuing.")
+            return False
+
+    async def pane(self, href, bank_label):
+        """
+        Wait until the pane is visible and shows a money token (TL/TRY/USD).
+        Past its learned deadline the wait only goes on, up to the static
+        budget, while the page still has requests in flight: a slow tab gets
+        to finish, a broken one fails in seconds.
+        """
+        ceiling = self.budgets["pane_ready"]
+        with _trace.span("wait_pane_ready") as rec:
+            ms = rec["budget"] = self.deadlines.ms("wait_pane_ready", ceiling)
+            ok = await self.page.evaluate(_PANE_READY_JS, [href, ms])
+            extra = int(min(ceiling - ms, self.deadlines.remaining_ms()))
+            if not ok and self._inflight and extra > 0:
+                rec["extended"] = extra
+                ok = await self.page.evaluate(_PANE_READY_JS, [href, extra])
+            rec["ok"] = ok
+        if not ok:
+            print(f"[WARN] No currency text yet for {bank_label} {href}; snapshot saved.")
+            await _snap(self.page, f"{bank_label}_{href}_empty")
+        return ok
+
+class _ResourceFilter:
+    """
+    context.route() handler shared by every worker: lets through the allowed
+    resource types, aborts the rest and counts what was blocked (per type)
+    and how many response bytes were still loaded.
+    """
+    def __init__(self, allowed_types=ALLOWED_RESOURCE_TYPES, block_url_re=BLOCK_URL_RE):
+        self.allowed_types = set(allowed_types)
+        self.block_url = re.compile(block_url_re) if block_url_re else None
+        self.blocked = {}
+        self.allowed = 0
+        self.loaded_bytes = 0
+
+    async def attach(self, context):
+        await context.route("**/*", self._handle)
+        context.on("response", self._on_response)
+
+    async def _handle(self, route):
+        req = route.request
+        if req.resource_type in self.allowed_types and not (self.block_url and self.block_url.search(req.url)):
+            self.allowed += 1
+            await route.continue_()
+            return
+        self.blocked[req.resource_type] = self.blocked.get(req.resource_type, 0) + 1
+        await route.abort("blockedbyclient")
+
+    def _on_response(self, response):
+        try:
+            self.loaded_bytes += int(response.headers.get("content-length", 0))
+        except ValueError:
+            pass
+
+    def summary(self):
+        by_type = ", ".join(f"{k}: {v}" for k, v in sorted(self.blocked.items())) or "none"
+        return (f"blocked {sum(self.blocked.values())} requests ({by_type}); "
+                f"allowed {self.allowed}, {self.loaded_bytes / 1024:.0f} KB loaded")
+
+async def _open_page(browser, resource_filter=None, deadlines=None):
+    context = await browser.new_context(**CONTEXT_OPTIONS)
+    if resource_filter:
+        await resource_filter.attach(context)
+    page = await context.new_page()
+    page.set_default_timeout(STEP_BUDGETS_MS["action"])
+    page.set_default_navigation_timeout(STEP_BUDGETS_MS["goto"])
+    ready = _Readiness(page, deadlines=deadlines)
+
+    with _trace.span("goto"):
+        await page.goto(URL, wait_until="load", timeout=ready.deadlines.ms("goto", STEP_BUDGETS_MS["goto"]))
+    await ready.settle("goto")
+    return context, page, ready
+
+_BANK_OPTIONS_JS = """() => {
+    const sel = document.querySelector('#bankList');
+    const names = sel
+        ? [...sel.options].filter(o => o.value && o.value !== '0').map(o => o.label)
+        : [...document.querySelectorAll('.dropdown-menu .dropdown-item .text')].map(e => e.textContent);
+    return names.map(t => t.replace(/\\s+/g, ' ').trim()).filter(t => t && !/^se[çc]iniz/i.test(t));
+}"""
+
+async def _bank_options(page):
+    """Every bank the page's #bankList offers, in its order."""
+    return list(dict.fromkeys(await page.evaluate(_BANK_OPTIONS_JS)))
+
+async def discover_banks():
+    from playwright.async_api import async_playwright
+    async with async_playwright() as pw:
+        browser = await pw.chromium.launch(headless=True, args=BROWSER_ARGS)
+        try:
+            _, page, _ = await _open_page(browser, _ResourceFilter() if BLOCK_RESOURCES else None)
+            return await _bank_options(page)
+        finally:
+            await browser.close()
+
+def _save_roster(banks):
+    tmp = BANKS_FILE + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"discovered_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "banks": banks}, f,
+                  ensure_ascii=False, indent=1)
+    os.replace(tmp, BANKS_FILE)
+
+async def _select_bank(page, bank_label, ready):
+    with _trace.span("select_option"):
+        timeout = ready.deadlines.ms("select_option", STEP_BUDGETS_MS["action"])
+        try:
+            await page.select_option("#bankList", label=bank_label, timeout=timeout)
+        except Exception:
+            await page.locator('button[data-id="bankList"]').click(timeout=timeout)
+            await page.locator('.dropdown-menu.show .dropdown-item .text', has_text=bank_label).click(timeout=timeout)
+    await ready.settle("bank_select")
+
+def _body_rows(tbl):
+    # Browsers wrap loose <tr> in an implicit <tbody>; raw payload HTML may not
+    if tbl.find("tbody"):
+        return tbl.select("tbody tr")
+    return [tr for tr in tbl.find_all("tr") if not tr.find_parent(["thead", "tfoot"])]
+
+def _pane_from_soup(soup):
+    """
+    Walk one tab pane (.table_item -> .card -> .card-body table) into the
+    plain structure written to the dump:
+      {"tables": [{"n", "section", "sub_heading", "headers", "rows"}],
+       "fallback": [rows, ...]}   # only when no .card tables exist
+    """
+    table_items = soup.select(".table_item")
+    if not table_items:
+        table_items = [soup]
+
+    tables = []
+    for block in table_items:
+        section_title = None
+        head = block.find(["h3", "h4", "h5", "h6"])
+        if head:
+            section_title = head.get_text(" ", strip=True)
+
+        for card in block.select(".card"):
+            sub_heading = ""
+            ch = card.select_one(".card-header")
+            if ch:
+                sub_heading = ch.get_text(" ", strip=True)
+
+            for ti, tbl in enumerate(card.select(".card-body table"), 1):
+                rows = []
+                for row in _body_rows(tbl):
+                    cells = [c.get_text(" ", strip=True) for c in row.find_all(["th", "td"])]
+                    if any(cells):
+                        rows.append(cells)
+                tables.append({
+                    "n": ti,
+                    "section": section_title,
+                    "sub_heading": sub_heading,
+                    "headers": [th.get_text(" ", strip=True) for th in tbl.select("thead th")],
+                    "rows": rows,
+                })
+
+    fallback = []
+    if not tables:
+        for tbl in soup.select("table"):
+            rows = []
+            for row in _body_rows(tbl):
+                cells = [c.get_text(" ", strip=True) for c in row.find_all(["th", "td"])]
+                if any(cells):
+                    rows.append(cells)
+            fallback.append(rows)
+    return {"tables": tables, "fallback": fallback}
+
+def _write_tab(out, tab_title, href, pane):
+    out.write(f"\n\n===== TAB: {tab_title} ({href}) =====\n")
+
+    for t in pane["tables"]:
+        out.write(f"\n--- TABLE {t['n']} ---\n")
+        out.write(f"SECTION: {t['section'] or '(no section title)'}\n")
+        out.write(f"SUB-HEADING: {t['sub_heading'] or '(no sub-heading)'}\n")
+        if t["headers"]:
+            out.write("HEADERS: " + " | ".join(t["headers"]) + "\n")
+        for cells in t["rows"]:
+            out.write(" | ".join(cells) + "\n")
+
+    if not pane["tables"]:
+        out.write(f"\n(no .card tables found; fallback tables: {len(pane['fallback'])})\n")
+        for ti, rows in enumerate(pane["fallback"], 1):
+            out.write(f"\n--- TABLE {ti} ---\n")
+            for cells in rows:
+                out.write(" | ".join(cells) + "\n")
+
+# ── dump -> tabs/tables, the inverse of _write_tab (fixture_server.py serves these back)
+_DUMP_BANK = re.compile(r"^=== BANK: (.*) ===$")
+_DUMP_TAB = re.compile(r"^===== TAB: (.*) \((#[^)]*)\) =====$")
+_DUMP_TABLE = re.compile(r"^--- TABLE (\d+) ---$")
+
+def read_dump_tables(text):
+    """(bank_label, [{"title", "href", "tables": [{"n", "section", "sub_heading", "headers", "rows"}]}])"""
+    bank_label, tabs, table = None, [], None
+    for line in text.split("\n"):
+        m = _DUMP_BANK.match(line)
+        if m:
+            bank_label = m.group(1)
+            continue
+        m = _DUMP_TAB.match(line)
+        if m:
+            tabs.append({"title": m.group(1), "href": m.group(2), "tables": []})
+            table = None
+            continue
+        m = _DUMP_TABLE.match(line)
+        if m and tabs:
+            table = {"n": int(m.group(1)), "section": None, "sub_heading": None, "headers": [], "rows": []}
+            tabs[-1]["tables"].append(table)
+            continue
+        if table is None or not line.strip():
+            continue    # blank lines and "(no .card tables found ...)" notes
+        if table["section"] is None and not table["rows"] and line.startswith("SECTION: "):
+            table["section"] = line[len("SECTION: "):]
+        elif table["sub_heading"] is None and not table["rows"] and line.startswith("SUB-HEADING: "):
+            table["sub_heading"] = line[len("SUB-HEADING: "):]
+        elif table["sub_heading"] is not None and not table["rows"] and not table["headers"] \
+                and line.startswith("HEADERS: "):
+            table["headers"] = line[len("HEADERS: "):].split(" | ")
+        else:
+            table["rows"].append(line.split(" | "))
+    return bank_label, tabs
+
+# Same walk as _pane_from_soup, done inside the page and returned as JSON.
+# text() mirrors BeautifulSoup's get_text(" ", strip=True) (Python's notion of
+# whitespace, adjacent text nodes merged, script/style skipped) and within()
+# mirrors soupsieve's "A B" matching, which never looks above the pane.
+_PANE_EXTRACT_JS = r"""([sel, known]) => {
+    const root = document.querySelector(sel);
+    if (!root) return null;
+    // cyrb53 of the pane markup: an unchanged pane is answered from the cache
+    const html = root.innerHTML;
+    let h1 = 0xdeadbeef, h2 = 0x41c6ce57;
+    for (let i = 0; i < html.length; i++) {
+        const c = html.charCodeAt(i);
+        h1 = Math.imul(h1 ^ c, 2654435761);
+        h2 = Math.imul(h2 ^ c, 1597334677);
+    }
+    h1 = Math.imul(h1 ^ (h1 >>> 16), 2246822507) ^ Math.imul(h2 ^ (h2 >>> 13), 3266489909);
+    h2 = Math.imul(h2 ^ (h2 >>> 16), 2246822507) ^ Math.imul(h1 ^ (h1 >>> 13), 3266489909);
+    const hash = 'js:' + (4294967296 * (2097151 & h2) + (h1 >>> 0)).toString(16);
+    if (hash === known) return {hash: hash, same: true};
+    const WS = /^[\t\n\v\f\r\x1c-\x1f \x85\xa0\u1680\u2000-\u200a\u2028\u2029\u202f\u205f\u3000]+|[\t\n\v\f\r\x1c-\x1f \x85\xa0\u1680\u2000-\u200a\u2028\u2029\u202f\u205f\u3000]+$/g;
+    const text = (el) => {
+        const parts = [];
+        const walker = document.createTreeWalker(el, NodeFilter.SHOW_TEXT);
+        let prev = null;
+        for (let n = walker.nextNode(); n; n = walker.nextNode()) {
+            const p = n.parentNode ? n.parentNode.nodeName : '';
+            if (p === 'SCRIPT' || p === 'STYLE' || p === 'TEMPLATE') continue;
+            if (prev && n.previousSibling === prev) parts[parts.length - 1] += n.nodeValue;
+            else parts.push(n.nodeValue);
+            prev = n;
+        }
+        return parts.map(s => s.replace(WS, '')).filter(Boolean).join(' ');
+    };
+    const within = (scope, ancestor, target) =>
+        Array.from(scope.querySelectorAll(target)).filter(el => {
+            for (let a = el.parentElement; a && a !== root; a = a.parentElement)
+                if (a.matches(ancestor)) return true;
+            return false;
+        });
+    const bodyRows = (tbl) => tbl.querySelector('tbody')
+        ? within(tbl, 'tbody', 'tr')
+        : Array.from(tbl.querySelectorAll('tr')).filter(tr => !tr.parentElement.closest('thead, tfoot'));
+    const rowsOf = (tbl) => bodyRows(tbl)
+        .map(tr => Array.from(tr.querySelectorAll('th, td')).map(text))
+        .filter(cells => cells.some(Boolean));
+
+    let items = Array.from(root.querySelectorAll('.table_item'));
+    if (!items.length) items = [root];
+
+    const tables = [];
+    for (const block of items) {
+        const head = block.querySelector('h3, h4, h5, h6');
+        const section = head ? text(head) : null;
+        for (const card of block.querySelectorAll('.card')) {
+            const ch = card.querySelector('.card-header');
+            const sub = ch ? text(ch) : '';
+            within(card, '.card-body', 'table').forEach((tbl, i) => tables.push({
+                n: i + 1,
+                section: section,
+                sub_heading: sub,
+                headers: within(tbl, 'thead', 'th').map(text),
+                rows: rowsOf(tbl),
+            }));
+        }
+    }
+    const fallback = tables.length ? [] : Array.from(root.querySelectorAll('table')).map(rowsOf);
+    return {hash: hash, tables: tables, fallback: fallback};
+}"""
 
-            try:
-                page.select_option("#bankList", label=BANK_LABEL)
-            except Exception:
-                page.locator('button[data-id="bankList"]').click()
-                page.locator('.dropdown-menu.show .dropdown-item .text', has_text=BANK_LABEL).click()
-            page.wait_for_load_state("networkidle")
-
-            tab_hrefs = page.eval_on_selector_all(
-                'ul.nav-tabs a[role="tab"]',
-                'els => els.map(e => e.getAttribute("href")).filter(Boolean)'
+async def _extract_pane(page, href, cache=None, key=None):
+    known = cache.known(key) if cache else None
+    if PANE_EXTRACT == "browser":
+        try:
+            with _trace.span("extract_js"):
+                res = await page.evaluate(_PANE_EXTRACT_JS, [href, known])
+        except Exception as e:
+            res = None
+            print(f"[WARN] In-page extraction failed for {href}: {e}; parsing HTML instead.")
+        if res is not None:
+            if res.get("same"):
+                return cache.get(key, res["hash"])
+            pane = {"tables": res["tables"], "fallback": res["fallback"]}
+            if cache:
+                cache.put(key, res["hash"], pane)
+            return pane
+    with _trace.span("inner_html"):
+        pane_html = await page.locator(href).inner_html()
+    return _pane_from_html(pane_html, cache, key)
+
+def _pane_from_html(pane_html, cache=None, key=None, soup=None):
+    h = "py:" + hashlib.sha1(pane_html.encode("utf-8")).hexdigest()
+    pane = cache.get(key, h) if cache else None
+    if pane is None:
+        with _trace.span("bs4_parse"):
+            if soup is None:
+                from bs4 import BeautifulSoup
+                soup = BeautifulSoup(pane_html, "lxml")
+            pane = _pane_from_soup(soup)
+        if cache:
+            cache.put(key, h, pane)
+    return pane
+
+# ── STRUCTURED DUMP: the same tables as fees_<bank>.txt, row by row in SQLite
+_ROWS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fee_rows (
+    bank        TEXT NOT NULL,
+    tab         TEXT NOT NULL,
+    tab_href    TEXT NOT NULL,
+    table_no    INTEGER NOT NULL,   -- position of the table within the tab
+    row_no      INTEGER NOT NULL,   -- position of the row within the table
+    section     TEXT,
+    sub_heading TEXT,
+    label       TEXT,               -- first cell of the row
+    headers     TEXT NOT NULL,      -- JSON list
+    cells       TEXT NOT NULL       -- JSON list
+);
+CREATE INDEX IF NOT EXISTS ix_fee_rows_sub ON fee_rows (bank, sub_heading);
+CREATE INDEX IF NOT EXISTS ix_fee_rows_label ON fee_rows (bank, label);
+"""
+
+def _pane_records(tab_title, href, pane):
+    tables = [(t["section"], t["sub_heading"], t["headers"], t["rows"]) for t in pane["tables"]]
+    if not tables:
+        tables = [(None, None, [], rows) for rows in pane["fallback"]]
+    for table_no, (section, sub_heading, headers, rows) in enumerate(tables, 1):
+        headers_json = json.dumps(headers, ensure_ascii=False)
+        for row_no, cells in enumerate(rows, 1):
+            yield (tab_title, href, table_no, row_no, section or None, sub_heading or None,
+                   cells[0] if cells else None, headers_json, json.dumps(cells, ensure_ascii=False))
+
+class _RowStore:
+    def __init__(self, path=ROWS_DB):
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(_ROWS_SCHEMA)
+
+    def replace_bank(self, bank_label, records):
+        with self.conn:
+            self.conn.execute("DELETE FROM fee_rows WHERE bank = ?", (bank_label,))
+            self.conn.executemany(
+                "INSERT INTO fee_rows VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                ((bank_label,) + r for r in records),
             )
 
-            for href in tab_hrefs:
-                tab = page.locator(f'a[role="tab"][href="{href}"]')
-                tab.scroll_into_view_if_needed()
-                tab.click()
-                page.wait_for_load_state("networkidle")
-                # ✅ robust wait for real numbers before parsing
-                wait_pane_ready(page, href, BANK_LABEL)
-
-                # Expand all collapses in this tab
-                page.evaluate(f"""
-                document.querySelectorAll('{href} .collapse').forEach(el => {{
-                    el.classList.add('show'); el.style.height='auto';
-                }});
-                """)
-                togglers = page.locator(
-                    f'{href} [data-toggle="collapse"], '
-                    f'{href} [data-bs-toggle="collapse"], '
-                    f'{href} .card-header button[aria-controls]'
-                )
-                count = togglers.count()
-                for i in range(count):
-                    t = togglers.nth(i)
-                    exp = t.get_attribute("aria-expanded")
-                    if exp is None or (isinstance(exp, str) and exp.lower() == "false"):
-                        t.scroll_into_view_if_needed()
-                        t.click()
-                        page.wait_for_load_state("networkidle")
-
-                # Pick first meaningful option in selects (if any)
-                selects = page.locator(f"{href} select")
-                scount = selects.count()
-                for i in range(scount):
-                    sel = selects.nth(i)
-                    labels = [s.strip() for s in sel.locator("option").all_text_contents()]
-                    choice = None
-                    for lab in labels:
-                        if lab and lab.lower() not in ("hepsi", "seçiniz", "seciniz", "tümü"):
-                            choice = lab
-                            break
-                    if choice:
-                        try:
-                            sel.select_option(label=choice)
-                            page.wait_for_load_state("networkidle")
-                        except Exception:
-                            pass
-
-                # Give UI a moment, then ensure numbers exist
-                page.wait_for_timeout(400)
-                wait_pane_ready(page, href, BANK_LABEL)
-
-                # Parse pane HTML
-                pane_html = page.locator(href).inner_html()
-                soup = BeautifulSoup(pane_html, "html.parser")
-
-                table_items = soup.select(".table_item")
-                if not table_items:
-                    table_items = [soup]
+    def close(self):
+        self.conn.close()
 
+def query_rows(bank_label, sub_heading=None, label=None, db=ROWS_DB):
+    """
+    Rows of one bank from the structured dump, filtered by sub-heading and/or
+    row-label prefix through the indexes instead of scanning the text dump.
+    """
+    sql = "SELECT tab, section, sub_heading, headers, cells FROM fee_rows WHERE bank = ?"
+    args = [bank_label]
+    if sub_heading is not None:
+        sql += " AND sub_heading >= ? AND sub_heading < ?"
+        args += [sub_heading, sub_heading + "\U0010ffff"]
+    if label is not None:
+        sql += " AND label >= ? AND label < ?"
+        args += [label, label + "\U0010ffff"]
+    sql += " ORDER BY rowid"
+    conn = sqlite3.connect(db)
+    try:
+        return [
+            {"tab": tab, "section": sec, "sub_heading": sub,
+             "headers": json.loads(headers), "cells": json.loads(cells)}
+            for tab, sec, sub, headers, cells in conn.execute(sql, args)
+        ]
+    finally:
+        conn.close()
+
+# ── NETWORK CAPTURE: cut panes out of XHR/fetch payloads instead of the DOM
+_MONEY_RE = re.compile(r"\d[\d.,]*\s*(TL|TRY|USD)")
+
+def _json_strings(data):
+    if isinstance(data, str):
+        yield data
+    elif isinstance(data, dict):
+        for v in data.values():
+            yield from _json_strings(v)
+    elif isinstance(data, list):
+        for v in data:
+            yield from _json_strings(v)
+
+def _payload_fragments(content_type, body):
+    # HTML partials come back either as-is or wrapped in a JSON envelope
+    if "json" in content_type:
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return []
+        return [s for s in _json_strings(data) if "<" in s and "id=" in s]
+    if "html" in content_type:
+        return [body]
+    return []
+
+def _pane_usable(node):
+    # Selects change the pane client-side; panes without amounts are not loaded yet
+    if node.find("select"):
+        return False
+    return bool(_MONEY_RE.search(node.get_text(" ").replace("\xa0", " ")))
+
+class _ResponseCapture:
+    def __init__(self, page):
+        self._pending = []
+        self._payloads = []
+        # bumped by reset(): tab ids like "#tab" repeat across banks, so a
+        # payload of the previous bank must never reach panes()
+        self._generation = 0
+        self._reset_at = 0.0
+        page.on("response", self._on_response)
+
+    def reset(self):
+        self._generation += 1
+        self._reset_at = time.time() * 1000
+        for fut in self._pending:
+            fut.cancel()
+        self._pending.clear()
+        self._payloads.clear()
+
+    def _on_response(self, response):
+        if response.request.resource_type not in ("xhr", "fetch") or not response.ok:
+            return
+        # a late response to a request the previous bank sent
+        started = (getattr(response.request, "timing", None) or {}).get("startTime", -1)
+        if 0 < started < self._reset_at:
+            return
+        self._pending.append(asyncio.ensure_future(self._read(self._generation, len(self._pending), response)))
+
+    async def _read(self, generation, seq, response):
+        try:
+            body = await response.text()
+        except Exception:
+            return
+        if generation == self._generation:
+            self._payloads.append((seq, response.headers.get("content-type", ""), body))
+
+    async def panes(self, hrefs, cache=None, bank_label=""):
+        """Return {href: pane} for every tab pane found in the captured payloads."""
+        from bs4 import BeautifulSoup
+        with _trace.span("capture_payloads") as rec:
+            if self._pending:
+                await asyncio.gather(*self._pending, return_exceptions=True)
+            found = {}
+            for _, content_type, body in sorted(self._payloads, key=lambda p: p[0]):
+                for fragment in _payload_fragments(content_type, body):
+                    soup = BeautifulSoup(fragment, "lxml")
+                    for href in hrefs:
+                        node = soup.find(id=href.lstrip("#"))
+                        if node is not None and _pane_usable(node):
+                            found[href] = _pane_from_html(node.decode_contents(), cache, f"{bank_label}|{href}", node)
+            rec["panes"] = len(found)
+        return found
+
+_EXPAND_COLLAPSES_JS = """(sel) => {
+    const root = document.querySelector(sel);
+    if (!root) return 0;
+    root.querySelectorAll(':scope .collapse').forEach(el => {
+        el.classList.add('show'); el.style.height = 'auto';
+    });
+    let expanded = 0;
+    root.querySelectorAll(
+        ':scope [data-toggle="collapse"], :scope [data-bs-toggle="collapse"], ' +
+        ':scope .card-header button[aria-controls]'
+    ).forEach(t => {
+        const exp = t.getAttribute('aria-expanded');
+        if (exp === null || exp.toLowerCase() === 'false') {
+            t.click();
+            expanded++;
+        }
+    });
+    return expanded;
+}"""
+
+async def _scrape_pane_dom(page, tab, href, bank_label, ready, cache=None):
+    with _trace.span("tab_click"):
+        timeout = ready.deadlines.ms("tab_click", STEP_BUDGETS_MS["action"])
+        await tab.scroll_into_view_if_needed(timeout=timeout)
+        await tab.click(timeout=timeout)
+    await ready.settle("tab")
+    # ✅ robust wait for real numbers before parsing
+    await ready.pane(href, bank_label)
+
+    # Expand all collapses in this tab in one round trip, then wait once for
+    # whatever lazy content the togglers asked for
+    with _trace.span("expand_collapses") as rec:
+        expanded = rec["expanded"] = await page.evaluate(_EXPAND_COLLAPSES_JS, href)
+    changed = bool(expanded)
+    if expanded:
+        await ready.settle("collapse")
+
+    # Pick first meaningful option in selects (if any)
+    with _trace.span("select_handling") as rec:
+        selects = page.locator(f"{href} select")
+        scount = rec["selects"] = await selects.count()
+        for i in range(scount):
+            sel = selects.nth(i)
+            labels = [s.strip() for s in await sel.locator("option").all_text_contents()]
+            choice = None
+            for lab in labels:
+                if lab and lab.lower() not in ("hepsi", "seçiniz", "seciniz", "tümü"):
+                    choice = lab
+                    break
+            if choice:
                 try:
-                    tab_title = tab.inner_text().strip()
+                    await sel.select_option(label=choice)
+                    await ready.settle("select")
+                    changed = True
+                except Exception:
+                    pass
+
+    # Only re-check the pane if something above could have replaced its content
+    if changed:
+        await ready.pane(href, bank_label)
+
+    return await _extract_pane(page, href, cache, f"{bank_label}|{href}"), expanded
+
+async def scrape_bank(page, bank_label, ready, capture=None, cache=None, rows=None, timings=None):
+    """timings, if given, collects {"bank", "tab", "via", "ms"} per tab and a tab=None total per bank."""
+    clock = asyncio.get_running_loop().time
+    started = clock()
+    outfile = f"fees_{safe_name(bank_label)}.txt"
+    _trace_where.set((bank_label, None))
+    _progress("bank_started", bank=bank_label)
+    with _trace.span("scrape_bank"), _dump_file(outfile) as out:
+        out.write(f"=== BANK: {bank_label} ===\n")
+
+        if capture:
+            capture.reset()
+        await _select_bank(page, bank_label, ready)
+        if timings is not None:
+            timings.append({"bank": bank_label, "tab": "(select)", "via": "dom", "ms": (clock() - started) * 1000})
+
+        tabs = await page.eval_on_selector_all(
+            'ul.nav-tabs a[role="tab"]',
+            'els => els.filter(e => e.getAttribute("href"))'
+            '          .map(e => [e.getAttribute("href"), (e.innerText || "").trim()])'
+        )
+        captured = await capture.panes([href for href, _ in tabs], cache, bank_label) if capture else {}
+        expanded = 0
+        records = []
+
+        for i, (href, title) in enumerate(tabs, 1):
+            tab_started = clock()
+            _trace_where.set((bank_label, href))
+            pane = captured.get(href)
+            if pane is not None:
+                with _trace.span("write_dump"):
+                    _write_tab(out, title or href, href, pane)
+                records.extend(_pane_records(title or href, href, pane))
+            else:
+                tab = page.locator(f'a[role="tab"][href="{href}"]')
+                pane, n = await _scrape_pane_dom(page, tab, href, bank_label, ready, cache)
+                expanded += n
+                try:
+                    tab_title = (await tab.inner_text()).strip()
                 except Exception:
                     tab_title = href
+                with _trace.span("write_dump"):
+                    _write_tab(out, tab_title, href, pane)
+                records.extend(_pane_records(tab_title, href, pane))
+            via = "network" if href in captured else "dom"
+            if timings is not None:
+                timings.append({"bank": bank_label, "tab": href, "via": via, "ms": (clock() - tab_started) * 1000})
+            _progress("tab_done", bank=bank_label, tab=href, i=i, n=len(tabs), via=via)
+        _trace_where.set((bank_label, None))
+
+    if rows:
+        rows.replace_bank(bank_label, records)
+    if timings is not None:
+        timings.append({"bank": bank_label, "tab": None, "via": "", "ms": (clock() - started) * 1000})
+
+    via = f", {len(captured)} from network payloads" if capture else ""
+    print(f"[OK] Scraped {bank_label}: {len(tabs)} tabs{via}, {expanded} collapses expanded")
+    _progress("bank_scraped", bank=bank_label, tabs=len(tabs))
+
+async def _open_worker_page(browser, resource_filter=None, deadlines=None):
+    """(context, page, ready, capture) for one worker, loaded on URL."""
+    context, page, ready = await _open_page(browser, resource_filter, deadlines)
+    return context, page, ready, _ResponseCapture(page) if CAPTURE_MODE == "network" else None
+
+async def _scrape_worker(browser, queue, resource_filter=None, cache=None, rows=None, timings=None, finished=None,
+                         manifest=None, deadlines=None, pool=None):
+    """
+    A bank that raises is retried SCRAPE_RETRIES times, each on a freshly
+    opened page; if it still fails, or RUN_BUDGET_S is used up before it
+    starts, it is recorded and the worker moves on. With a pool the worker
+    starts on a page from it and returns its page there when done. Pages are
+    replaced after RECYCLE_AFTER banks.
+    """
+    context = page = None
+    if pool:
+        context, page, ready, capture = pool.pop()
+        ready.deadlines = deadlines or ready.deadlines
+    served = 0      # banks scraped on the current page
+    try:
+        while True:
+            try:
+                bank_label = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            if page is not None and served >= RECYCLE_AFTER:
+                with contextlib.suppress(Exception):
+                    await context.close()
+                context = page = None
+            for attempt in range(1, SCRAPE_RETRIES + 2):
+                if deadlines and deadlines.exhausted():
+                    print(f"[WARN] {bank_label} not scraped: RUN_BUDGET_S ({RUN_BUDGET_S:g} s) used up")
+                    _progress("bank_failed", bank=bank_label, attempt=attempt, final=True, error="run budget used up")
+                    if manifest:
+                        manifest.record(bank_label, "failed", 0, attempt - 1, TimeoutError("RUN_BUDGET_S used up"))
+                    break
+                t0 = time.perf_counter()
+                try:
+                    if page is None:
+                        context, page, ready, capture = await _open_worker_page(browser, resource_filter, deadlines)
+                        served = 0
+                    await scrape_bank(page, bank_label, ready, capture, cache, rows, timings)
+                except Exception as e:
+                    ms = (time.perf_counter() - t0) * 1000
+                    last = attempt > SCRAPE_RETRIES
+                    print(f"[WARN] {bank_label} failed (attempt {attempt}/{SCRAPE_RETRIES + 1}): "
+                          f"{type(e).__name__}: {e}" + ("" if last else "; retrying on a fresh page"))
+                    _progress("bank_failed", bank=bank_label, attempt=attempt, final=last, error=str(e)[:200])
+                    if page is not None:
+                        with contextlib.suppress(Exception):
+                            await _snap(page, f"{bank_label}_failed_{attempt}")
+                        with contextlib.suppress(Exception):
+                            await context.close()
+                        context = page = None
+                    if last and manifest:
+                        manifest.record(bank_label, "failed", ms, attempt, e)
+                    continue
+                served += 1
+                if manifest:
+                    manifest.record(bank_label, "ok", (time.perf_counter() - t0) * 1000, attempt)
+                if finished is not None:
+                    finished.append(bank_label)
+                break
+    finally:
+        if context is not None:
+            if pool is not None:
+                pool.append((context, page, ready, capture))
+            else:
+                await context.close()
+
+async def _cancel_on(event, tasks):
+    await event.wait()
+    for t in tasks:
+        t.cancel()
+
+async def scrape_banks(banks, workers=SCRAPE_WORKERS, timings=None, manifest=None):
+    """
+    Scrape every bank into fees_<bank>.txt and return the banks that finished;
+    each attempt is recorded in manifest, if given. With PROGRESS=1 a "cancel"
+    line on stdin stops the run: banks in flight are dropped (their previous
+    dumps stay untouched), finished ones are kept.
+    """
+    cancel = asyncio.Event()
+    if PROGRESS:
+        threading.Thread(target=_watch_stdin, args=(asyncio.get_running_loop(), cancel), daemon=True).start()
+
+    from playwright.async_api import async_playwright
+    async with async_playwright() as pw:
+        browser = await pw.chromium.launch(headless=True, args=BROWSER_ARGS)
+        resource_filter = _ResourceFilter() if BLOCK_RESOURCES else None
+        try:
+            finished = await scrape_with(browser, banks, workers, timings, manifest, resource_filter, cancel=cancel)
+        finally:
+            await browser.close()
+    if resource_filter:
+        print(f"[OK] Resource filter: {resource_filter.summary()}")
+    return finished
+
+async def scrape_with(browser, banks, workers=SCRAPE_WORKERS, timings=None, manifest=None, resource_filter=None,
+                      pool=None, cancel=None):
+    """
+    scrape_banks() on a browser that is already running. pool, a list of
+    _open_worker_page() tuples left open on URL, lends the workers their pages
+    and gets them back afterwards; scrape_daemon.py keeps it warm.
+    """
+    deadlines = _Deadlines()    # read before this run's spans are appended
+    # longest banks first (never seen counts as longest), so the workers end
+    # on short banks and finish close together
+    queue = asyncio.Queue()
+    for bank_label in sorted(banks, key=lambda b: -deadlines.typical_ms("scrape_bank", b)):
+        queue.put_nowait(bank_label)
+    finished = []
+    _progress("run_started", banks=list(banks))
+
+    cache = _Cache("panes")
+    rows = _RowStore() if ROWS_DB else None
+    _trace.open(TRACE_FILE)
+    n = _worker_count(workers, len(banks))
+    if n < min(workers, len(banks)):
+        print(f"[WARN] MEMORY_BUDGET_MB={MEMORY_BUDGET_MB}: {n} workers instead of {min(workers, len(banks))}")
+    tasks = [asyncio.create_task(_scrape_worker(browser, queue, resource_filter, cache, rows, timings, finished,
+                                                manifest, deadlines, pool))
+             for _ in range(n)]
+    canceller = asyncio.create_task(_cancel_on(cancel, tasks)) if cancel else None
+    try:
+        await asyncio.gather(*tasks)
+    except asyncio.CancelledError:
+        if cancel is None or not cancel.is_set():
+            raise
+        await asyncio.gather(*tasks, return_exceptions=True)
+        print(f"[WARN] Scrape cancelled after {len(finished)} finished banks")
+        _progress("cancelled", finished=finished)
+    finally:
+        if canceller:
+            canceller.cancel()
+        for t in tasks:
+            t.cancel()
+        if rows:
+            rows.close()
+        _trace.close()
+    cache.save()
+    return finished
+
+def _daemon_call(path, body=None):
+    """JSON from DAEMON_URL + path (POSTing body, if given); None when the daemon is not usable."""
+    import urllib.request
+    data = None if body is None else json.dumps(body).encode()
+    req = urllib.request.Request(DAEMON_URL.rstrip("/") + path, data=data, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req) as resp:
+            return json.load(resp)
+    except (OSError, ValueError) as e:
+        print(f"[WARN] Scrape daemon at {DAEMON_URL} not usable ({e}); launching a browser")
+        return None
 
-                out.write(f"\n\n===== TAB: {tab_title} ({href}) =====\n")
-
-                any_table = False
-                for block in table_items:
-                    section_title = None
-                    head = block.find(["h3", "h4", "h5", "h6"])
-                    if head:
-                        section_title = head.get_text(" ", strip=True)
-
-                    cards = block.select(".card")
-                    for card in cards:
-                        sub_heading = ""
-                        ch = card.select_one(".card-header")
-                        if ch:
-                            sub_heading = ch.get_text(" ", strip=True)
-
-                        tables = card.select(".card-body table")
-                        for ti, tbl in enumerate(tables, 1):
-                            any_table = True
-                            out.write(f"\n--- TABLE {ti} ---\n")
-                            out.write(f"SECTION: {section_title or '(no section title)'}\n")
-                            out.write(f"SUB-HEADING: {sub_heading or '(no sub-heading)'}\n")
-
-                            headers = [th.get_text(" ", strip=True) for th in tbl.select("thead th")]
-                            if headers:
-                                out.write("HEADERS: " + " | ".join(headers) + "\n")
-
-                            for row in tbl.select("tbody tr"):
-                                cells = [c.get_text(" ", strip=True) for c in row.find_all(["th", "td"])]
-                                if any(cells):
-                                    out.write(" | ".join(cells) + "\n")
-
-                if not any_table:
-                    tables = soup.select("table")
-                    out.write(f"\n(no .card tables found; fallback tables: {len(tables)})\n")
-                    for ti, tbl in enumerate(tables, 1):
-                        out.write(f"\n--- TABLE {ti} ---\n")
-                        for row in tbl.select("tbody tr"):
-                            cells = [c.get_text(" ", strip=True) for c in row.find_all(["th", "td"])]
-                            if any(cells):
-                                out.write(" | ".join(cells) + "\n")
-
-                page.wait_for_timeout(250)
-
-    browser.close()
-
-print("Done. Created one .txt file per bank in the current folder.")
+def _scrape_via_daemon(banks, manifest):
+    """
+    POST banks to DAEMON_URL and write the dumps it sends back; returns the
+    banks that finished, or None when the daemon cannot be reached.
+    """
+    _progress("run_started", banks=banks)
+    job = _daemon_call("/scrape", {"banks": banks})
+    if job is None:
+        return None
+    finished = []
+    for bank_label in banks:
+        e = job["banks"].get(bank_label)
+        if e is None:
+            continue
+        if e["status"] == "ok" and bank_label in job["dumps"]:
+            with _dump_file(f"fees_{safe_name(bank_label)}.txt") as out:
+                out.write(job["dumps"][bank_label])
+            manifest.record(bank_label, "ok", e["ms"], e["attempts"])
+            finished.append(bank_label)
+            _progress("bank_scraped", bank=bank_label)
+        else:
+            manifest.record(bank_label, "failed", e["ms"], e["attempts"], e.get("error", ""))
+            _progress("bank_failed", bank=bank_label, attempt=e["attempts"], final=True, error=e.get("error", ""))
+    print(f"[OK] Daemon at {DAEMON_URL} scraped {len(finished)}/{len(banks)} banks in {job['ms'] / 1000:.1f} s")
+    return finished
+
+def _discover_stage():
+    """Read #bankList (through the daemon, if any) into BANKS_FILE; the last roster if that fails."""
+    found = _daemon_call("/banks") if DAEMON_URL else None
+    try:
+        if found is None:
+            found = asyncio.run(discover_banks())
+    except Exception as e:
+        print(f"[WARN] Could not read #bankList ({type(e).__name__}: {e}); using the last known banks")
+        return bank_roster()
+    if not found:
+        print("[WARN] #bankList offered no banks; using the last known banks")
+        return bank_roster()
+    _save_roster(found)
+    new = [b for b in found if b not in list_of_banks]
+    print(f"[OK] {len(found)} banks in #bankList, {len(new)} beyond list_of_banks -> {BANKS_FILE}")
+    return bank_roster()
+
+def scrape_stage(banks=None, resume=False, all_banks=ALL_BANKS):
+    """
+    fees_<bank>.txt for list_of_banks (every bank on the site with all_banks,
+    or only banks); returns (banks with a usable dump, banks that failed,
+    banks the workbook would lack). resume skips the banks MANIFEST_FILE
+    already has as "ok" and keeps their dumps, and retries its failed ones;
+    a subset also keeps the dumps of the banks it leaves out, checkpointed or
+    just on disk. A bank that fails, or is cancelled before it finishes,
+    keeps its last good dump, if any (_dump_file never replaces it with a
+    partial one).
+    """
+    wanted = list(banks or (_discover_stage() if all_banks else list_of_banks))
+    manifest = _Manifest(resume=resume or banks is not None)
+    if resume:
+        wanted += [b for b in manifest.banks if b not in wanted]
+    order = list(dict.fromkeys(bank_roster() + wanted))
+    todo = [b for b in wanted if not (resume and manifest.checkpointed(b))]
+    kept = [b for b in order if b not in todo and (manifest.checkpointed(b) or (
+        banks is not None and os.path.exists(f"fees_{safe_name(b)}.txt")))]
+    if resume or banks is not None:
+        print(f"[OK] {len(kept)} banks kept from earlier runs ({MANIFEST_FILE} or their dump), {len(todo)} to scrape")
+    scraped = _scrape_via_daemon(todo, manifest) if todo and DAEMON_URL else None
+    if scraped is None:
+        scraped = asyncio.run(scrape_banks(todo, manifest=manifest)) if todo else []
+    failed = [b for b in manifest.failed() if b in todo]
+    unfinished = [b for b in todo if b not in scraped and b not in failed]    # cancelled
+    stale = [b for b in failed + unfinished if os.path.exists(f"fees_{safe_name(b)}.txt")]
+    if failed:
+        print(f"[WARN] {len(failed)} banks failed: {', '.join(failed)}; "
+              f"rerun with --resume to scrape only those")
+    if stale:
+        print(f"[WARN] Keeping the last good dump of {', '.join(stale)} so their columns are not left empty")
+    usable = [b for b in order if b in kept or b in scraped or b in stale]
+    # banks a cancel or a subset leaves without any dump; a failed bank
+    # without one is left to --resume
+    missing = [b for b in unfinished if b not in usable]
+    if banks is not None:
+        missing += [b for b in order if b not in wanted and b not in usable]
+    print("Done. Created one .txt file per bank in the current folder.")
+    return usable, failed, missing
 # ────────────────────── END: YOUR SCRAPER (HARDENED FOR CI) ──────────────────
 
 
-# ─────────────── BEGIN: YOUR EXCEL TEMPLATE FUNCTION (UNCHANGED) ─────────────
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
-from openpyxl.utils import get_column_letter
+# ──────────────────── BEGIN: YOUR EXCEL TEMPLATE FUNCTION ────────────────────
 from datetime import datetime
 
-def build_benchmark_template():
-    year = datetime.now().year
-    benchmark_title = f"BENCHMARKING-{year}"
-
-    bank_headers = ["GARANTI", "AKBANK", "İŞBANKASI", "YKB", "ZİRAAT",
-                    "HALKBANK", "VAKIFBANK", "DENIZBANK", "FINASNBANK"]
-
-    bank_colors = {
-        "GARANTI": "007A33",
-        "AKBANK": "E60012",
-        "İŞBANKASI": "003A8C",
-        "YKB": "1D2E5A",
-        "ZİRAAT": "E30613",
-        "HALKBANK": "005DAA",
-        "VAKIFBANK": "FFB81C",
-        "DENIZBANK": "004C97",
-        "FINASNBANK": "5C1E4F",
-    }
-
-    sections = [
-        ("ŞANS OYUNLARI", [""]),
-        ("EFT", [
-            "HESAPTAN EFT - Şube",
-            "HESAPTAN EFT - ATM",
-            "HESAPTAN EFT - Mobil",
-            "DÜZENLİ EFT",
-            "KREDİ KARTINDAN FATURA ÖDEME",
-        ]),
-        ("HAVALE", [
-            "HESAPTAN HAVALE - Şube",
-            "HESAPTAN HAVALE - ATM",
-            "HESAPTAN HAVALE - Mobil",
-            "DÜZENLİ HAVALE",
-        ]),
-        ("SWIFT", [
-            "GİDEN SWIFT",
-            "GELEN SWIFT",
-            "GİDEN SWIFT - Mobil",
-        ]),
-        ("ÇEK", [
-            "ÇEK TAHSİLİ BAŞKA BANKA",
-            "ÇEK TAHSİLİ GB",
-            "AYNI ŞUBE ÇEK TAHSİLATI",
-            "BAŞKA ŞUBE ÇEK TAHSİLATI",
-            "BLOKE ÇEK ÖDEME",
-            "ÇEK İADE",
-            "BLOKE ÇEK DÜZENLEME",
-            "YP ÇEK TAKASA GÖNDERME",
-            "ÇEK KARNESİ SAYFA ÜCRETİ",
-        ]),
-        ("SENET", [
-            "SENET TAHSİLE ALMA",
-            "MUAMELESİZ SENET İADESİ",
-        ]),
-    ]
+BANK_HEADERS = ["GARANTI", "AKBANK", "İŞBANKASI", "YKB", "ZİRAAT",
+                "HALKBANK", "VAKIFBANK", "DENIZBANK", "FINASNBANK"]
+
+BANK_COLORS = {
+    "GARANTI": "007A33",
+    "AKBANK": "E60012",
+    "İŞBANKASI": "003A8C",
+    "YKB": "1D2E5A",
+    "ZİRAAT": "E30613",
+    "HALKBANK": "005DAA",
+    "VAKIFBANK": "FFB81C",
+    "DENIZBANK": "004C97",
+    "FINASNBANK": "5C1E4F",
+}
 
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "BENCHMARK"
+def bank_color(header):
+    """BANK_COLORS, else a dark colour derived from the header (stable across runs, white text stays legible)."""
+    if header in BANK_COLORS:
+        return BANK_COLORS[header]
+    import colorsys
+    hue = int(hashlib.sha1(header.encode("utf-8")).hexdigest()[:4], 16) / 0xFFFF
+    return "".join(f"{round(c * 255):02X}" for c in colorsys.hls_to_rgb(hue, 0.32, 0.6))
+
+SECTIONS = [
+    ("ŞANS OYUNLARI", [""]),
+    ("EFT", [
+        "HESAPTAN EFT - Şube",
+        "HESAPTAN EFT - ATM",
+        "HESAPTAN EFT - Mobil",
+        "DÜZENLİ EFT",
+        "KREDİ KARTINDAN FATURA ÖDEME",
+    ]),
+    ("HAVALE", [
+        "HESAPTAN HAVALE - Şube",
+        "HESAPTAN HAVALE - ATM",
+        "HESAPTAN HAVALE - Mobil",
+        "DÜZENLİ HAVALE",
+    ]),
+    ("SWIFT", [
+        "GİDEN SWIFT",
+        "GELEN SWIFT",
+        "GİDEN SWIFT - Mobil",
+    ]),
+    ("ÇEK", [
+        "ÇEK TAHSİLİ BAŞKA BANKA",
+        "ÇEK TAHSİLİ GB",
+        "AYNI ŞUBE ÇEK TAHSİLATI",
+        "BAŞKA ŞUBE ÇEK TAHSİLATI",
+        "BLOKE ÇEK ÖDEME",
+        "ÇEK İADE",
+        "BLOKE ÇEK DÜZENLEME",
+        "YP ÇEK TAKASA GÖNDERME",
+        "ÇEK KARNESİ SAYFA ÜCRETİ",
+    ]),
+    ("SENET", [
+        "SENET TAHSİLE ALMA",
+        "MUAMELESİZ SENET İADESİ",
+    ]),
+]
 
-    widths = {1: 24, 2: 46}
-    for col_idx, w in widths.items():
-        ws.column_dimensions[get_column_letter(col_idx)].width = w
-    for col_idx in range(3, 3 + len(bank_headers)):
-        ws.column_dimensions[get_column_letter(col_idx)].width = 18
+def _add_named_styles(wb, headers=None):
+    """
+    Register the shared styles once per workbook. Cells then refer to one by
+    name instead of each carrying its own Border/Alignment/Font/PatternFill.
+    headers (default BANK_HEADERS) get one bm_bank_<header> style each.
+    """
+    from openpyxl.styles import NamedStyle, Font, Alignment, Border, Side, PatternFill
+    from openpyxl.styles.fonts import DEFAULT_FONT
 
     thin = Side(style="thin")
     border_all = Border(left=thin, right=thin, top=thin, bottom=thin)
     center = Alignment(horizontal="center", vertical="center", wrap_text=True)
     left = Alignment(horizontal="left", vertical="center", wrap_text=True)
     bold = Font(bold=True)
-    white_bold = Font(bold=True, color="FFFFFF")
-    black_bold = Font(bold=True, color="000000")
-
-    headers = [benchmark_title, ""] + bank_headers
-    ws.append(headers)
-
-    c = ws.cell(row=1, column=1); c.font = bold; c.alignment = center; c.border = border_all; c.fill = PatternFill("solid", fgColor="EEEEEE")
-    c = ws.cell(row=1, column=2); c.border = border_all; c.fill = PatternFill("solid", fgColor="DDDDDD")
-
-    for i, bank in enumerate(bank_headers, start=3):
-        c = ws.cell(row=1, column=i, value=bank)
-        fill_color = bank_colors.get(bank, "333333")
-        c.fill = PatternFill("solid", fgColor=fill_color)
-        c.font = black_bold if bank == "VAKIFBANK" else white_bold
-        c.alignment = center
-        c.border = border_all
-
-    row_cursor = 2
-    for main_section, sub_items in sections:
-        start_row = row_cursor
-        end_row = row_cursor + len(sub_items) - 1
-        ws.merge_cells(start_row=start_row, start_column=1, end_row=end_row, end_column=1)
-        main_cell = ws.cell(row=start_row, column=1, value=main_section)
-        main_cell.font = bold; main_cell.alignment = center; main_cell.border = border_all
-
-        for sub in sub_items:
-            ws.cell(row=row_cursor, column=2, value=sub).alignment = left
-            ws.cell(row=row_cursor, column=2).border = border_all
-            for col in range(3, 3 + len(bank_headers)):
-                cell_to_style = ws.cell(row=row_cursor, column=col)
-                cell_to_style.border = border_all
-                cell_to_style.alignment = center
-            row_cursor += 1
 
+    styles = [
+        NamedStyle("bm_title", font=bold, alignment=center, border=border_all,
+                   fill=PatternFill("solid", fgColor="EEEEEE")),
+        NamedStyle("bm_corner", font=DEFAULT_FONT, border=border_all, fill=PatternFill("solid", fgColor="DDDDDD")),
+        NamedStyle("bm_section", font=bold, alignment=center, border=border_all),
+        NamedStyle("bm_label", font=DEFAULT_FONT, alignment=left, border=border_all),
+        NamedStyle("bm_value", font=DEFAULT_FONT, alignment=center, border=border_all),
+        NamedStyle("bm_cheapest", font=Font(color="006100"), alignment=center, border=border_all,
+                   fill=PatternFill("solid", fgColor="C6EFCE")),
+        NamedStyle("bm_priciest", font=Font(color="9C0006"), alignment=center, border=border_all,
+                   fill=PatternFill("solid", fgColor="FFC7CE")),
+    ]
+    for bank in BANK_HEADERS if headers is None else headers:
+        styles.append(NamedStyle(
+            f"bm_bank_{bank}", alignment=center, border=border_all,
+            font=Font(bold=True, color="000000" if bank == "VAKIFBANK" else "FFFFFF"),
+            fill=PatternFill("solid", fgColor=bank_color(bank))))
+    for st in styles:
+        if st.name not in wb.named_styles:
+            wb.add_named_style(st)
+
+def _benchmark_rows(title, columns=None, headers=None, marks=None):
+    """
+    The BENCHMARK layout as rows of (value, named style), plus the column-A
+    ranges to merge. columns = {bank header: {ROW_ORDER key: value}} fills
+    the bank cells; without it they are left empty, as in the template.
+    headers are the bank columns, BANK_HEADERS by default; marks =
+    {ROW_ORDER key: {bank header: style}} restyles single cells.
+    """
+    columns, marks = columns or {}, marks or {}
+    headers = BANK_HEADERS if headers is None else headers
+    rows = [[(title, "bm_title"), ("", "bm_corner")] + [(b, f"bm_bank_{b}") for b in headers]]
+    merges = []
+    for main_section, sub_items in SECTIONS:
+        start_row = len(rows) + 1
+        merges.append(f"A{start_row}:A{start_row + len(sub_items) - 1}")
+        for i, sub in enumerate(sub_items):
+            key = sub or main_section
+            row = [(main_section if i == 0 else None, "bm_section"), (sub, "bm_label")]
+            row += [(columns.get(b, {}).get(key), marks.get(key, {}).get(b, "bm_value")) for b in headers]
+            rows.append(row)
+    return rows, merges
+
+def _write_benchmark_sheet(ws, title, columns=None, headers=None, marks=None):
+    """Append the layout to a fresh sheet; works for normal and write-only sheets alike."""
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.utils import get_column_letter
+
+    rows, merges = _benchmark_rows(title, columns, headers, marks)
+    ws.column_dimensions["A"].width = 24
+    ws.column_dimensions["B"].width = 46
+    for col_idx in range(3, len(rows[0]) + 1):
+        ws.column_dimensions[get_column_letter(col_idx)].width = 18
+
+    write_only = ws.parent.write_only
+    # a write-only sheet serializes each row on append, so one styled cell per
+    # (column, style) is refilled instead of styling a new cell per value
+    styled = {}
+    for row in rows:
+        cells = []
+        for col, (value, style) in enumerate(row):
+            c = styled.get((col, style)) if write_only else None
+            if c is None:
+                c = WriteOnlyCell(ws)
+                c.style = style
+                if write_only:
+                    styled[(col, style)] = c
+            c.value = value
+            cells.append(c)
+        ws.append(cells)
+    for rng in merges:
+        if write_only:
+            ws.merged_cells.add(rng)   # written out with the sheet
+        else:
+            ws.merge_cells(rng)
+
+def build_benchmark_template():
+    from openpyxl import Workbook
+
+    wb = Workbook()
+    _add_named_styles(wb)
+    ws = wb.active
+    ws.title = "BENCHMARK"
+    _write_benchmark_sheet(ws, f"BENCHMARKING-{datetime.now().year}")
     return wb
-# ──────────────── END: YOUR EXCEL TEMPLATE FUNCTION (UNCHANGED) ──────────────
+# ───────────────────── END: YOUR EXCEL TEMPLATE FUNCTION ─────────────────────
 
 
 # ─────────── BEGIN: ORIGINAL STRICT PARSER + FALLBACK (TL/TRY tolerant) ──────
 import re as _re
+from bisect import bisect_left as _bisect_left
+from functools import lru_cache as _lru_cache
 from pathlib import Path as _Path
 
 TL = "TL"
@@ -335,271 +1491,110 @@ def first_group(pat, text, flags=_re.S):
     m = _re.search(pat, text, flags)
     return m.group(1).strip() if m else ""
 
+# ── DUMP INDEX + CHAINED SEARCH
+# A pattern like "A.*?B.*?(C)" under re.S is searched as the chain (A, B, (C)):
+# every piece is compiled once and searched forward from where the previous
+# one ended. For these literal-anchored pieces that is exactly the match
+# re.search would return (a chain that fails after the first A fails after
+# every later A too), but it is one forward pass instead of a rescan of the
+# rest of the dump for each candidate start.
+@_lru_cache(maxsize=None)
+def _chain(*pieces, flags=_re.S):
+    return tuple(_re.compile(p, flags) for p in pieces)
+
+@_lru_cache(maxsize=None)
+def _rx(pattern, flags=0):
+    return _re.compile(pattern, flags)
+
+def _seek(text, chain, pos=0, endpos=None):
+    """(start of the first piece, match of the last piece) or None."""
+    endpos = len(text) if endpos is None else endpos
+    start = None
+    for pat in chain:
+        m = pat.search(text, pos, endpos)
+        if not m:
+            return None
+        if start is None:
+            start = m.start()
+        pos = m.end()
+    return start, m
+
+def _seek_group(text, chain, pos=0, endpos=None):
+    hit = _seek(text, chain, pos, endpos)
+    return hit[1].group(1).strip() if hit else ""
+
+_TABLE_BOUNDARY = _re.compile(r"\n---")
+
+class _DumpIndex:
+    """
+    A dump split once into its TABLE blocks (offsets of every "\\n---"), so
+    "...(?=\\n---|\\Z)" block ends become a bisect instead of a regex scan.
+    """
+    def __init__(self, text):
+        self.text = text
+        self.bounds = [m.start() for m in _TABLE_BOUNDARY.finditer(text)]
+        self._subs = {}
+
+    def block_end(self, pos):
+        i = _bisect_left(self.bounds, pos)
+        return self.bounds[i] if i < len(self.bounds) else len(self.text)
+
+    def sub_block(self, title):
+        """Same text as first_group(r"(SUB-HEADING: <title>.*?)(?=\\n---|\\Z)")."""
+        if title not in self._subs:
+            key = f"SUB-HEADING: {title}"
+            start = self.text.find(key)
+            self._subs[title] = "" if start < 0 else \
+                self.text[start:self.block_end(start + len(key))].strip()
+        return self._subs[title]
+
+_AMOUNT_TRY = r"(\d[\d\.\,]*\s*TRY)"
+_AMOUNTS_TRY_USD = _re.compile(r"(\d[\d\.,]*\s*TRY|\d[\d\.,]*\s*USD)")
+
 def amount_from_line(text, label_key):
-    m = _re.search(rf"{_re.escape(label_key)}.*?(\d[\d\.\,]*\s*TRY)", text, _re.S)
-    return norm_money(m.group(1)) if m else ""
+    hit = _seek(text, _chain(_re.escape(label_key), _AMOUNT_TRY))
+    return norm_money(hit[1].group(1)) if hit else ""
 
 def all_amounts_on_line(text, label_key):
-    line = first_group(rf"({_re.escape(label_key)}.*?$)", text, flags=_re.M)
-    if not line:
+    start = text.find(label_key)
+    if start < 0:
         return ""
-    vals = [norm_money(v) for v in _re.findall(r"(\d[\d\.,]*\s*TRY|\d[\d\.,]*\s*USD)", line)]
+    end = text.find("\n", start + len(label_key))
+    line = text[start:end if end >= 0 else len(text)].strip()
+    vals = [norm_money(v) for v in _AMOUNTS_TRY_USD.findall(line)]
     return " / ".join(vals)
 
 def percent_from_line(text, label_key):
-    m = _re.search(rf"{_re.escape(label_key)}.*?% ?(\d+(?:,\d+)?)", text, _re.S | _re.I)
-    return f"%{m.group(1)}" if m else ""
+    hit = _seek(text, _chain(_re.escape(label_key), r"% ?(\d+(?:,\d+)?)", flags=_re.S | _re.I))
+    return f"%{hit[1].group(1)}" if hit else ""
+
+def _bands(ccy):
+    return (
+        _chain(rf"1\s*{ccy}\s*-\s*6\.?300\s*{ccy}", rf"\|\s*([\d\.,]+\s*{ccy})"),
+        _chain(rf"6\.?300,?01\s*{ccy}\s*-\s*304\.?800\s*{ccy}", rf"\|\s*([\d\.,]+\s*{ccy})"),
+        _chain(rf"304\.?800,?01\s*{ccy}", rf"\|\s*([\d\.,]+\s*{ccy})"),
+    )
 
-def three_band_from_block(text, heading_key, channel):
-    block_pat = rf"{_re.escape(heading_key)}.*?\|\s*{channel}\s*\|.*?(?=(\n---|\Z))"
-    block = _re.search(block_pat, text, _re.S)
-    if not block:
+def _band_prices(text, heading_chain, bands, idx):
+    hit = _seek(text, heading_chain)
+    if not hit:
         return ""
-    seg = block.group(0)
-    low  = first_group(r"1\s*TRY\s*-\s*6\.?300\s*TRY.*?\|\s*([\d\.,]+\s*TRY)", seg)
-    mid  = first_group(r"6\.?300,?01\s*TRY\s*-\s*304\.?800\s*TRY.*?\|\s*([\d\.,]+\s*TRY)", seg)
-    high = first_group(r"304\.?800,?01\s*TRY.*?\|\s*([\d\.,]+\s*TRY)", seg)
-    parts = [norm_money(x) for x in (low, mid, high) if x]
+    start, m = hit
+    end = idx.block_end(m.end())
+    parts = [norm_money(x) for x in (_seek_group(text, band, start, end) for band in bands) if x]
     return " - ".join(parts)
 
-def parse_dump(path: str) -> dict:
-    t = _Path(path).read_text(encoding="utf-8", errors="ignore")
-    out = {}
-
-    # ŞANS OYUNLARI
-    s_min = first_group(r"Şans Oyunu Ödemeleri Aracılık.*?Asgari Tutar.*?(\d[\d\.,]*\s*TRY)", t)
-    s_max = first_group(r"Şans Oyunu Ödemeleri Aracılık.*?Azami Tutar.*?(\d[\d\.,]*\s*TRY)", t)
-    so = f"{norm_money(s_min)} - {norm_money(s_max)}".strip(" -")
-    if so: out["ŞANS OYUNLARI"] = so
-
-    # EFT
-    out["HESAPTAN EFT - Şube"]  = three_band_from_block(t, "EFT Gönderilmesi - Hesaptan / Hesaba-İsme-Kredi Kartına-Banka Kartına-Ön Ödemeli Karta - EFT Gönderimi", "Şube")
-    out["HESAPTAN EFT - ATM"]   = three_band_from_block(t, "EFT Gönderilmesi - Hesaptan / Hesaba-İsme-Kredi Kartına-Banka Kartına-Ön Ödemeli Karta - EFT Gönderimi", "ATM")
-    out["HESAPTAN EFT - Mobil"] = three_band_from_block(t, "EFT Gönderilmesi - Hesaptan / Hesaba-İsme-Kredi Kartına-Banka Kartına-Ön Ödemeli Karta - EFT Gönderimi", "Mobil Kanal")
-    out["DÜZENLİ EFT"] = three_band_from_block(t, "EFT Gönderilmesi - Hesaptan / Hesaba-İsme-Kredi Kartına-Banka Kartına-Ön Ödemeli Karta - Düzenli EFT Gönderimi", "İnternet") \
-                      or three_band_from_block(t, "EFT Gönderilmesi - Hesaptan / Hesaba-İsme-Kredi Kartına-Banka Kartına-Ön Ödemeli Karta - Düzenli EFT Gönderimi", "Mobil Kanal")
-    out["KREDİ KARTINDAN FATURA ÖDEME"] = percent_from_line(t, "Fatura Ödeme / Kurum Ödeme - Düzenli Ödemeler")
-
-    # HAVALE
-    base = "Havale Gönderilmesi - Hesaptan / Hesaba-İsme-Kredi Kartına-Banka Kartına-Ön Ödemeli Karta - Havale Gönderimi"
-    out["HESAPTAN HAVALE - Şube"]  = three_band_from_block(t, base, "Şube")
-    out["HESAPTAN HAVALE - ATM"]   = three_band_from_block(t, base, "ATM")
-    out["HESAPTAN HAVALE - Mobil"] = three_band_from_block(t, base, "Mobil Kanal")
-    out["DÜZENLİ HAVALE"] = three_band_from_block(t, "Havale Gönderilmesi - Hesaptan / Hesaba-İsme-Kredi Kartına-Banka Kartına-Ön Ödemeli Karta - Düzenli Havale Gönderimi", "İnternet") \
-                         or three_band_from_block(t, "Havale Gönderilmesi - Hesaptan / Hesaba-İsme-Kredi Kartına-Banka Kartına-Ön Ödemeli Karta - Düzenli Havale Gönderimi", "Mobil Kanal")
-
-    # SWIFT
-    wu_min = first_group(r"Western Union.*?Asgari Tutar\s*\|\s*Azami Tutar.*?([\d\.,]+\s*USD)", t)
-    wu_max = first_group(r"Western Union.*?Asgari Tutar\s*\|\s*Azami Tutar.*?USD\s*\|\s*([\d\.,]+\s*USD)", t)
-    dig_min = first_group(r"Diğer Aracı Firmalar.*?Asgari Tutar\s*\|\s*Azami Tutar.*?([\d\.,]+\s*TRY)", t)
-    dig_max = first_group(r"Diğer Aracı Firmalar.*?Asgari Tutar\s*\|\s*Azami Tutar.*?TRY\s*\|\s*([\d\.,]+\s*TRY)", t)
-    parts = []
-    if wu_min or wu_max: parts.append(f"WU: {norm_money(wu_min)}–{norm_money(wu_max)}")
-    if dig_min or dig_max: parts.append(f"Diğer: {norm_money(dig_min)}–{norm_money(dig_max)}")
-    out["GİDEN SWIFT"] = "; ".join([p for p in parts if p])
-
-    g_min = first_group(r"Uluslararası Para Transferi Ödenmesi.*?Hesaba Gelen - Yurtdışı Bankadan.*?Asgari Tutar\s*\|\s*Azami Tutar.*?([\d\.,]+\s*TRY)", t)
-    g_max = first_group(r"Uluslararası Para Transferi Ödenmesi.*?Hesaba Gelen - Yurtdışı Bankadan.*?Asgari Tutar\s*\|\s*Azami Tutar.*?TRY\s*\|\s*([\d\.,]+\s*TRY)", t)
-    if g_min or g_max:
-        out["GELEN SWIFT"] = f"Hesaba: Asgari {norm_money(g_min)} | Azami {norm_money(g_max)}".strip(" |")
-
-    mob_swift_block = _re.search(r"Uluslararası Para transferi.*?Hesaptan - Hesaba.*?Mobil Kanal.*?(?=\n---|\Z)", t, _re.S)
-    if mob_swift_block:
-        seg = mob_swift_block.group(0)
-        amounts = [norm_money(m) for m in _re.findall(r"(\d[\d\.,]+\s*TRY)", seg)]
-        if len(amounts) >= 2:
-            out["GİDEN SWIFT - Mobil"] = f"{amounts[0]} - {amounts[1]}"
-
-    # ÇEK
-    cek_tahsilat_block = first_group(r"(SUB-HEADING: Çek Tahsilat Ücreti.*?)(?=\n---|\Z)", t)
-    out["ÇEK TAHSİLİ BAŞKA BANKA"] = f"{percent_from_line(cek_tahsilat_block, 'Diğer Banka Çeki -')} Asgari Tutar: {amount_from_line(cek_tahsilat_block, 'Diğer Banka Çeki -')} Azami Tutar: {all_amounts_on_line(cek_tahsilat_block, 'Diğer Banka Çeki -')}"
-    out["ÇEK TAHSİLİ GB"] = percent_from_line(t, "Çek Tahsili GB") or percent_from_line(t, "Çek Tahsili G.B")
-    out["AYNI ŞUBE ÇEK TAHSİLATI"] = f"{percent_from_line(cek_tahsilat_block, 'Aynı Banka Çeki -')} Asgari Tutar: {amount_from_line(cek_tahsilat_block, 'Aynı Banka Çeki -')} Azami Tutar: {all_amounts_on_line(cek_tahsilat_block, 'Aynı Banka Çeki -')}"
-    out["BAŞKA ŞUBE ÇEK TAHSİLATI"] = percent_from_line(t, "Başka Şube Çek Tahsili")
-    out["BLOKE ÇEK ÖDEME"] = amount_from_line(t, "Bloke Çek Ödeme")
-    out["ÇEK İADE"] = amount_from_line(t, "Çek İade Ücreti")
-    out["BLOKE ÇEK DÜZENLEME"] = f"{percent_from_line(t, 'Çek Düzenleme -')} Asgari Tutar: {amount_from_line(t, 'Çek Düzenleme -')} Azami Tutar: {all_amounts_on_line(t, 'Çek Düzenleme -')}"
-    out["YP ÇEK TAKASA GÖNDERME"] = f"{percent_from_line(t, 'Döviz Çekleri Tahsilatı (Diğer Banka) -')} Asgari Tutar: {amount_from_line(t, 'Döviz Çekleri Tahsilatı (Diğer Banka) -')} Azami Tutar: {all_amounts_on_line(t, 'Döviz Çekleri Tahsilatı (Diğer Banka) -')}"
-    out["ÇEK KARNESİ SAYFA ÜCRETİ"] = amount_from_line(t, "Çek Defteri (Yaprak Başı)")
-
-    # SENET
-    out["SENET TAHSİLE ALMA"] = amount_from_line(t, "Aynı Banka Senet Tahsili -") or amount_from_line(t, "Senet Tahsile Alma")
-    out["MUAMELESİZ SENET İADESİ"] = amount_from_line(t, "Senet İade Ücreti")
-
-    return out
+def three_band_from_block(text, heading_key, channel, idx=None):
+    return _band_prices(text, _chain(_re.escape(heading_key), rf"\|\s*{channel}\s*\|"),
+                        _bands("TRY"), idx or _DumpIndex(text))
 
 # Fallback tolerant to TL/TRY and small label variants; only used when strict value is empty
 _CCY = r"(?:TL|TRY)"
-
-def _amount_from_line_loose(text, label_key):
-    m = _re.search(rf"{_re.escape(label_key)}.*?(\d[\d\.\,]*\s*{_CCY})", text, _re.S | _re.I)
-    return norm_money(m.group(1)) if m else ""
-
-def _three_band_loose(text, heading_keys, channel_aliases):
-    for hk in heading_keys:
-        for ch in channel_aliases:
-            block = _re.search(rf"{_re.escape(hk)}.*?\|\s*{ch}\s*\|.*?(?=(\n---|\Z))", text, _re.S | _re.I)
-            if not block:
-                continue
-            seg = block.group(0)
-            low  = first_group(rf"1\s*{_CCY}\s*-\s*6\.?300\s*{_CCY}.*?\|\s*([\d\.,]+\s*{_CCY})", seg)
-            mid  = first_group(rf"6\.?300,?01\s*{_CCY}\s*-\s*304\.?800\s*{_CCY}.*?\|\s*([\d\.,]+\s*{_CCY})", seg)
-            high = first_group(rf"304\.?800,?01\s*{_CCY}.*?\|\s*([\d\.,]+\s*{_CCY})", seg)
-            parts = [norm_money(x) for x in (low, mid, high) if x]
-            if parts:
-                return " - ".join(parts)
-    return ""
-
-# ── NEW ultra-tolerant helpers (added; used only when strict+loose are empty)
-def _three_band_generic(text, heading_keys, channel_aliases):
-    """
-    Very tolerant: after locating a heading + channel, grab the first three
-    price cells from the 3rd column of subsequent rows (no hard-coded ranges).
-    """
-    for hk in heading_keys:
-        m = _re.search(rf"{_re.escape(hk)}", text, _re.I)
-        if not m:
-            continue
-        tail = text[m.end():]
-
-        chan_match = None
-        for ch in channel_aliases:
-            chan_match = _re.search(rf"^\s*[^\n]*\|\s*{ch}\s*\|", tail, _re.M | _re.I)
-            if chan_match:
-                break
-        if not chan_match:
-            continue
-
-        seg = tail[chan_match.end():]
-        stop = _re.search(
-            rf"^\s*[^\n]*\|\s*(Şube|ATM|İnternet|Internet|Mobil Kanal|Mobil|Çağrı Merkezi|Dijital Kanallar|Dijital)\s*\|"
-            rf"|{_re.escape(hk)}", seg, _re.M | _re.I
-        )
-        if stop:
-            seg = seg[:stop.start()]
-
-        vals = _re.findall(rf"^\s*[^\n]*\|\s*[^\n]*\|\s*([\d\.,]+\s*{_CCY})", seg, _re.M | _re.I)
-        vals = [norm_money(v) for v in vals[:3]]
-        if vals:
-            return " - ".join(vals)
-    return ""
-
-def _sans_oyunlari_loose(text):
-    """
-    Tolerant Şans Oyunları finder:
-    - prefers SUB-HEADING blocks
-    - falls back to any paragraph containing Şans Oyun and Asgari/Azami
-    """
-    block = first_group(r"(SUB-HEADING:\s*Şans[^\n]*?)(?=\n---|\Z)", text, flags=_re.S | _re.I)
-    if not block:
-        block = first_group(r"(Şans\s*Oyun[^\n]*?Asgari.*?Azami.*?)(?=\n---|\Z)", text, flags=_re.S | _re.I)
-    if not block:
-        return ""
-    s_min = first_group(rf"Asgari Tutar.*?\|\s*Azami Tutar.*?\|\s*([\d\.,]+\s*{_CCY})", block, flags=_re.S | _re.I)
-    s_max = first_group(rf"Azami Tutar.*?\|\s*([\d\.,]+\s*{_CCY})", block, flags=_re.S | _re.I)
-    if s_min or s_max:
-        return f"{norm_money(s_min)} - {norm_money(s_max)}".strip(" -")
-    return ""
-
-def parse_dump_with_fallback(path: str) -> dict:
-    base = parse_dump(path).copy()
-    t = _Path(path).read_text(encoding="utf-8", errors="ignore")
-    t = (t.replace("\u00a0", " ")
-           .replace("–", "-").replace("—", "-"))
-
-    def need(k): return not base.get(k)
-
-    # NEW: rescue ŞANS OYUNLARI (e.g., İşbankası variants)
-    if need("ŞANS OYUNLARI"):
-        base["ŞANS OYUNLARI"] = _sans_oyunlari_loose(t) or base.get("ŞANS OYUNLARI", "")
-
-    eft_heads = [
-        "EFT Gönderilmesi - Hesaptan / Hesaba-İsme-Kredi Kartına-Banka Kartına-Ön Ödemeli Karta - EFT Gönderimi",
-        "EFT Gönderilmesi",
-    ]
-    ch_mobil = ["Mobil Kanal", "Mobil"]
-
-    if need("HESAPTAN EFT - Şube"):
-        base["HESAPTAN EFT - Şube"] = _three_band_loose(t, eft_heads, ["Şube"])
-    if need("HESAPTAN EFT - ATM"):
-        base["HESAPTAN EFT - ATM"] = _three_band_loose(t, eft_heads, ["ATM"])
-    if need("HESAPTAN EFT - Mobil"):
-        base["HESAPTAN EFT - Mobil"] = _three_band_loose(t, eft_heads, ch_mobil)
-    if need("DÜZENLİ EFT"):
-        base["DÜZENLİ EFT"] = (_three_band_loose(
-            t,
-            ["EFT Gönderilmesi - Hesaptan / Hesaba-İsme-Kredi Kartına-Banka Kartına-Ön Ödemeli Karta - Düzenli EFT Gönderimi",
-             "Düzenli EFT Gönderimi"],
-            ["İnternet", "Internet"] + ch_mobil
-        ) or base.get("DÜZENLİ EFT", ""))
-
-    # NEW: ultra-tolerant Düzenli EFT rescue (e.g., YKB "Dijital Kanallar")
-    if need("DÜZENLİ EFT"):
-        base["DÜZENLİ EFT"] = (_three_band_generic(
-            t,
-            [
-                "EFT Gönderilmesi - Hesaptan / Hesaba-İsme-Kredi Kartına-Banka Kartına-Ön Ödemeli Karta - Düzenli EFT Gönderimi",
-                "Düzenli EFT Gönderimi",
-                "Düzenli EFT"
-            ],
-            ["İnternet", "Internet", "Mobil Kanal", "Mobil",
-             "İnternet/Mobil", "İnternet - Mobil",
-             "Dijital Kanallar", "Dijital"]
-        ) or base.get("DÜZENLİ EFT", ""))
-
-    hav_heads = [
-        "Havale Gönderilmesi - Hesaptan / Hesaba-İsme-Kredi Kartına-Banka Kartına-Ön Ödemeli Karta - Havale Gönderimi",
-        "Havale Gönderilmesi",
-    ]
-    if need("HESAPTAN HAVALE - Şube"):
-        base["HESAPTAN HAVALE - Şube"] = _three_band_loose(t, hav_heads, ["Şube"])
-    if need("HESAPTAN HAVALE - ATM"):
-        base["HESAPTAN HAVALE - ATM"] = _three_band_loose(t, hav_heads, ["ATM"])
-    if need("HESAPTAN HAVALE - Mobil"):
-        base["HESAPTAN HAVALE - Mobil"] = _three_band_loose(t, hav_heads, ch_mobil)
-    if need("DÜZENLİ HAVALE"):
-        base["DÜZENLİ HAVALE"] = (_three_band_loose(
-            t,
-            ["Havale Gönderilmesi - Hesaptan / Hesaba-İsme-Kredi Kartına-Banka Kartına-Ön Ödemeli Karta - Düzenli Havale Gönderimi",
-             "Düzenli Havale Gönderimi"],
-            ["İnternet", "Internet"] + ch_mobil
-        ) or base.get("DÜZENLİ HAVALE", ""))
-
-    singles = [
-        ("BLOKE ÇEK ÖDEME", "Bloke Çek Ödeme"),
-        ("ÇEK İADE", "Çek İade Ücreti"),
-        ("ÇEK KARNESİ SAYFA ÜCRETİ", "Çek Defteri (Yaprak Başı)"),
-        ("SENET TAHSİLE ALMA", "Senet Tahsile Alma"),
-        ("MUAMELESİZ SENET İADESİ", "Senet İade Ücreti"),
-    ]
-    for key, label in singles:
-        if need(key):
-            base[key] = _amount_from_line_loose(t, label)
-
-    if need("GİDEN SWIFT") and _re.search(r"Western Union|Diğer Aracı", t, _re.I):
-        wu_min = first_group(rf"Western Union.*?Asgari Tutar\s*\|\s*Azami Tutar.*?([\d\.,]+\s*(?:USD|{_CCY}))", t)
-        wu_max = first_group(rf"Western Union.*?Asgari Tutar\s*\|\s*Azami Tutar.*?(?:USD|{_CCY})\s*\|\s*([\d\.,]+\s*(?:USD|{_CCY}))", t)
-        di_min = first_group(rf"Diğer Aracı Firmalar.*?Asgari Tutar\s*\|\s*Azami Tutar.*?([\d\.,]+\s*{_CCY})", t)
-        di_max = first_group(rf"Diğer Aracı Firmalar.*?Asgari Tutar\s*\|\s*Azami Tutar.*?{_CCY}\s*\|\s*([\d\.,]+\s*{_CCY})", t)
-        parts = []
-        if wu_min or wu_max: parts.append(f"WU: {norm_money(wu_min)}–{norm_money(wu_max)}")
-        if di_min or di_max: parts.append(f"Diğer: {norm_money(di_min)}–{norm_money(di_max)}")
-        base["GİDEN SWIFT"] = "; ".join([p for p in parts if p])
-
-    if need("GELEN SWIFT"):
-        g_min = first_group(rf"Uluslararası Para Transferi Ödenmesi.*?Hesaba Gelen - Yurtdışı Bankadan.*?Asgari Tutar\s*\|\s*Azami Tutar.*?([\d\.,]+\s*{_CCY})", t)
-        g_max = first_group(rf"Uluslararası Para Transferi Ödenmesi.*?Hesaba Gelen - Yurtdışı Bankadan.*?Asgari Tutar\s*\|\s*Azami Tutar.*?{_CCY}\s*\|\s*([\d\.,]+\s*{_CCY})", t)
-        if g_min or g_max:
-            base["GELEN SWIFT"] = f"Hesaba: Asgari {norm_money(g_min)} | Azami {norm_money(g_max)}".strip(" |")
-
-    return base
+_MIN_MAX_HEAD = r"Asgari Tutar\s*\|\s*Azami Tutar"
 # ──────────── END: ORIGINAL STRICT PARSER + FALLBACK ─────────────────────────
 
 
-# ──────────────── ZİRAAT-SPECIFIC FILTER (ADDED, NO CHANGES TO ABOVE) ────────
-import re as _zr
-from pathlib import Path as _ZPath
-
+# ──────────────── ZİRAAT-SPECIFIC FILTER (the "ziraat" tier of FIELD_RULES) ──
 # keep your Ziraat helper behavior (TRY formatting)
 _TLZ = "TRY"
 
@@ -607,43 +1602,38 @@ def _norm_money_Z(s: str) -> str:
     if not s:
         return ""
     s = s.replace("TL", _TLZ).replace("\xa0", " ")
-    s = _zr.sub(r"\s+", " ", s.strip())
+    s = _re.sub(r"\s+", " ", s.strip())
     return s
 
-def _first_group_Z(pat, text, flags=_zr.S):
-    m = _zr.search(pat, text, flags)
-    return m.group(1).strip() if m else ""
-
 def _amount_from_line_Z(text, label_key):
-    line_pat = rf"^{_zr.escape(label_key)}.*?(\d[\d\.\,]*\s*{_TLZ})"
-    m = _zr.search(line_pat, text, _zr.M | _zr.S)
-    return _norm_money_Z(m.group(1)) if m else ""
+    hit = _seek(text, _chain(rf"^{_re.escape(label_key)}", rf"(\d[\d\.\,]*\s*{_TLZ})", flags=_re.M | _re.S))
+    return _norm_money_Z(hit[1].group(1)) if hit else ""
 
 def _all_amounts_on_line_Z(text, label_key):
-    line = _first_group_Z(rf"({_zr.escape(label_key)}.*?$)", text, flags=_zr.M)
-    if not line:
+    start = text.find(label_key)
+    if start < 0:
         return ""
-    vals = [_norm_money_Z(v) for v in _zr.findall(rf"(\d[\d\.\,]*\s*{_TLZ}|\d[\d\.\,]*\s*USD)", line)]
+    end = text.find("\n", start + len(label_key))
+    line = text[start:end if end >= 0 else len(text)].strip()
+    vals = [_norm_money_Z(v) for v in _rx(rf"(\d[\d\.\,]*\s*{_TLZ}|\d[\d\.\,]*\s*USD)").findall(line)]
     return " / ".join(vals)
 
 def _percent_from_line_Z(text, label_key):
-    line_pat = rf"^{_zr.escape(label_key)}.*?%[\s]*([\d\.,]+)"
-    m = _zr.search(line_pat, text, _zr.M | _zr.S | _zr.I)
-    return f"%{m.group(1)}" if m else ""
+    hit = _seek(text, _chain(rf"^{_re.escape(label_key)}", r"%[\s]*([\d\.,]+)", flags=_re.M | _re.S | _re.I))
+    return f"%{hit[1].group(1)}" if hit else ""
 
 def _combined_fee_from_line_Z(text, label_key):
-    line_pat = rf"^{_zr.escape(label_key)}\s*\|.*?\|\s*([^\|]+?)\s*\|"
-    line_content = _first_group_Z(line_pat, text, _zr.M | _zr.S)
+    line_content = _seek_group(text, _chain(rf"^{_re.escape(label_key)}\s*\|", r"\|\s*([^\|]+?)\s*\|",
+                                            flags=_re.M | _re.S))
     return _norm_money_Z(line_content) if line_content else ""
 
 def _three_band_from_block_Z(text, heading_key, channel):
-    start_pat = rf"{_zr.escape(heading_key)}\s*\|\s*{channel}\s*\|"
-    m = _zr.search(start_pat, text)
+    m = _rx(rf"{_re.escape(heading_key)}\s*\|\s*{channel}\s*\|").search(text)
     if not m:
         return ""
     tail = text[m.end():]
-    stop_pat = rf"(?:^\s*1\s*{_TLZ}\s*-\s*|^\s*[\d\.,]+,01\s*{_TLZ}\s*-|\n){_zr.escape(heading_key)}|^\s*[^\n]*\|\s*(Şube|ATM|İnternet|Mobil Kanal|Çağrı Merkezi)\s*\|"
-    stop = _zr.search(stop_pat, tail, flags=_zr.M)
+    stop_pat = rf"(?:^\s*1\s*{_TLZ}\s*-\s*|^\s*[\d\.,]+,01\s*{_TLZ}\s*-|\n){_re.escape(heading_key)}|^\s*[^\n]*\|\s*(Şube|ATM|İnternet|Mobil Kanal|Çağrı Merkezi)\s*\|"
+    stop = _rx(stop_pat, _re.M).search(tail)
     seg = tail[:stop.start()] if stop else tail
 
     band_pats = [
@@ -653,100 +1643,420 @@ def _three_band_from_block_Z(text, heading_key, channel):
     ]
     amounts = []
     for pat in band_pats:
-        v = _first_group_Z(pat, seg, flags=_zr.M)
-        if v:
-            amounts.append(_norm_money_Z(v))
+        v = _rx(pat, _re.M).search(seg)
+        if v and v.group(1).strip():
+            amounts.append(_norm_money_Z(v.group(1).strip()))
     return " - ".join(amounts)
+# ───────────────────────── END ZİRAAT-SPECIFIC FILTER ─────────────────────────
 
-def parse_dump_ziraat(path: str) -> dict:
-    t = _ZPath(path).read_text(encoding="utf-8", errors="ignore")
-    out = {}
-
-    # ŞANS OYUNLARI
-    so_block = _first_group_Z(r"(SUB-HEADING: Şans Oyunu Ödemeleri Aracılık.*?)(?=\n---|\Z)", t)
-    s_min = _first_group_Z(r"Asgari Tutar\s*\|\s*Azami Tutar.*?\|\s*([\d\.,]+\s*TRY)", so_block)
-    s_max = _first_group_Z(r"Azami Tutar.*?\|\s*([\d\.,]+\s*TRY)", so_block)
-    so = f"{_norm_money_Z(s_min)} - {_norm_money_Z(s_max)}".strip(" -")
-    if so:
-        out["ŞANS OYUNLARI"] = so
-
-    # EFT
-    eft_base_heading = "EFT Gönderilmesi - Hesaptan / Hesaba-İsme-Kredi Kartına-Banka Kartına-Ön Ödemeli Karta - EFT Gönderimi"
-    out["HESAPTAN EFT - Şube"]  = _three_band_from_block_Z(t, eft_base_heading, "Şube")
-    out["HESAPTAN EFT - ATM"]   = _three_band_from_block_Z(t, eft_base_heading, "ATM")
-    out["HESAPTAN EFT - Mobil"] = _three_band_from_block_Z(t, eft_base_heading, "Mobil Kanal")
-    out["DÜZENLİ EFT"]          = _three_band_from_block_Z(t, "EFT Gönderilmesi - Hesaptan / Hesaba-İsme-Kredi Kartına-Banka Kartına-Ön Ödemeli Karta - Düzenli EFT Gönderimi", "Mobil Kanal")
-
-    fatura_block = _first_group_Z(r"(SUB-HEADING: Fatura Ödeme / Kurum Ödeme - Anlık Ödemeler.*?)(?=\n---|\Z)", t)
-    if fatura_block:
-        fee = _first_group_Z(r"HEADERS:.*?-\s*\|\s*\|\s*([\d\.,]+\s*TRY)", fatura_block)
-        out["KREDİ KARTINDAN FATURA ÖDEME"] = f"{fee} (Kredi kartı ile ödemelerde ek olarak nakit avans faizi uygulanır.)"
-
-    # HAVALE
-    havale_base_heading = "Havale Gönderilmesi - Hesaptan  / Hesaba-İsme-Kredi Kartına-Banka Kartına-Ön Ödemeli Karta - Havale Gönderimi"
-    out["HESAPTAN HAVALE - Şube"]  = _three_band_from_block_Z(t, havale_base_heading, "Şube")
-    out["HESAPTAN HAVALE - ATM"]   = _three_band_from_block_Z(t, havale_base_heading, "ATM")
-    out["HESAPTAN HAVALE - Mobil"] = _three_band_from_block_Z(t, havale_base_heading, "Mobil Kanal")
-    out["DÜZENLİ HAVALE"]          = _three_band_from_block_Z(t, "Havale Gönderilmesi - Kasadan / Hesaba-İsme-Kredi Kartına-Banka Kartına-Ön Ödemeli Karta-Cebe - Düzenli Havale Gönderimi", "Şube")
-
-    # SWIFT
-    swift_block = _first_group_Z(r"(SUB-HEADING: Uluslararası Para transferi.*?)(?=\n---|\Z)", t)
-    if swift_block:
-        from_cash = _percent_from_line_Z(swift_block, "Kasadan - Hesaba")
-        from_acct = _percent_from_line_Z(swift_block, "Hesaptan - Hesaba")
-        from_web = _all_amounts_on_line_Z(swift_block, "Hesaptan - Hesaba | İnternet")
+
+# ──────────────────── FIELD RULES: EVERY TIER OF EVERY FIELD ─────────────────
+# One entry per template row, listing its tiers in the order they are tried:
+#   strict  - exact headings on the raw dump (the original parser)
+#   loose   - heading/channel aliases, TL or TRY, on the normalized dump
+#   generic - ultra-tolerant band grab (e.g. YKB "Dijital Kanallar")
+#   ziraat  - Ziraat's own layout; only requested for Ziraat
+# A field stops at the first tier that yields a value, so a bank whose strict
+# rules all hit never builds the normalized text or runs a fallback pattern.
+TIERS = ("strict", "loose", "generic", "ziraat")
+ZIRAAT_LABEL = "Türkiye Cumhuriyeti Ziraat Bankası A.Ş."
+
+EFT_SEND = "EFT Gönderilmesi - Hesaptan / Hesaba-İsme-Kredi Kartına-Banka Kartına-Ön Ödemeli Karta - EFT Gönderimi"
+EFT_REGULAR = "EFT Gönderilmesi - Hesaptan / Hesaba-İsme-Kredi Kartına-Banka Kartına-Ön Ödemeli Karta - Düzenli EFT Gönderimi"
+HAVALE_SEND = "Havale Gönderilmesi - Hesaptan / Hesaba-İsme-Kredi Kartına-Banka Kartına-Ön Ödemeli Karta - Havale Gönderimi"
+HAVALE_REGULAR = "Havale Gönderilmesi - Hesaptan / Hesaba-İsme-Kredi Kartına-Banka Kartına-Ön Ödemeli Karta - Düzenli Havale Gönderimi"
+HAVALE_SEND_Z = "Havale Gönderilmesi - Hesaptan  / Hesaba-İsme-Kredi Kartına-Banka Kartına-Ön Ödemeli Karta - Havale Gönderimi"
+HAVALE_REGULAR_Z = "Havale Gönderilmesi - Kasadan / Hesaba-İsme-Kredi Kartına-Banka Kartına-Ön Ödemeli Karta-Cebe - Düzenli Havale Gönderimi"
+
+CH_MOBIL = ["Mobil Kanal", "Mobil"]
+CH_WEB = ["İnternet", "Internet"] + CH_MOBIL
+CH_DIGITAL = CH_WEB + ["İnternet/Mobil", "İnternet - Mobil", "Dijital Kanallar", "Dijital"]
+
+SANS = "Şans Oyunu Ödemeleri Aracılık"
+CEK_TAHSILAT = "Çek Tahsilat Ücreti"
+CEK_DEFTERI = "Çek Defteri ve Çek Düzenleme Ücreti"
+
+def _loose(**params):
+    return dict(params, ccy=_CCY, icase=True)
+
+FIELD_RULES = {
+    "ŞANS OYUNLARI": [
+        ("strict", "min_max", dict(head=SANS)),
+        ("loose", "sans_loose", {}),
+        ("ziraat", "min_max_z", dict(sub=SANS)),
+    ],
+    "HESAPTAN EFT - Şube": [
+        ("strict", "bands", dict(heads=[EFT_SEND], channels=["Şube"])),
+        ("loose", "bands", _loose(heads=[EFT_SEND, "EFT Gönderilmesi"], channels=["Şube"])),
+        ("ziraat", "bands_z", dict(head=EFT_SEND, channel="Şube")),
+    ],
+    "HESAPTAN EFT - ATM": [
+        ("strict", "bands", dict(heads=[EFT_SEND], channels=["ATM"])),
+        ("loose", "bands", _loose(heads=[EFT_SEND, "EFT Gönderilmesi"], channels=["ATM"])),
+        ("ziraat", "bands_z", dict(head=EFT_SEND, channel="ATM")),
+    ],
+    "HESAPTAN EFT - Mobil": [
+        ("strict", "bands", dict(heads=[EFT_SEND], channels=["Mobil Kanal"])),
+        ("loose", "bands", _loose(heads=[EFT_SEND, "EFT Gönderilmesi"], channels=CH_MOBIL)),
+        ("ziraat", "bands_z", dict(head=EFT_SEND, channel="Mobil Kanal")),
+    ],
+    "DÜZENLİ EFT": [
+        ("strict", "bands", dict(heads=[EFT_REGULAR], channels=["İnternet", "Mobil Kanal"])),
+        ("loose", "bands", _loose(heads=[EFT_REGULAR, "Düzenli EFT Gönderimi"], channels=CH_WEB)),
+        ("generic", "bands_any", dict(heads=[EFT_REGULAR, "Düzenli EFT Gönderimi", "Düzenli EFT"], channels=CH_DIGITAL)),
+        ("ziraat", "bands_z", dict(head=EFT_REGULAR, channel="Mobil Kanal")),
+    ],
+    "KREDİ KARTINDAN FATURA ÖDEME": [
+        ("strict", "percent", dict(labels=["Fatura Ödeme / Kurum Ödeme - Düzenli Ödemeler"])),
+        ("ziraat", "fatura_z", dict(sub="Fatura Ödeme / Kurum Ödeme - Anlık Ödemeler")),
+    ],
+    "HESAPTAN HAVALE - Şube": [
+        ("strict", "bands", dict(heads=[HAVALE_SEND], channels=["Şube"])),
+        ("loose", "bands", _loose(heads=[HAVALE_SEND, "Havale Gönderilmesi"], channels=["Şube"])),
+        ("ziraat", "bands_z", dict(head=HAVALE_SEND_Z, channel="Şube")),
+    ],
+    "HESAPTAN HAVALE - ATM": [
+        ("strict", "bands", dict(heads=[HAVALE_SEND], channels=["ATM"])),
+        ("loose", "bands", _loose(heads=[HAVALE_SEND, "Havale Gönderilmesi"], channels=["ATM"])),
+        ("ziraat", "bands_z", dict(head=HAVALE_SEND_Z, channel="ATM")),
+    ],
+    "HESAPTAN HAVALE - Mobil": [
+        ("strict", "bands", dict(heads=[HAVALE_SEND], channels=["Mobil Kanal"])),
+        ("loose", "bands", _loose(heads=[HAVALE_SEND, "Havale Gönderilmesi"], channels=CH_MOBIL)),
+        ("ziraat", "bands_z", dict(head=HAVALE_SEND_Z, channel="Mobil Kanal")),
+    ],
+    "DÜZENLİ HAVALE": [
+        ("strict", "bands", dict(heads=[HAVALE_REGULAR], channels=["İnternet", "Mobil Kanal"])),
+        ("loose", "bands", _loose(heads=[HAVALE_REGULAR, "Düzenli Havale Gönderimi"], channels=CH_WEB)),
+        ("ziraat", "bands_z", dict(head=HAVALE_REGULAR_Z, channel="Şube")),
+    ],
+    "GİDEN SWIFT": [
+        ("strict", "swift_out", dict(wu_ccy="USD", other_ccy="TRY")),
+        ("loose", "swift_out", dict(wu_ccy=rf"(?:USD|{_CCY})", other_ccy=_CCY, guard=True)),
+        ("ziraat", "swift_z", dict(part="out")),
+    ],
+    "GELEN SWIFT": [
+        ("strict", "swift_in", dict(ccy="TRY")),
+        ("loose", "swift_in", dict(ccy=_CCY)),
+    ],
+    "GİDEN SWIFT - Mobil": [
+        ("strict", "swift_mobile", {}),
+        ("ziraat", "swift_z", dict(part="mobile")),
+    ],
+    "ÇEK TAHSİLİ BAŞKA BANKA": [
+        ("strict", "rate_min_max", dict(label="Diğer Banka Çeki -", sub=CEK_TAHSILAT)),
+        ("ziraat", "amount_z", dict(label="Diğer Banka Çeki -", sub=CEK_TAHSILAT)),
+    ],
+    "ÇEK TAHSİLİ GB": [
+        ("strict", "percent", dict(labels=["Çek Tahsili GB", "Çek Tahsili G.B"])),
+    ],
+    "AYNI ŞUBE ÇEK TAHSİLATI": [
+        ("strict", "rate_min_max", dict(label="Aynı Banka Çeki -", sub=CEK_TAHSILAT)),
+        ("ziraat", "amount_z", dict(label="Aynı Banka Çeki -", sub=CEK_TAHSILAT)),
+    ],
+    "BAŞKA ŞUBE ÇEK TAHSİLATI": [
+        ("strict", "percent", dict(labels=["Başka Şube Çek Tahsili"])),
+    ],
+    "BLOKE ÇEK ÖDEME": [
+        ("strict", "amount", dict(labels=["Bloke Çek Ödeme"])),
+        ("loose", "amount", _loose(labels=["Bloke Çek Ödeme"])),
+    ],
+    "ÇEK İADE": [
+        ("strict", "amount", dict(labels=["Çek İade Ücreti"])),
+        ("loose", "amount", _loose(labels=["Çek İade Ücreti"])),
+    ],
+    "BLOKE ÇEK DÜZENLEME": [
+        ("strict", "rate_min_max", dict(label="Çek Düzenleme -")),
+        ("ziraat", "percent_z", dict(label="Çek Düzenleme -", sub=CEK_DEFTERI)),
+    ],
+    "YP ÇEK TAKASA GÖNDERME": [
+        ("strict", "rate_min_max", dict(label="Döviz Çekleri Tahsilatı (Diğer Banka) -")),
+    ],
+    "ÇEK KARNESİ SAYFA ÜCRETİ": [
+        ("strict", "amount", dict(labels=["Çek Defteri (Yaprak Başı)"])),
+        ("loose", "amount", _loose(labels=["Çek Defteri (Yaprak Başı)"])),
+        ("ziraat", "amount_z", dict(label="Çek Defteri (Yaprak Başı)", sub=CEK_DEFTERI)),
+    ],
+    "SENET TAHSİLE ALMA": [
+        ("strict", "amount", dict(labels=["Aynı Banka Senet Tahsili -", "Senet Tahsile Alma"])),
+        ("loose", "amount", _loose(labels=["Senet Tahsile Alma"])),
+        ("ziraat", "combined_z", dict(label="Aynı Banka Senet Tahsili -", sub="Senet Tahsile Alma Ücreti")),
+    ],
+    "MUAMELESİZ SENET İADESİ": [
+        ("strict", "amount", dict(labels=["Senet İade Ücreti"])),
+        ("loose", "amount", _loose(labels=["Senet İade Ücreti"])),
+    ],
+}
+
+# ── extractor kinds: each compiles its patterns once and returns fn(_DumpIndex) -> str
+def _x_bands(heads, channels, ccy="TRY", icase=False):
+    flags = _re.S | (_re.I if icase else 0)
+    blocks = [_chain(_re.escape(h), rf"\|\s*{ch}\s*\|", flags=flags) for h in heads for ch in channels]
+    bands = _bands(ccy)
+    def run(idx):
+        for block in blocks:
+            v = _band_prices(idx.text, block, bands, idx)
+            if v:
+                return v
+        return ""
+    return run
+
+def _x_bands_any(heads, channels):
+    """After a heading + channel, the first three 3rd-column prices (no hard-coded ranges)."""
+    channel_alt = "Şube|ATM|İnternet|Internet|Mobil Kanal|Mobil|Çağrı Merkezi|Dijital Kanallar|Dijital"
+    starts = [(_rx(_re.escape(h), _re.I),
+               _rx(rf"^\s*[^\n]*\|\s*({channel_alt})\s*\||{_re.escape(h)}", _re.M | _re.I)) for h in heads]
+    chans = [_rx(rf"^\s*[^\n]*\|\s*{ch}\s*\|", _re.M | _re.I) for ch in channels]
+    prices = _rx(rf"^\s*[^\n]*\|\s*[^\n]*\|\s*([\d\.,]+\s*{_CCY})", _re.M | _re.I)
+    def run(idx):
+        for head, stop_re in starts:
+            m = head.search(idx.text)
+            if not m:
+                continue
+            tail = idx.text[m.end():]
+            chan_match = None
+            for chan in chans:
+                chan_match = chan.search(tail)
+                if chan_match:
+                    break
+            if not chan_match:
+                continue
+            seg = tail[chan_match.end():]
+            stop = stop_re.search(seg)
+            if stop:
+                seg = seg[:stop.start()]
+            vals = [norm_money(v) for v in prices.findall(seg)[:3]]
+            if vals:
+                return " - ".join(vals)
+        return ""
+    return run
+
+def _x_amount(labels, ccy="TRY", icase=False):
+    flags = _re.S | (_re.I if icase else 0)
+    chains = [_chain(_re.escape(l), rf"(\d[\d\.\,]*\s*{ccy})", flags=flags) for l in labels]
+    def run(idx):
+        for c in chains:
+            hit = _seek(idx.text, c)
+            if hit and norm_money(hit[1].group(1)):
+                return norm_money(hit[1].group(1))
+        return ""
+    return run
+
+def _x_percent(labels):
+    def run(idx):
+        for label in labels:
+            v = percent_from_line(idx.text, label)
+            if v:
+                return v
+        return ""
+    return run
+
+def _x_rate_min_max(label, sub=None):
+    def run(idx):
+        t = idx.sub_block(sub) if sub else idx.text
+        return f"{percent_from_line(t, label)} Asgari Tutar: {amount_from_line(t, label)} Azami Tutar: {all_amounts_on_line(t, label)}"
+    return run
+
+def _x_min_max(head):
+    lo = _chain(_re.escape(head), "Asgari Tutar", _AMOUNT_TRY)
+    hi = _chain(_re.escape(head), "Azami Tutar", _AMOUNT_TRY)
+    def run(idx):
+        return f"{norm_money(_seek_group(idx.text, lo))} - {norm_money(_seek_group(idx.text, hi))}".strip(" -")
+    return run
+
+def _x_sans_loose():
+    """SUB-HEADING "Şans..." blocks first, else any paragraph with Şans Oyun and Asgari/Azami."""
+    sub = _rx(r"(SUB-HEADING:\s*Şans[^\n]*?)(?=\n---|\Z)", _re.S | _re.I)
+    para, asgari, azami = _rx(r"Şans\s*Oyun", _re.I), _rx("Asgari", _re.I), _rx("Azami", _re.I)
+    lo = _chain("Asgari Tutar", r"\|\s*Azami Tutar", rf"\|\s*([\d\.,]+\s*{_CCY})", flags=_re.S | _re.I)
+    hi = _chain("Azami Tutar", rf"\|\s*([\d\.,]+\s*{_CCY})", flags=_re.S | _re.I)
+
+    def paragraph(idx):
+        # "Şans\s*Oyun[^\n]*?Asgari.*?Azami.*?(?=\n---|\Z)": Asgari on the same line
+        t = idx.text
+        for m in para.finditer(t):
+            eol = t.find("\n", m.end())
+            a = asgari.search(t, m.end(), eol if eol >= 0 else len(t))
+            if not a:
+                continue
+            z = azami.search(t, a.end())
+            return t[m.start():idx.block_end(z.end())].strip() if z else ""
+        return ""
+
+    def run(idx):
+        m = sub.search(idx.text)
+        block = (m.group(1).strip() if m else "") or paragraph(idx)
+        if not block:
+            return ""
+        s_min, s_max = _seek_group(block, lo), _seek_group(block, hi)
+        if s_min or s_max:
+            return f"{norm_money(s_min)} - {norm_money(s_max)}".strip(" -")
+        return ""
+    return run
+
+def _x_swift_out(wu_ccy, other_ccy, guard=False):
+    wu_min = _chain("Western Union", _MIN_MAX_HEAD, rf"([\d\.,]+\s*{wu_ccy})")
+    wu_max = _chain("Western Union", _MIN_MAX_HEAD, rf"{wu_ccy}\s*\|\s*([\d\.,]+\s*{wu_ccy})")
+    di_min = _chain("Diğer Aracı Firmalar", _MIN_MAX_HEAD, rf"([\d\.,]+\s*{other_ccy})")
+    di_max = _chain("Diğer Aracı Firmalar", _MIN_MAX_HEAD, rf"{other_ccy}\s*\|\s*([\d\.,]+\s*{other_ccy})")
+    present = _rx(r"Western Union|Diğer Aracı", _re.I)
+    def run(idx):
+        t = idx.text
+        if guard and not present.search(t):
+            return ""
+        parts = []
+        lo, hi = _seek_group(t, wu_min), _seek_group(t, wu_max)
+        if lo or hi: parts.append(f"WU: {norm_money(lo)}–{norm_money(hi)}")
+        lo, hi = _seek_group(t, di_min), _seek_group(t, di_max)
+        if lo or hi: parts.append(f"Diğer: {norm_money(lo)}–{norm_money(hi)}")
+        return "; ".join(parts)
+    return run
+
+def _x_swift_in(ccy):
+    head = ("Uluslararası Para Transferi Ödenmesi", "Hesaba Gelen - Yurtdışı Bankadan", _MIN_MAX_HEAD)
+    g_min = _chain(*head, rf"([\d\.,]+\s*{ccy})")
+    g_max = _chain(*head, rf"{ccy}\s*\|\s*([\d\.,]+\s*{ccy})")
+    def run(idx):
+        lo, hi = _seek_group(idx.text, g_min), _seek_group(idx.text, g_max)
+        if lo or hi:
+            return f"Hesaba: Asgari {norm_money(lo)} | Azami {norm_money(hi)}".strip(" |")
+        return ""
+    return run
+
+def _x_swift_mobile():
+    block = _chain("Uluslararası Para transferi", "Hesaptan - Hesaba", "Mobil Kanal")
+    amounts = _rx(r"(\d[\d\.,]+\s*TRY)")
+    def run(idx):
+        hit = _seek(idx.text, block)
+        if not hit:
+            return ""
+        seg = idx.text[hit[0]:idx.block_end(hit[1].end())]
+        vals = [norm_money(m) for m in amounts.findall(seg)]
+        return f"{vals[0]} - {vals[1]}" if len(vals) >= 2 else ""
+    return run
+
+def _x_bands_z(head, channel):
+    return lambda idx: _three_band_from_block_Z(idx.text, head, channel)
+
+def _x_amount_z(label, sub):
+    return lambda idx: _amount_from_line_Z(idx.sub_block(sub), label)
+
+def _x_percent_z(label, sub):
+    return lambda idx: _percent_from_line_Z(idx.sub_block(sub), label)
+
+def _x_combined_z(label, sub):
+    return lambda idx: _combined_fee_from_line_Z(idx.sub_block(sub), label)
+
+def _x_min_max_z(sub):
+    lo = _chain(_MIN_MAX_HEAD, r"\|\s*([\d\.,]+\s*TRY)")
+    hi = _chain("Azami Tutar", r"\|\s*([\d\.,]+\s*TRY)")
+    def run(idx):
+        block = idx.sub_block(sub)
+        return f"{_norm_money_Z(_seek_group(block, lo))} - {_norm_money_Z(_seek_group(block, hi))}".strip(" -")
+    return run
+
+def _x_fatura_z(sub):
+    fee_chain = _chain("HEADERS:", r"-\s*\|\s*\|\s*([\d\.,]+\s*TRY)")
+    def run(idx):
+        block = idx.sub_block(sub)
+        if not block:
+            return ""
+        return f"{_seek_group(block, fee_chain)} (Kredi kartı ile ödemelerde ek olarak nakit avans faizi uygulanır.)"
+    return run
+
+def _x_swift_z(part):
+    def run(idx):
+        block = idx.sub_block("Uluslararası Para transferi")
+        if not block:
+            return ""
+        from_web = _all_amounts_on_line_Z(block, "Hesaptan - Hesaba | İnternet")
+        if part == "mobile":
+            return from_web
+        from_cash = _percent_from_line_Z(block, "Kasadan - Hesaba")
+        from_acct = _percent_from_line_Z(block, "Hesaptan - Hesaba")
         parts = []
         if from_cash: parts.append(f"Şube (Kasadan): {from_cash}")
         if from_acct: parts.append(f"Şube (Hesaptan): {from_acct}")
         if from_web: parts.append(f"İnternet: {from_web}")
-        out["GİDEN SWIFT"] = "; ".join(parts)
-        out["GİDEN SWIFT - Mobil"] = from_web
-
-    out["GELEN SWIFT"] = ""
-
-    # ÇEK
-    cek_tahsilat_block = _first_group_Z(r"(SUB-HEADING: Çek Tahsilat Ücreti.*?)(?=\n---|\Z)", t)
-    out["ÇEK TAHSİLİ BAŞKA BANKA"] = _amount_from_line_Z(cek_tahsilat_block, 'Diğer Banka Çeki -')
-    out["ÇEK TAHSİLİ GB"]           = ""
-    out["AYNI ŞUBE ÇEK TAHSİLATI"] = _amount_from_line_Z(cek_tahsilat_block, 'Aynı Banka Çeki -')
-    out["BAŞKA ŞUBE ÇEK TAHSİLATI"] = ""
-    out["BLOKE ÇEK ÖDEME"]         = ""
-    out["ÇEK İADE"]                = ""
-
-    cek_duzenleme_block = _first_group_Z(r"(SUB-HEADING: Çek Defteri ve Çek Düzenleme Ücreti.*?)(?=\n---|\Z)", t)
-    out["BLOKE ÇEK DÜZENLEME"]     = _percent_from_line_Z(cek_duzenleme_block, 'Çek Düzenleme -')
-    out["YP ÇEK TAKASA GÖNDERME"]   = ""
-    out["ÇEK KARNESİ SAYFA ÜCRETİ"] = _amount_from_line_Z(cek_duzenleme_block, "Çek Defteri (Yaprak Başı)")
-
-    # SENET
-    senet_tahsil_block = _first_group_Z(r"(SUB-HEADING: Senet Tahsile Alma Ücreti.*?)(?=\n---|\Z)", t)
-    out["SENET TAHSİLE ALMA"]       = _combined_fee_from_line_Z(senet_tahsil_block, "Aynı Banka Senet Tahsili -")
-    out["MUAMELESİZ SENET İADESİ"]  = ""
+        return "; ".join(parts)
+    return run
+
+_EXTRACTORS = {
+    "bands": _x_bands, "bands_any": _x_bands_any, "amount": _x_amount, "percent": _x_percent,
+    "rate_min_max": _x_rate_min_max, "min_max": _x_min_max, "sans_loose": _x_sans_loose,
+    "swift_out": _x_swift_out, "swift_in": _x_swift_in, "swift_mobile": _x_swift_mobile,
+    "bands_z": _x_bands_z, "amount_z": _x_amount_z, "percent_z": _x_percent_z,
+    "combined_z": _x_combined_z, "min_max_z": _x_min_max_z, "fatura_z": _x_fatura_z,
+    "swift_z": _x_swift_z,
+}
 
-    return out
-# ───────────────────────── END ZİRAAT-SPECIFIC FILTER ─────────────────────────
+class _DumpText:
+    """The views tiers read: the raw dump, and a normalized copy built on first use."""
+    _NORMALIZED = ("loose", "generic")
+
+    def __init__(self, text):
+        self.raw = _DumpIndex(text)
+        self._norm = None
+
+    def view(self, tier):
+        if tier not in self._NORMALIZED:
+            return self.raw
+        if self._norm is None:
+            t = self.raw.text.replace("\u00a0", " ").replace("–", "-").replace("—", "-")
+            self._norm = _DumpIndex(t)
+        return self._norm
+
+class FieldRules:
+    """FIELD_RULES compiled once; parse() walks each field's tiers and stops at the first hit."""
+    def __init__(self, rules):
+        self.fields = {
+            field: [(tier, _EXTRACTORS[kind](**params)) for tier, kind, params in tiers]
+            for field, tiers in rules.items()
+        }
+
+    def parse(self, text, tiers=TIERS) -> dict:
+        doc = _DumpText(text)
+        out = {}
+        for field, compiled in self.fields.items():
+            value = None
+            for tier, run in compiled:
+                if tier not in tiers:
+                    continue
+                value = run(doc.view(tier))
+                if value:
+                    break
+            if value is not None:
+                out[field] = value
+        return out
+
+_FIELDS = FieldRules(FIELD_RULES)
+
+def tiers_for(bank_label):
+    return TIERS if bank_label == ZIRAAT_LABEL else TIERS[:-1]
+
+def _decode_dump(data: bytes) -> str:
+    # same text read_text(encoding="utf-8", errors="ignore") gives (universal newlines)
+    return data.decode("utf-8", errors="ignore").replace("\r\n", "\n").replace("\r", "\n")
+
+def _read_dump(path):
+    return _decode_dump(_Path(path).read_bytes())
 
+def parse_dump(path: str) -> dict:
+    return _FIELDS.parse(_read_dump(path), ("strict",))
 
-# ───────────────────────────── NEW: GLUE LOGIC ───────────────────────────────
-def _header_col_map(ws):
-    m = {}
-    for col in range(1, ws.max_column + 1):
-        v = ws.cell(1, col).value
-        if isinstance(v, str):
-            m[v.strip()] = col
-    return m
-
-def _row_map(ws):
-    rm = {}
-    for r in range(2, ws.max_row + 1):
-        sec = ws.cell(r, 1).value
-        sub = ws.cell(r, 2).value or ""
-        if sub:
-            rm[sub] = r
-        elif sec == "ŞANS OYUNLARI":
-            rm["ŞANS OYUNLARI"] = r
-    return rm
+def parse_dump_with_fallback(path: str) -> dict:
+    return _FIELDS.parse(_read_dump(path), ("strict", "loose", "generic"))
+
+def parse_dump_ziraat(path: str) -> dict:
+    return _FIELDS.parse(_read_dump(path), ("ziraat",))
+
+def parse_bank_dump(path: str, bank_label: str) -> dict:
+    """Every tier that applies to this bank (Ziraat's own layout last, for Ziraat only)."""
+    return _FIELDS.parse(_read_dump(path), tiers_for(bank_label))
+# ──────────────────── END FIELD RULES ────────────────────────────────────────
 
+
+# ───────────────────────────── NEW: GLUE LOGIC ───────────────────────────────
 ROW_ORDER = [
     "ŞANS OYUNLARI",
     "HESAPTAN EFT - Şube","HESAPTAN EFT - ATM","HESAPTAN EFT - Mobil","DÜZENLİ EFT",
@@ -771,54 +2081,884 @@ TEMPLATE_BANK_MAP = {
     "QNB Bank A.Ş.": "FINASNBANK",   # template header is spelled FINASNBANK
 }
 
-def _fill_excel_from_dumps(output_path="Benchmark_Results.xlsx"):
-    wb = build_benchmark_template()
-    ws = wb.active
+_LEGAL_SUFFIX = re.compile(r"\s+(?:T\.\s*A\.\s*[ŞO]|A\.\s*Ş)\.?$")
 
-    hmap = _header_col_map(ws)
-    rmap = _row_map(ws)
+def bank_headers(bank_labels):
+    """
+    {bank_label: column header}: TEMPLATE_BANK_MAP's header, else the label in
+    capitals without its legal suffix ("Şekerbank T.A.Ş." -> "ŞEKERBANK").
+    """
+    out, taken = {}, set(TEMPLATE_BANK_MAP.values())
+    for bank_label in bank_labels:
+        header = TEMPLATE_BANK_MAP.get(bank_label)
+        if header is None:
+            name = _LEGAL_SUFFIX.sub("", bank_label.strip())
+            header = base = name.replace("i", "İ").upper()
+            n = 1
+            while header in taken:
+                n += 1
+                header = f"{base} ({n})"
+            taken.add(header)
+        out[bank_label] = header
+    return out
 
-    for bank_label in list_of_banks:
-        header_name = TEMPLATE_BANK_MAP.get(bank_label)
-        if not header_name:
-            print(f"[WARN] No template header mapping for bank: {bank_label}")
-            continue
-        col = hmap.get(header_name)
-        if not col:
-            print(f"[WARN] Header '{header_name}' not found in sheet.")
+def _all_headers(labels):
+    """BANK_HEADERS, as in the template, then one column per other bank."""
+    return BANK_HEADERS + [h for h in labels.values() if h not in BANK_HEADERS]
+
+# ── FEE HISTORY: each run's ROW_ORDER values per bank, appended, never overwritten
+from datetime import timezone
+
+HISTORY_DB = os.environ.get("HISTORY_DB", "fee_history.sqlite")
+
+_HISTORY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fee_history (
+    run_at    TEXT NOT NULL,    -- UTC, ISO-8601 (sorts as a date)
+    bank      TEXT NOT NULL,    -- scraped bank label
+    field     TEXT NOT NULL,    -- ROW_ORDER key
+    value     TEXT NOT NULL,
+    dump_hash TEXT NOT NULL     -- sha256 of the dump the value was parsed from
+);
+CREATE INDEX IF NOT EXISTS ix_fee_history ON fee_history (bank, field, run_at);
+-- newest value per (bank, field), kept current on append
+CREATE TABLE IF NOT EXISTS fee_series (
+    bank        TEXT NOT NULL,
+    field       TEXT NOT NULL,
+    last_run_at TEXT NOT NULL,
+    last_value  TEXT NOT NULL,
+    PRIMARY KEY (bank, field)
+) WITHOUT ROWID;
+-- one row per value change, so change queries never walk the full history
+CREATE TABLE IF NOT EXISTS fee_changes (
+    run_at    TEXT NOT NULL,
+    bank      TEXT NOT NULL,
+    field     TEXT NOT NULL,
+    old_value TEXT NOT NULL,
+    new_value TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_fee_changes_run ON fee_changes (run_at);
+CREATE INDEX IF NOT EXISTS ix_fee_changes_series ON fee_changes (bank, field, run_at);
+"""
+
+class _FeeHistory:
+    def __init__(self, path=HISTORY_DB):
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(_HISTORY_SCHEMA)
+
+    def append(self, run_at, bank_label, dump_hash, values):
+        """
+        Record the bank's values as scraped at run_at; False, and nothing
+        recorded, when its newest run already came from the same dump.
+        """
+        last = self.conn.execute(
+            "SELECT dump_hash FROM fee_history WHERE bank = ? AND field = ? ORDER BY run_at DESC, rowid DESC LIMIT 1",
+            (bank_label, ROW_ORDER[0])).fetchone()
+        if last is not None and last[0] == dump_hash:
+            return False
+        with self.conn:
+            for key in ROW_ORDER:
+                value = values.get(key, "")
+                self.conn.execute("INSERT INTO fee_history VALUES (?, ?, ?, ?, ?)",
+                                  (run_at, bank_label, key, value, dump_hash))
+                last = self.conn.execute(
+                    "SELECT last_run_at, last_value FROM fee_series WHERE bank = ? AND field = ?",
+                    (bank_label, key)).fetchone()
+                if last is not None and run_at < last[0]:
+                    self._rebuild(bank_label, key)   # an archived run landed out of order
+                    continue
+                if last is not None and value != last[1]:
+                    self.conn.execute("INSERT INTO fee_changes VALUES (?, ?, ?, ?, ?)",
+                                      (run_at, bank_label, key, last[1], value))
+                self.conn.execute("INSERT OR REPLACE INTO fee_series VALUES (?, ?, ?, ?)",
+                                  (bank_label, key, run_at, value))
+        return True
+
+    def _rebuild(self, bank_label, key):
+        self.conn.execute("DELETE FROM fee_changes WHERE bank = ? AND field = ?", (bank_label, key))
+        prev = None
+        for run_at, value in self.conn.execute(
+                "SELECT run_at, value FROM fee_history WHERE bank = ? AND field = ? ORDER BY run_at, rowid",
+                (bank_label, key)).fetchall():
+            if prev is not None and value != prev:
+                self.conn.execute("INSERT INTO fee_changes VALUES (?, ?, ?, ?, ?)",
+                                  (run_at, bank_label, key, prev, value))
+            prev = value
+        self.conn.execute("INSERT OR REPLACE INTO fee_series VALUES (?, ?, ?, ?)",
+                          (bank_label, key, run_at, value))
+
+    def close(self):
+        self.conn.close()
+
+def _history_query(sql, params, bank_label, field, db, alias="s"):
+    # optional bank/field filters fill {where}
+    where = ["1"]
+    if bank_label is not None:
+        where.append(f"{alias}.bank = :bank")
+    if field is not None:
+        where.append(f"{alias}.field = :field")
+    conn = sqlite3.connect(db)
+    try:
+        conn.executescript(_HISTORY_SCHEMA)
+        return conn.execute(sql.format(where=" AND ".join(where)),
+                            dict(params, bank=bank_label, field=field)).fetchall()
+    finally:
+        conn.close()
+
+def fee_latest(bank_label=None, field=None, db=HISTORY_DB):
+    """{(bank, field): (run_at, value)} from the newest run."""
+    rows = _history_query("SELECT bank, field, last_run_at, last_value FROM fee_series s WHERE {where}",
+                          {}, bank_label, field, db)
+    return {(bank, f): (run_at, value) for bank, f, run_at, value in rows}
+
+def fee_as_of(when, bank_label=None, field=None, db=HISTORY_DB):
+    """
+    {(bank, field): (run_at, value)} as last recorded on or before `when`
+    ("YYYY-MM-DD" covers that whole day; a full timestamp is exact).
+    """
+    rows = _history_query(
+        "SELECT s.bank, s.field, h.run_at, h.value FROM fee_series s"
+        " JOIN fee_history h ON h.rowid = ("
+        "  SELECT rowid FROM fee_history WHERE bank = s.bank AND field = s.field"
+        "  AND run_at <= :when ORDER BY run_at DESC, rowid DESC LIMIT 1)"
+        " WHERE {where}",
+        {"when": when + "\U0010ffff"}, bank_label, field, db)
+    return {(bank, f): (run_at, value) for bank, f, run_at, value in rows}
+
+def fee_changes(start, end, bank_label=None, field=None, db=HISTORY_DB):
+    """
+    Every value change recorded after `start` and up to `end` (same date rules
+    as fee_as_of): [(run_at, bank, field, old_value, new_value), ...].
+    """
+    return _history_query(
+        "SELECT run_at, bank, field, old_value, new_value FROM fee_changes c"
+        " WHERE {where} AND run_at > :start AND run_at <= :end ORDER BY run_at, bank, field",
+        {"start": start + "\U0010ffff", "end": end + "\U0010ffff"}, bank_label, field, db, alias="c")
+
+# ── RUN DIFF: this run's values against the newest ones in the fee history
+# The parse stage writes its report here, every run
+CHANGES_FILE = os.environ.get("CHANGES_FILE", "run_changes.json")
+CHANGES_SHOWN = 40    # report lines printed; CHANGES_FILE always has every cell
+
+def diff_values(previous, current):
+    """
+    previous = fee_latest() result, current = {bank: {ROW_ORDER key: value}}
+    -> [{"bank", "field", "change", "old", "new"}, ...] for every cell that
+    is "added" (empty before; old is None if never seen), "removed" (now
+    empty) or "changed". Only banks in current are compared.
+    """
+    out = []
+    for bank_label, values in current.items():
+        for key in ROW_ORDER:
+            old = previous.get((bank_label, key), (None, None))[1]
+            new = values.get(key, "")
+            if (old or "") == new:
+                continue
+            change = "added" if not old else "removed" if not new else "changed"
+            out.append({"bank": bank_label, "field": key, "change": change, "old": old, "new": new})
+    return out
+
+def report_changes(changes, since=None, path=CHANGES_FILE):
+    """Print the diff compactly (a whole new bank is one line) and write it to path."""
+    counts = {c: sum(1 for ch in changes if ch["change"] == c) for c in ("changed", "added", "removed")}
+    if path:
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"since": since, **counts, "cells": changes}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, path)
+    if not changes:
+        print(f"[DIFF] No fee changed since {since or 'the last run'}")
+        return
+    print(f"[DIFF] {counts['changed']} changed, {counts['added']} added, {counts['removed']} removed"
+          f" since {since or 'the last run'}")
+    lines, by_bank = [], {}
+    for ch in changes:
+        by_bank.setdefault(ch["bank"], []).append(ch)
+    for bank_label, chs in by_bank.items():
+        if len(chs) > 1 and all(ch["old"] is None for ch in chs):
+            lines.append(f"  + {bank_label}: {len(chs)} values, none before")
             continue
+        for ch in chs:
+            mark = {"added": "+", "removed": "-", "changed": "~"}[ch["change"]]
+            lines.append(f"  {mark} {bank_label} / {ch['field']}: {ch['old']!r} -> {ch['new']!r}")
+    for line in lines[:CHANGES_SHOWN]:
+        print(line)
+    if len(lines) > CHANGES_SHOWN:
+        print(f"  ... and {len(lines) - CHANGES_SHOWN} more in {path or 'the diff'}")
+
+# ── FEE CATALOG: every dumped row as a typed record, not just the ROW_ORDER fields
+# Filled by the parse stage for each dump that changed; CATALOG_DB="" turns it off
+CATALOG_DB = os.environ.get("CATALOG_DB", "fee_catalog.sqlite")
+
+_CATALOG_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fee_catalog (
+    bank        TEXT NOT NULL,
+    tab         TEXT NOT NULL,
+    section     TEXT,
+    sub_heading TEXT,
+    label       TEXT,       -- product; carried down the rows of a multi-band product
+    channel     TEXT,
+    currency    TEXT,       -- TRY / USD / EUR / GBP (TL is stored as TRY)
+    band_lo     INTEGER,    -- transaction amount band; NULL band_hi = open-ended
+    band_hi     INTEGER,
+    amount      INTEGER,    -- money columns in kuruş / cents
+    minimum     INTEGER,
+    maximum     INTEGER,
+    percent     REAL,
+    raw         TEXT NOT NULL   -- the row as dumped
+);
+CREATE INDEX IF NOT EXISTS ix_fee_catalog_bank ON fee_catalog (bank, label, channel);
+CREATE INDEX IF NOT EXISTS ix_fee_catalog_label ON fee_catalog (label, channel);
+CREATE INDEX IF NOT EXISTS ix_fee_catalog_sub ON fee_catalog (bank, sub_heading);
+CREATE TABLE IF NOT EXISTS catalog_dumps (
+    bank      TEXT PRIMARY KEY,
+    dump_hash TEXT NOT NULL,    -- dump the bank's records were built from
+    code      TEXT NOT NULL     -- _CODE_FINGERPRINT of the code that built them
+);
+"""
+# a database made with another _CATALOG_SCHEMA is dropped and rebuilt
+_CATALOG_VERSION = int(hashlib.sha1(_CATALOG_SCHEMA.encode("utf-8")).hexdigest()[:7], 16)
+
+class FeeRecord:
+    """One dumped fee row, typed. Money is in kuruş / cents (int), percent a float."""
+    __slots__ = ("bank", "tab", "section", "sub_heading", "label", "channel", "currency",
+                 "band_lo", "band_hi", "amount", "minimum", "maximum", "percent", "raw")
+
+    def __init__(self, *values):
+        for name, v in zip(self.__slots__, values + (None,) * (len(self.__slots__) - len(values))):
+            setattr(self, name, v)
+
+    def astuple(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __repr__(self):
+        fields = ", ".join(f"{n}={getattr(self, n)!r}" for n in self.__slots__[4:-1] if getattr(self, n) is not None)
+        return f"FeeRecord({self.bank!r}, {fields})"
+
+_CAT_MONEY = re.compile(r"(\d{1,3}(?:\.\d{3})+(?:,\d+)?|\d+(?:,\d+)?)\s*(TRY|TL|USD|EUR|GBP)\b")
+_CAT_BAND = re.compile(rf"^\s*{_CAT_MONEY.pattern}\s*[-–—]\s*(?:{_CAT_MONEY.pattern})?\s*$")
+_CAT_PERCENT = re.compile(r"%\s*(\d+(?:,\d+)?)|(\d+(?:,\d+)?)\s*%")
+_CAT_ROLES = [
+    ("channel", re.compile(r"kanal", re.I)),
+    ("band", re.compile(r"işlem tutarı|tutar aralığı", re.I)),
+    ("percent", re.compile(r"oran", re.I)),
+    ("minimum", re.compile(r"asgari|en az", re.I)),
+    ("maximum", re.compile(r"azami|en fazla", re.I)),
+    ("amount", re.compile(r"ücret|tutar|masraf", re.I)),
+]
 
-        dump_file = f"fees_{safe_name(bank_label)}.txt"
+def _cat_role(text):
+    """What a header (or an inline "Asgari Tutar"-style cell) names; None if it names nothing known."""
+    if any(ch.isdigit() for ch in text):
+        return None
+    return next((role for role, rx in _CAT_ROLES if rx.search(text)), None)
+
+def _minor(num):
+    """'1.250,00' -> 125000 (kuruş / cents)"""
+    from decimal import Decimal
+    return int((Decimal(num.replace(".", "").replace(",", ".")) * 100).to_integral_value())
+
+def _split_cells(cells):
+    # " | ".join() of an empty cell dumps as "a | | b", which splits back as ["a", "| b"]
+    out = []
+    for c in cells:
+        while c.startswith("|"):
+            out.append("")
+            c = c[1:].lstrip()
+        tail = 0
+        while c.endswith("|"):
+            tail += 1
+            c = c[:-1].rstrip()
+        out += [c] + [""] * tail
+    return out
+
+def _row_record(bank_label, tab, t, roles, cells, prev):
+    # the rows after a multi-band product's first one only carry the band and
+    # fee (or inline "Asgari Tutar | Azami Tutar" labels and their values)
+    if prev is not None and len(cells) < len(roles) and \
+            (not cells[0] or _CAT_MONEY.search(cells[0]) or _cat_role(cells[0]) in ("minimum", "maximum")):
+        cells = ([prev.label, prev.channel] if roles[1:2] == ["channel"] else [prev.label]) + cells
+    rec = FeeRecord(bank_label, tab, t["section"], t["sub_heading"], cells[0] or None)
+    rec.raw = " | ".join(cells)
+    start = 1
+    if len(roles) > 1 and roles[1] == "channel" and len(cells) > 1:
+        rec.channel, start = cells[1] or None, 2
+    pending = []    # inline labels waiting for the money cells after them
+    fee_ccy = band_ccy = None
+    for i, cell in enumerate(cells[start:], start):
+        if not cell:
+            continue
+        role = roles[i] if i < len(roles) else None
+        band, money, pct = _CAT_BAND.match(cell), _CAT_MONEY.search(cell), _CAT_PERCENT.search(cell)
+        if band:
+            rec.band_lo = _minor(band.group(1))
+            rec.band_hi = _minor(band.group(3)) if band.group(3) else None
+            band_ccy = band_ccy or band.group(2)
+        elif money:
+            if pending:
+                role = pending.pop(0)
+            elif role not in ("amount", "minimum", "maximum") or getattr(rec, role) is not None:
+                role = "amount" if rec.amount is None else "maximum"
+            setattr(rec, role, _minor(money.group(1)))
+            fee_ccy = fee_ccy or money.group(2)
+        elif pct:
+            rec.percent = float((pct.group(1) or pct.group(2)).replace(",", "."))
+        elif _cat_role(cell) in ("amount", "minimum", "maximum", "percent"):
+            pending.append(_cat_role(cell))
+    ccy = fee_ccy or band_ccy
+    rec.currency = "TRY" if ccy == "TL" else ccy
+    return rec
+
+def catalog_records(bank_label, text):
+    """Every table row of one fees_<bank>.txt as FeeRecords."""
+    for tab in read_dump_tables(text)[1]:
+        for t in tab["tables"]:
+            roles = [_cat_role(h) if i else "label" for i, h in enumerate(t["headers"])]
+            prev = None
+            for cells in t["rows"]:
+                if cells[0].startswith("HEADERS: "):
+                    continue    # a second header row
+                prev = _row_record(bank_label, tab["title"], t, roles, _split_cells(cells), prev)
+                yield prev
+
+def update_catalog(dumps, db=CATALOG_DB):
+    """
+    dumps = [(bank_label, dump_path, dump_hash)]: rebuild the records of every
+    bank whose dump, or the code that normalizes it, differs from the one its
+    records came from.
+    """
+    conn = sqlite3.connect(db)
+    try:
+        if conn.execute("PRAGMA user_version").fetchone()[0] != _CATALOG_VERSION:
+            conn.executescript("DROP TABLE IF EXISTS fee_catalog; DROP TABLE IF EXISTS catalog_dumps;")
+            conn.execute(f"PRAGMA user_version = {_CATALOG_VERSION}")
+        conn.executescript(_CATALOG_SCHEMA)
+        known = {bank: (h, code) for bank, h, code in conn.execute("SELECT bank, dump_hash, code FROM catalog_dumps")}
+        banks = records = 0
+        for bank_label, dump_path, dump_hash in dumps:
+            if known.get(bank_label) == (dump_hash, _CODE_FINGERPRINT):
+                continue
+            rows = [r.astuple() for r in catalog_records(bank_label, _read_dump(dump_path))]
+            with conn:
+                conn.execute("DELETE FROM fee_catalog WHERE bank = ?", (bank_label,))
+                conn.executemany(f"INSERT INTO fee_catalog VALUES ({', '.join('?' * len(FeeRecord.__slots__))})", rows)
+                conn.execute("INSERT OR REPLACE INTO catalog_dumps VALUES (?, ?, ?)",
+                             (bank_label, dump_hash, _CODE_FINGERPRINT))
+            banks += 1
+            records += len(rows)
+    finally:
+        conn.close()
+    print(f"[OK] Fee catalog: {banks} of {len(dumps)} banks rebuilt ({records} records) -> {db}")
+
+def query_fees(bank_label=None, label=None, channel=None, sub_heading=None, db=CATALOG_DB):
+    """
+    FeeRecords from the catalog through its indexes; label and sub_heading
+    match as prefixes, channel exactly.
+        query_fees("Akbank T.A.Ş.", label="EFT Gönderilmesi", channel="Mobil")
+    """
+    sql, args = f"SELECT {', '.join(FeeRecord.__slots__)} FROM fee_catalog WHERE 1", []
+    if bank_label is not None:
+        sql += " AND bank = ?"
+        args.append(bank_label)
+    for col, prefix in (("label", label), ("sub_heading", sub_heading)):
+        if prefix is not None:
+            sql += f" AND {col} >= ? AND {col} < ?"
+            args += [prefix, prefix + "\U0010ffff"]
+    if channel is not None:
+        sql += " AND channel = ?"
+        args.append(channel)
+    conn = sqlite3.connect(db)
+    try:
+        return [FeeRecord(*row) for row in conn.execute(sql + " ORDER BY rowid", args)]
+    finally:
+        conn.close()
+
+# ── NUMERIC LAYER: ROW_ORDER display strings as numbers, compared across banks
+from array import array
+from decimal import Decimal
+from functools import lru_cache
+
+_NUM_BOUND = re.compile(rf"(Asgari|Azami)(?: Tutar)?:?\s*{_CAT_MONEY.pattern}")
+_NUM_PERCENT = re.compile(r"%\s*(\d+(?:,\d+)?)")
+# "1.250,00 TL–5 TL" is a lower–upper range; " - " separates band fees
+_NUM_RANGE = re.compile(rf"{_CAT_MONEY.pattern}\s*[–—]\s*{_CAT_MONEY.pattern}")
+# "0-10.000 TL: 5 TL", "10.000+ TL": an amount band's threshold, not a fee
+_NUM_THRESHOLD = re.compile(r"\s*[:+]")
+FEE_KINDS = ("percent", "bands", "minimum", "maximum")    # what a value is compared on, in this order
+
+def _dec(num):
+    """'1.250,00' -> Decimal('1250.00')"""
+    return Decimal(num.replace(".", "").replace(",", "."))
+
+class FeeValue:
+    """
+    One ROW_ORDER cell in numbers: its TL fee amounts in order (bands), the
+    percentage, Asgari/Azami bounds (or a range's ends), and amounts in
+    other currencies.
+    """
+    __slots__ = ("bands", "percent", "minimum", "maximum", "other")
+
+    def __init__(self, bands=(), percent=None, minimum=None, maximum=None, other=()):
+        self.bands, self.percent, self.minimum, self.maximum, self.other = bands, percent, minimum, maximum, other
+
+    @property
+    def kind(self):
+        """The first of FEE_KINDS this value has; None when it has no number at all."""
+        return next((k for k in FEE_KINDS if getattr(self, k) not in (None, ())), None)
+
+    @property
+    def shape(self):
+        """kind, with the band count for bands ("bands/3"); only cells of one shape are ranked together."""
+        kind = self.kind
+        return f"bands/{len(self.bands)}" if kind == "bands" else kind
+
+    def key(self):
+        """The number banks are ranked on: the percentage, else the mean band, else the bounds."""
+        kind = self.kind
+        if kind == "bands":
+            return sum(self.bands) / len(self.bands)
+        return None if kind is None else getattr(self, kind)
+
+@lru_cache(maxsize=1 << 16)
+def parse_fee(text):
+    """
+    norm_money-style display string -> FeeValue with Decimal amounts, e.g.
+    "5,50 TL - 10,00 TL - 50,00 TL" or "%0,5 Asgari Tutar: 8,50 TL Azami Tutar: 50 TL".
+    Cached: the same strings recur across banks, runs and the history.
+    """
+    text = text or ""
+    minimum = maximum = None
+    for m in _NUM_BOUND.finditer(text):
+        if m.group(3) in ("TL", "TRY"):
+            if m.group(1) == "Asgari":
+                minimum = minimum if minimum is not None else _dec(m.group(2))
+            else:
+                maximum = maximum if maximum is not None else _dec(m.group(2))
+    rest = _NUM_BOUND.sub(" ", text)
+    bands, other = [], []
+    for m in _NUM_RANGE.finditer(rest):
+        if m.group(2) in ("TL", "TRY") and m.group(4) in ("TL", "TRY"):
+            minimum = minimum if minimum is not None else _dec(m.group(1))
+            maximum = maximum if maximum is not None else _dec(m.group(3))
+        else:
+            other += [(m.group(2), _dec(m.group(1))), (m.group(4), _dec(m.group(3)))]
+    rest = _NUM_RANGE.sub(" ", rest)
+    for m in _CAT_MONEY.finditer(rest):
+        if _NUM_THRESHOLD.match(rest, m.end()):
+            continue
+        if m.group(2) in ("TL", "TRY"):
+            bands.append(_dec(m.group(1)))
+        else:
+            other.append((m.group(2), _dec(m.group(1))))
+    pct = _NUM_PERCENT.search(text)
+    return FeeValue(tuple(bands), _dec(pct.group(1)) if pct else None, minimum, maximum, tuple(other))
+
+class FeeMatrix:
+    """
+    bank x field x band float matrix in one flat array("d") (NaN = no value),
+    the bank x field comparison keys and FeeValue shapes beside it, and the
+    Decimal FeeValues.
+    """
+    __slots__ = ("banks", "fields", "n_bands", "amounts", "keys", "shapes", "values")
+
+    def __init__(self, values_by_bank, fields=ROW_ORDER):
+        self.banks, self.fields = list(values_by_bank), list(fields)
+        nan = float("nan")
+        self.values = [[parse_fee(values_by_bank[b].get(f, "")) for f in self.fields] for b in self.banks]
+        self.n_bands = max((len(v.bands) for row in self.values for v in row), default=0) or 1
+        nb, nf = self.n_bands, len(self.fields)
+        self.amounts = array("d", [nan]) * (len(self.banks) * nf * nb)
+        self.keys = array("d", [nan]) * (len(self.banks) * nf)
+        self.shapes = [None] * (len(self.banks) * nf)
+        for bi, row in enumerate(self.values):
+            for fi, v in enumerate(row):
+                base = (bi * nf + fi) * nb
+                for j, amount in enumerate(v.bands):
+                    self.amounts[base + j] = float(amount)
+                key = v.key()
+                if key is not None:
+                    self.keys[bi * nf + fi] = float(key)
+                    self.shapes[bi * nf + fi] = v.shape
+
+    def band(self, bank_index, field_index):
+        base = (bank_index * len(self.fields) + field_index) * self.n_bands
+        return self.amounts[base:base + self.n_bands]
+
+    def column(self, field_index):
+        """(shape, [(key, bank)]) for the banks whose value has the field's most common shape."""
+        nf = len(self.fields)
+        shapes = [self.shapes[bi * nf + field_index] for bi in range(len(self.banks))]
+        present = [sh for sh in shapes if sh]
+        if not present:
+            return None, []
+        shape = max(dict.fromkeys(present), key=present.count)    # ties: the first bank's
+        return shape, [(self.keys[bi * nf + field_index], b) for bi, b in enumerate(self.banks) if shapes[bi] == shape]
+
+def _quantile(sorted_keys, q):
+    return sorted_keys[max(0, math.ceil(q * len(sorted_keys)) - 1)]
+
+def compare_banks(values_by_bank, fields=ROW_ORDER):
+    """
+    {bank: {field: display string}} -> {field: {"shape", "min", "max",
+    "cheapest", "priciest", "rank", "outliers"}} for every field at least two
+    banks have values of the same shape for; banks with another shape are
+    left out. rank is 1 for the cheapest (ties share a rank); outliers lie
+    beyond Tukey's fences (1.5 x IQR).
+    """
+    m = FeeMatrix(values_by_bank, fields)
+    stats = {}
+    for fi, field in enumerate(m.fields):
+        shape, col = m.column(fi)
+        col.sort()
+        if len(col) < 2:
+            continue
+        keys = [k for k, _ in col]
+        lo, hi = keys[0], keys[-1]
+        rank, r = {}, 0
+        for i, (k, b) in enumerate(col):
+            if i == 0 or k != keys[i - 1]:
+                r = i + 1
+            rank[b] = r
+        q1, q3 = _quantile(keys, 0.25), _quantile(keys, 0.75)
+        fence = 1.5 * (q3 - q1)
+        stats[field] = {
+            "shape": shape, "min": lo, "max": hi, "rank": rank,
+            "cheapest": [b for k, b in col if k == lo] if lo != hi else [],
+            "priciest": [b for k, b in col if k == hi] if lo != hi else [],
+            "outliers": [b for k, b in col if fence and (k < q1 - fence or k > q3 + fence)],
+        }
+    return stats
+
+def _marks(stats):
+    """{field: {bank: named style}} for the cheapest and most expensive cells."""
+    return {field: {**{b: "bm_priciest" for b in st["priciest"]}, **{b: "bm_cheapest" for b in st["cheapest"]}}
+            for field, st in stats.items()}
+
+# ── HISTORY WORKBOOK: the fee history streamed to .xlsx in write-only mode
+HISTORY_XLSX = os.environ.get("HISTORY_XLSX", "Fee_History.xlsx")
+HISTORY_LAYOUTS = ("runs", "fields")
+
+def write_history_workbook(output_path=HISTORY_XLSX, layout="runs", db=HISTORY_DB):
+    """
+    layout="runs": one BENCHMARK sheet per run date (UTC), newest first, with
+    each bank's values from its last run that day.
+    layout="fields": one long sheet, a block of runs per ROW_ORDER field with
+    the banks as columns; values that changed since the bank's previous run
+    are highlighted.
+    Rows go from the SQLite cursor straight to disk, so memory stays flat
+    however many runs the history holds.
+    """
+    from openpyxl import Workbook
+    from openpyxl.styles import NamedStyle, PatternFill
+
+    if layout not in HISTORY_LAYOUTS:
+        raise ValueError(f"layout must be one of {HISTORY_LAYOUTS}, not {layout!r}")
+    wb = Workbook(write_only=True)
+    _add_named_styles(wb)
+    wb.add_named_style(NamedStyle("bm_changed", fill=PatternFill("solid", fgColor="FFF2CC")))
+    conn = sqlite3.connect(db)
+    try:
+        conn.executescript(_HISTORY_SCHEMA)
+        if layout == "runs":
+            n = _history_by_run_date(wb, conn)
+            what = f"{n} run dates"
+        else:
+            n = _history_by_field(wb, conn)
+            what = f"{n} field/run rows"
+    finally:
+        conn.close()
+    wb.save(output_path)
+    print(f"[OK] Fee history ({what}) -> {output_path}")
+
+def _history_by_run_date(wb, conn):
+    labels = bank_headers(list(TEMPLATE_BANK_MAP) + [b for (b,) in conn.execute(
+        "SELECT DISTINCT bank FROM fee_series ORDER BY bank") if b not in TEMPLATE_BANK_MAP])
+    headers = _all_headers(labels)
+    _add_named_styles(wb, headers)
+    # a bank is only recorded when its dump changed, so each day's sheet
+    # carries every bank's values as of that day; written newest first
+    days, day, state = [], None, {}
+    rows = conn.execute("SELECT run_at, bank, field, value FROM fee_history ORDER BY run_at, rowid")
+    for run_at, bank_label, field, value in rows:
+        if run_at[:10] != day:
+            if day is not None:
+                days.append((day, {h: dict(col) for h, col in state.items()}))
+            day = run_at[:10]
+        state.setdefault(labels[bank_label], {})[field] = value
+    if day is not None:
+        days.append((day, state))
+    for day, columns in reversed(days):
+        _write_benchmark_sheet(wb.create_sheet(day), f"BENCHMARKING-{day}", columns, headers,
+                               _marks(compare_banks(columns)))
+    return len(days)
+
+def _history_series(conn, bank_label, field, col):
+    for run_at, value in conn.execute(
+            "SELECT run_at, value FROM fee_history WHERE bank = ? AND field = ? ORDER BY run_at, rowid",
+            (bank_label, field)):
+        yield run_at, col, value
+
+def _history_by_field(wb, conn):
+    import heapq
+    from itertools import groupby
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.utils import get_column_letter
+
+    banks = list(TEMPLATE_BANK_MAP)
+    banks += [b for (b,) in conn.execute("SELECT DISTINCT bank FROM fee_series ORDER BY bank") if b not in banks]
+    labels = bank_headers(banks)
+    headers = [labels[b] for b in banks]
+    _add_named_styles(wb, headers)
+
+    ws = wb.create_sheet("HISTORY")
+    ws.column_dimensions["A"].width = 34
+    ws.column_dimensions["B"].width = 22
+    for col_idx in range(3, 3 + len(banks)):
+        ws.column_dimensions[get_column_letter(col_idx)].width = 18
+    ws.freeze_panes = "C2"
+    head = []
+    for title, style in [("FIELD", "bm_title"), ("RUN (UTC)", "bm_title")] + [(h, f"bm_bank_{h}") for h in headers]:
+        c = WriteOnlyCell(ws, value=title)
+        c.style = style
+        head.append(c)
+    ws.append(head)
+
+    # plain values for the bulk of the sheet; only changes carry a style, on
+    # one refilled cell per column (see _write_benchmark_sheet)
+    changed = {}
+    n = 0
+    for field in ROW_ORDER:
+        prev = [None] * len(banks)
+        # every bank's series for this field, merged on run time through the
+        # (bank, field, run_at) index
+        series = heapq.merge(*(_history_series(conn, b, field, i) for i, b in enumerate(banks)))
+        for run_at, group in groupby(series, key=lambda t: t[0]):
+            row = [field, run_at] + [None] * len(banks)
+            for _, i, value in group:
+                if prev[i] is not None and value != prev[i]:
+                    c = changed.get(i)
+                    if c is None:
+                        c = changed[i] = WriteOnlyCell(ws)
+                        c.style = "bm_changed"
+                    c.value = value
+                    row[2 + i] = c
+                else:
+                    row[2 + i] = value
+                prev[i] = value
+            ws.append(row)
+            n += 1
+    return n
+
+# Worker processes for the parse stage (1 = parse in this process). Each dump
+# is read and hashed once here; only the cache misses go to the pool, with the
+# bytes they were hashed from, so a worker never touches the file again.
+PARSE_WORKERS = max(1, int(os.environ.get("PARSE_WORKERS", str(os.cpu_count() or 1)) or 1))
+
+def _parse_job(job):
+    path, bank_label, data = job
+    return path, _FIELDS.parse(_decode_dump(data), tiers_for(bank_label))
+
+def parse_dumps(jobs, cache=None, workers=PARSE_WORKERS):
+    """
+    Parse [(bank_label, dump_path), ...] -> {dump_path: (sha256, values)}.
+    Missing dumps are skipped with a [WARN]; archived runs can be passed in bulk.
+    """
+    out, hashes, misses = {}, {}, []
+    for bank_label, path in jobs:
         try:
-            values = parse_dump_with_fallback(dump_file)
+            data = _Path(path).read_bytes()
         except FileNotFoundError:
-            print(f"[WARN] Dump not found: {dump_file} (skipping)")
+            print(f"[WARN] Dump not found: {path} (skipping)")
             continue
+        hashes[path] = hashlib.sha256(data).hexdigest()
+        # unchanged dump -> reuse last run's parsed values
+        values = cache.get(path, hashes[path]) if cache else None
+        if values is None:
+            misses.append((path, bank_label, data))
+        else:
+            out[path] = (hashes[path], values)
+
+    workers = min(workers, len(misses))
+    results = None
+    if workers > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                chunk = max(1, len(misses) // (workers * 4))
+                results = list(pool.map(_parse_job, misses, chunksize=chunk))
+        except (OSError, NotImplementedError) as e:
+            print(f"[WARN] Parse pool unavailable ({e}); parsing in-process")
+            workers = 1
+    if results is None:
+        results = [_parse_job(job) for job in misses]
+
+    for path, values in results:
+        out[path] = (hashes[path], values)
+        if cache:
+            cache.put(path, hashes[path], values)
+    print(f"[OK] Parsed {len(misses)} dumps with {max(workers, 1)} worker(s), "
+          f"{len(out) - len(misses)} unchanged")
+    return out
 
-        # ── overlay Ziraat-specific values ONLY for Ziraat (fill blanks only)
-        if bank_label == "Türkiye Cumhuriyeti Ziraat Bankası A.Ş.":
-            z_vals = parse_dump_ziraat(dump_file)
-            for k, v in z_vals.items():
-                if v and not values.get(k):
-                    values[k] = v
+# parse_stage() leaves its values here so render_stage() can run on its own
+PARSED_FILE = os.environ.get("PARSED_FILE", "parsed_fees.json")
+
+def parse_stage(banks=None, parsed_file=PARSED_FILE):
+    """
+    fees_<bank>.txt -> {bank_label: {"dump", "hash", "values"}} in bank_roster()
+    order, for every bank (or only those in banks) with a dump on disk.
+    Appends the run to the fee history, reports diff_values() against the
+    previous run and writes parsed_file.
+    """
+    parse_cache = _Cache("parsed")
+    jobs = [(bank_label, f"fees_{safe_name(bank_label)}.txt") for bank_label in bank_roster()
+            if banks is None or bank_label in banks]
+
+    # strict -> loose -> generic (-> ziraat, for Ziraat only), per field
+    results = parse_dumps(jobs, parse_cache)
+    previous = fee_latest()
+    history = _FeeHistory()
+    run_at = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    parsed, recorded = {}, 0
+    for bank_label, dump_file in jobs:
+        if dump_file not in results:
+            continue
+        dump_hash, values = results[dump_file]
+        # stamped with when the dump was scraped, not when it was parsed; a
+        # rerun or a reused dump adds nothing
+        scraped_at = datetime.fromtimestamp(os.path.getmtime(dump_file), timezone.utc)
+        recorded += history.append(scraped_at.strftime("%Y-%m-%dT%H:%M:%SZ"), bank_label, dump_hash, values)
+        parsed[bank_label] = {"dump": dump_file, "hash": dump_hash, "values": values}
 
         # NEW: Print the filtered results BEFORE writing to cells
-        print(f"\n[PREVIEW] {bank_label} -> column '{header_name}' (from {dump_file})")
+        print(f"\n[PREVIEW] {bank_label} (from {dump_file})")
         for key in ROW_ORDER:
             v = values.get(key, "")
             print(f"  {key}: {v if v else '(empty)'}")
         print("[/PREVIEW]\n")
-
-        for key in ROW_ORDER:
-            row = rmap.get(key)
-            if not row:
-                continue
-            ws.cell(row=row, column=col).value = values.get(key, "")
-
-        print(f"[OK] Filled column '{header_name}' from {dump_file}")
-
+        _progress("bank_parsed", bank=bank_label, filled=sum(1 for key in ROW_ORDER if values.get(key)))
+
+    history.close()
+    print(f"[OK] Fee history: {recorded} of {len(parsed)} banks recorded, the rest already were")
+    parse_cache.save()
+    diff = diff_values(previous, {b: e["values"] for b, e in parsed.items()})
+    report_changes(diff, since=max((run_at for run_at, _ in previous.values()), default=None))
+    if CATALOG_DB:
+        update_catalog([(b, e["dump"], e["hash"]) for b, e in parsed.items()])
+    if parsed_file:
+        tmp = parsed_file + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"run_at": run_at, "banks": parsed}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, parsed_file)
+        print(f"[OK] Parsed values of {len(parsed)} banks -> {parsed_file}")
+    return parsed
+
+def render_stage(parsed=None, output_path="Benchmark_Results.xlsx", parsed_file=PARSED_FILE, force=False):
+    """
+    Fill the template from parse_stage()'s result (read from parsed_file if
+    not given) and save it. Unless force, an output_path last rendered from
+    the same banks, headers, title year and values is left as it is; returns
+    whether the workbook was written.
+    """
+    if parsed is None:
+        with open(parsed_file, encoding="utf-8") as f:
+            parsed = json.load(f)["banks"]
+
+    # the template's nine columns, then one per other bank (see bank_headers)
+    labels = bank_headers(parsed)
+    headers = _all_headers(labels)
+    columns = {}
+    for bank_label, entry in parsed.items():
+        header_name = labels[bank_label]
+        values = entry["values"]
+        columns[header_name] = {key: values.get(key, "") for key in ROW_ORDER}
+        print(f"[OK] Filled column '{header_name}' from {entry['dump']}")
+
+    # everything the workbook is made of; the code itself is in _Cache's fingerprint
+    title = f"BENCHMARKING-{datetime.now().year}"
+    render_key = hashlib.sha256(json.dumps([title, labels, headers, columns], ensure_ascii=False,
+                                           sort_keys=True).encode("utf-8")).hexdigest()
+    rendered = _Cache("rendered")
+    last = rendered.get(output_path, render_key)
+    if not force and last is not None and last == _sha256_file(output_path):
+        print(f"[OK] Workbook not rebuilt; {output_path} would be unchanged (--force-render to rebuild)")
+        _progress("done", output=output_path, unchanged=True)
+        return False
+
+    stats = compare_banks(columns)
+    for field, st in stats.items():
+        for header_name in st["outliers"]:
+            print(f"[WARN] Outlier: {header_name} {field} = {columns[header_name][field]!r}")
+    print(f"[OK] Compared {len(columns)} banks on {len(stats)} fields (cheapest green, most expensive red)")
+
+    # one pass, straight to disk: nothing is styled or filled after the fact
+    from openpyxl import Workbook
+    wb = Workbook(write_only=True)
+    _add_named_styles(wb, headers)
+    _write_benchmark_sheet(wb.create_sheet("BENCHMARK"), title, columns, headers, _marks(stats))
     wb.save(output_path)
+    rendered.put(output_path, render_key, _sha256_file(output_path))
+    rendered.save()
     print(f"[DONE] Saved filled workbook -> {output_path}")
-
+    _progress("done", output=output_path)
+    return True
+
+def _fill_excel_from_dumps(output_path="Benchmark_Results.xlsx", banks=None):
+    """banks limits the columns filled (e.g. to the usable banks scrape_stage() returns)."""
+    render_stage(parse_stage(banks), output_path)
+
+STAGES = ("scrape", "parse", "render", "history")
+DEFAULT_STAGES = STAGES[:3]   # "history" only runs when asked for
+
+def main(argv=None):
+    import argparse
+    ap = argparse.ArgumentParser(description="Scrape the fee tables, parse the dumps and render the workbook")
+    ap.add_argument("stages", nargs="*", metavar="stage",
+                    help="scrape, parse, render and/or history; always run in that order "
+                         "(default: scrape parse render)")
+    ap.add_argument("--output", default="Benchmark_Results.xlsx")
+    ap.add_argument("--history-output", default=HISTORY_XLSX)
+    ap.add_argument("--history-layout", choices=HISTORY_LAYOUTS, default="runs",
+                    help="one sheet per run date, or one long sheet per field")
+    ap.add_argument("--bank", action="append", metavar="NAME",
+                    help="scrape only this bank (repeatable); the other banks keep their checkpointed dumps")
+    ap.add_argument("--all-banks", action="store_true", default=ALL_BANKS,
+                    help=f"scrape every bank #bankList offers and remember them in {BANKS_FILE}")
+    ap.add_argument("--resume", action="store_true",
+                    help=f"only scrape banks {MANIFEST_FILE} does not list as done; reuse the other dumps")
+    ap.add_argument("--force-render", action="store_true",
+                    help="render even when the workbook would come out as it was last rendered")
+    args = ap.parse_args(argv)
+    unknown = [s for s in args.stages if s not in STAGES]
+    if unknown:
+        ap.error(f"unknown stage(s): {', '.join(unknown)}; choose from {', '.join(STAGES)}")
+    stages = [s for s in STAGES if s in args.stages] or list(DEFAULT_STAGES)
+    unknown = [b for b in args.bank or [] if b not in bank_roster()]
+    if unknown:
+        ap.error(f"unknown bank(s): {', '.join(unknown)}; see list_of_banks or run --all-banks once")
+
+    banks = parsed = None
+    failed, missing = [], []
+    if "scrape" in stages:
+        banks, failed, missing = scrape_stage(args.bank, resume=args.resume, all_banks=args.all_banks)
+    if "parse" in stages:
+        parsed = parse_stage(banks)
+    if "render" in stages and missing:
+        # a cancel or a refresh must not replace the full workbook with a few columns
+        print(f"[FAIL] Not rendering {args.output} from {len(banks)} banks: no dump for "
+              f"{', '.join(missing)}; run once without --bank and let it finish")
+        return 1
+    if "render" in stages:
+        try:
+            render_stage(parsed, args.output, force=args.force_render)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"[FAIL] No parsed values to render ({e}); run the parse stage first")
+            return 1
+    if "history" in stages:
+        write_history_workbook(args.history_output, args.history_layout)
+    return 1 if failed else 0
+
+# guarded so parse-stage worker processes (spawn/forkserver re-import this
+# module) do not start a run of their own
 if __name__ == "__main__":
-    _fill_excel_from_dumps("Benchmark_Results.xlsx")
+    sys.exit(main())
@@ -1,11 +1,18 @@
 # run_benchmark_gui.py
 # Minimal Tkinter GUI that runs your original run_benchmark.py and shows progress.
+# The script runs with PROGRESS=1: its "@progress {json}" lines drive the bar,
+# everything else goes to the log, which is rendered once per tick and capped.
+# Cancel asks the script to stop scraping and fill the banks it already has.
 
-import sys, os, threading, queue, subprocess, re, time
+import sys, os, threading, queue, subprocess, json
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox
 
-BANK_COUNT = 9  # number of banks your script processes
+BANK_COUNT = 9  # until the script's run_started event reports the real count
+TICK_MS = 100
+TICK_MAX_ITEMS = 5000    # output handled per tick; the rest waits for the next one
+LOG_MAX_LINES = 5000     # oldest log lines are dropped beyond this
+PROGRESS_PREFIX = "@progress "  # run_benchmark.PROGRESS_PREFIX
 
 class App(tk.Tk):
     def __init__(self):
@@ -13,8 +20,14 @@ class App(tk.Tk):
         self.title("Bank Benchmark")
         self.geometry("840x520")
 
-        self.start_btn = ttk.Button(self, text="Start", command=self.start)
-        self.start_btn.pack(pady=8)
+        buttons = ttk.Frame(self)
+        buttons.pack(pady=8)
+        self.start_btn = ttk.Button(buttons, text="Start", command=self.start)
+        self.start_btn.pack(side="left", padx=4)
+        self.cancel_btn = ttk.Button(buttons, text="Cancel", command=self.cancel, state="disabled")
+        self.cancel_btn.pack(side="left", padx=4)
+        self.all_banks = tk.BooleanVar(value=False)
+        ttk.Checkbutton(buttons, text="All banks on the site", variable=self.all_banks).pack(side="left", padx=12)
 
         self.progress = ttk.Progressbar(self, orient="horizontal", mode="determinate", maximum=BANK_COUNT)
         self.progress.pack(fill="x", padx=10)
@@ -27,62 +40,145 @@ class App(tk.Tk):
 
         self.q = queue.Queue()
         self.proc = None
-        self.done_banks = 0
+        self.cancelling = False
+        self.finished = False
+        self.scraped = {}   # bank -> fraction of its tabs done
 
-        self.after(100, self._drain_queue)
+        self.after(TICK_MS, self._drain_queue)
 
     def _append(self, text):
         self.log.configure(state="normal")
         self.log.insert("end", text)
+        excess = int(self.log.index("end-1c").split(".")[0]) - LOG_MAX_LINES
+        if excess > 0:
+            self.log.delete("1.0", f"{excess + 1}.0")
         self.log.see("end")
         self.log.configure(state="disabled")
 
-    def _reader(self, cmd):
+    def _reader(self, proc):
         try:
-            self.proc = subprocess.Popen(
-                cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
-                text=True, bufsize=1
-            )
-            for line in self.proc.stdout:
-                self.q.put(line)
-            self.proc.wait()
-            self.q.put(f"\n[EXIT] Process finished with code {self.proc.returncode}\n")
+            for line in proc.stdout:
+                if line.startswith(PROGRESS_PREFIX):
+                    try:
+                        self.q.put(("event", json.loads(line[len(PROGRESS_PREFIX):])))
+                        continue
+                    except ValueError:
+                        pass
+                self.q.put(("line", line))
+            proc.wait()
+            self.q.put(("exit", proc.returncode))
         except Exception as e:
-            self.q.put(f"\n[ERROR] {e}\n")
+            self.q.put(("line", f"\n[ERROR] {e}\n"))
+            self.q.put(("exit", None))
 
     def start(self):
         if self.proc and self.proc.poll() is None:
             return
-        self.done_banks = 0
-        self.progress['value'] = 0
+        self.cancelling = self.finished = False
+        self.scraped = {}
+        self.progress.configure(maximum=BANK_COUNT, value=0)
         self.log.configure(state="normal")
         self.log.delete("1.0","end")
         self.log.configure(state="disabled")
         self.status.config(text="Running...")
         self.start_btn.config(state="disabled")
+        self.cancel_btn.config(state="normal", text="Cancel")
 
-        # run the original script unchanged
+        # run the original script, with the progress channel switched on
         cmd = [sys.executable, os.path.join(os.path.dirname(__file__), "run_benchmark.py")]
-        threading.Thread(target=self._reader, args=(cmd,), daemon=True).start()
+        if self.all_banks.get():
+            cmd.append("--all-banks")
+        env = dict(os.environ, PROGRESS="1", PYTHONUNBUFFERED="1", PYTHONIOENCODING="utf-8")
+        try:
+            self.proc = subprocess.Popen(
+                cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                text=True, encoding="utf-8", errors="replace", bufsize=1, env=env
+            )
+        except OSError as e:
+            messagebox.showerror("Bank Benchmark", f"Could not start run_benchmark.py:\n{e}")
+            self._finish(None)
+            return
+        threading.Thread(target=self._reader, args=(self.proc,), daemon=True).start()
+
+    def cancel(self):
+        if not self.proc or self.proc.poll() is not None:
+            return
+        if self.cancelling:
+            # second click: the script did not stop by itself
+            self.proc.terminate()
+            return
+        self.cancelling = True
+        try:
+            self.proc.stdin.write("cancel\n")
+            self.proc.stdin.flush()
+        except OSError:
+            self.proc.terminate()
+        self.cancel_btn.config(text="Force stop")
+        self.status.config(text="Cancelling: keeping the banks already scraped...")
+
+    def _on_event(self, ev):
+        kind, bank = ev.get("event"), ev.get("bank", "")
+        if kind == "run_started":
+            self.progress.configure(maximum=max(1, len(ev.get("banks", []))))
+            self.status.config(text="Scraping...")
+        elif kind == "bank_started":
+            self.scraped[bank] = 0.0
+            self.status.config(text=f"Scraping {bank}...")
+        elif kind == "tab_done":
+            self.scraped[bank] = ev["i"] / max(1, ev["n"])
+            self.status.config(text=f"Scraping {bank}: tab {ev['i']}/{ev['n']}")
+        elif kind == "bank_scraped":
+            self.scraped[bank] = 1.0
+        elif kind == "bank_failed":
+            self.scraped[bank] = 0.0
+            what = "giving up" if ev.get("final") else "retrying"
+            self.status.config(text=f"{bank} failed (attempt {ev.get('attempt')}), {what}...")
+        elif kind == "cancelled":
+            # unfinished banks keep their last dump in the workbook; the bar counts what was scraped
+            self.scraped = {b: 1.0 for b in ev.get("finished", [])}
+            self.status.config(text=f"Cancelled after {len(self.scraped)} banks; "
+                                    f"the others keep their last scrape...")
+        elif kind == "bank_parsed":
+            self.status.config(text=f"Filled {bank} ({ev.get('filled', 0)} fields)")
+        elif kind == "done":
+            self.finished = True
+            if ev.get("unchanged"):
+                self.status.config(text="Done. The workbook would be unchanged; left as it was.")
+            else:
+                self.status.config(text=f"Done. See {ev.get('output', 'Benchmark_Results.xlsx')}")
+        self.progress["value"] = sum(self.scraped.values())
+
+    def _finish(self, code):
+        if not self.finished:
+            if self.cancelling:
+                self.status.config(text=f"Stopped (exit code {code}).")
+            else:
+                self.status.config(text=f"Failed (exit code {code}). See the log.")
+        self.start_btn.config(state="normal")
+        self.cancel_btn.config(state="disabled", text="Cancel")
 
     def _drain_queue(self):
+        # collect a whole tick's output and render it with one insert
+        lines, exit_code, exited = [], None, False
         try:
-            while True:
-                line = self.q.get_nowait()
-                self._append(line)
-
-                # advance on markers your script already prints
-                if line.startswith("[OK] Filled column"):
-                    self.done_banks = min(BANK_COUNT, self.done_banks + 1)
-                    self.progress['value'] = self.done_banks
-                if line.startswith("[DONE]"):
-                    self.status.config(text="Done. See Benchmark_Results.xlsx")
-                    self.start_btn.config(state="normal")
+            for _ in range(TICK_MAX_ITEMS):
+                kind, item = self.q.get_nowait()
+                if kind == "line":
+                    lines.append(item)
+                elif kind == "event":
+                    self._on_event(item)
+                else:
+                    exited, exit_code = True, item
         except queue.Empty:
             pass
-        self.after(100, self._drain_queue)
+        if exited:
+            lines.append(f"\n[EXIT] Process finished with code {exit_code}\n")
+        if lines:
+            self._append("".join(lines[-LOG_MAX_LINES:]))
+        if exited:
+            self._finish(exit_code)
+        self.after(TICK_MS, self._drain_queue)
 
 if __name__ == "__main__":
     app = App()
     app.mainloop()
-
@@ -0,0 +1,181 @@
+# scrape_daemon.py
+# Keeps one warm Chromium with SCRAPE_WORKERS pages already loaded on
+# run_benchmark.URL and scrapes on request, so refreshing one bank costs its
+# tabs instead of a browser launch, a context and a landing page load.
+#
+#   python scrape_daemon.py                                   # 127.0.0.1:8766
+#   DAEMON_URL=http://127.0.0.1:8766 python run_benchmark.py --bank "Akbank T.A.Ş."
+#   curl -s http://127.0.0.1:8766/status
+#   curl -s http://127.0.0.1:8766/banks                        # every bank #bankList offers
+#
+# POST /scrape {"banks": [...]} (every bank if omitted) runs one job at a time
+# and answers {"ms", "finished", "banks": {bank: manifest entry}, "dumps": {bank: text}}.
+# Playwright's Python API cannot launch a browser server for others to
+# connect() to, so the daemon owns the browser and clients talk HTTP.
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import run_benchmark as rb
+
+DAEMON_PORT = int(os.environ.get("DAEMON_PORT", "8766"))
+# Idle pages are reloaded this often so a job never starts on a stale session
+REFRESH_S = float(os.environ.get("DAEMON_REFRESH_S", "600"))
+
+class Daemon:
+    def __init__(self, workers=rb.SCRAPE_WORKERS):
+        self.workers = rb._worker_count(workers)
+        self.pool = []      # run_benchmark._open_worker_page() tuples, loaded on URL
+        self.jobs = 0
+        self.started = time.time()
+        self.lock = None
+        self.browser = None
+        self.roster = rb.bank_roster()
+
+    async def start(self):
+        from playwright.async_api import async_playwright
+        self.lock = asyncio.Lock()
+        self._pw = await async_playwright().start()
+        self.resource_filter = rb._ResourceFilter() if rb.BLOCK_RESOURCES else None
+        await self._launch()
+
+    async def _launch(self):
+        self.browser = await self._pw.chromium.launch(headless=True, args=rb.BROWSER_ARGS)
+        self.pool = []
+        await self._warm()
+
+    async def _warm(self):
+        while len(self.pool) < self.workers:
+            self.pool.append(await rb._open_worker_page(self.browser, self.resource_filter))
+
+    async def _rewarm(self):
+        """Top the pool back up after a job, without holding up its response."""
+        async with self.lock:
+            try:
+                await self._warm()
+            except Exception as e:
+                print(f"[WARN] Could not reopen a page: {type(e).__name__}: {e}")
+
+    async def banks(self):
+        """Read #bankList from a warm page; scrape() then accepts any of them."""
+        async with self.lock:
+            await self._warm()
+            found = await rb._bank_options(self.pool[0][1])
+            self.roster = list(dict.fromkeys(self.roster + found))
+            return found
+
+    async def scrape(self, banks):
+        async with self.lock:
+            if not self.browser.is_connected():
+                print("[WARN] Browser gone; relaunching")
+                await self._launch()
+            t0 = time.perf_counter()
+            manifest = rb._Manifest(path="")
+            finished = await rb.scrape_with(self.browser, banks, self.workers, manifest=manifest,
+                                            resource_filter=self.resource_filter, pool=self.pool)
+            dumps = {b: rb._read_dump(f"fees_{rb.safe_name(b)}.txt") for b in finished}
+            ms = (time.perf_counter() - t0) * 1000
+            self.jobs += 1
+        print(f"[OK] Job {self.jobs}: {len(finished)}/{len(banks)} banks in {ms / 1000:.1f} s")
+        asyncio.create_task(self._rewarm())
+        return {"ms": round(ms), "finished": finished, "banks": manifest.banks, "dumps": dumps}
+
+    async def refresh_forever(self):
+        while True:
+            await asyncio.sleep(REFRESH_S)
+            async with self.lock:
+                for _, page, ready, _ in self.pool:
+                    try:
+                        await page.goto(rb.URL, wait_until="load")
+                        await ready.settle("goto")
+                    except Exception as e:
+                        print(f"[WARN] Refresh failed: {type(e).__name__}: {e}")
+
+    def status(self):
+        return {"url": rb.URL, "warm_pages": len(self.pool), "jobs": self.jobs,
+                "up_s": round(time.time() - self.started), "banks": self.roster}
+
+    async def close(self):
+        for context, *_ in self.pool:
+            await context.close()
+        if self.browser:
+            await self.browser.close()
+        await self._pw.stop()
+
+def make_server(daemon, loop, host="127.0.0.1", port=DAEMON_PORT):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, obj):
+            data = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == "/status":
+                return self._send(200, daemon.status())
+            if self.path == "/banks":
+                try:
+                    return self._send(200, asyncio.run_coroutine_threadsafe(daemon.banks(), loop).result())
+                except Exception as e:
+                    return self._send(500, {"error": f"{type(e).__name__}: {e}"})
+            self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != "/scrape":
+                return self._send(404, {"error": "not found"})
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            except ValueError:
+                return self._send(400, {"error": "body is not JSON"})
+            banks = body.get("banks") or rb.list_of_banks
+            unknown = [b for b in banks if b not in daemon.roster]
+            if unknown:
+                return self._send(400, {"error": f"unknown banks: {', '.join(unknown)}"})
+            try:
+                self._send(200, asyncio.run_coroutine_threadsafe(daemon.scrape(banks), loop).result())
+            except Exception as e:
+                self._send(500, {"error": f"{type(e).__name__}: {e}"})
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Warm browser that scrapes the fee site on request")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=DAEMON_PORT)
+    ap.add_argument("--workers", type=int, default=rb.SCRAPE_WORKERS, help="pages kept warm = parallel banks")
+    args = ap.parse_args(argv)
+
+    async def serve():
+        daemon = Daemon(args.workers)
+        await daemon.start()
+        server = make_server(daemon, asyncio.get_running_loop(), args.host, args.port)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        print(f"[OK] {len(daemon.pool)} warm pages on {rb.URL}")
+        print(f"     DAEMON_URL=http://{args.host}:{args.port} python run_benchmark.py")
+        try:
+            await daemon.refresh_forever()
+        finally:
+            server.shutdown()
+            await daemon.close()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
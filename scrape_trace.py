@@ -0,0 +1,117 @@
+# scrape_trace.py
+# Reads the JSONL span trace run_benchmark.py appends to TRACE_FILE (one line
+# per timed scrape step: goto, select_option, tab_click, settle.<step>,
+# wait_pane_ready, expand_collapses, select_handling, extract_js / inner_html,
+# bs4_parse, write_dump, ...) and aggregates it.
+#
+#   python scrape_trace.py summary                   # per-step percentiles over every run
+#   python scrape_trace.py summary --runs 5 --by bank,step
+#   python scrape_trace.py summary --step settle.    # only steps starting with "settle."
+#   python scrape_trace.py runs                      # one line per run, oldest first
+
+import argparse
+import json
+import math
+import os
+import sys
+from datetime import datetime
+
+TRACE_FILE = os.environ.get("TRACE_FILE", "scrape_trace.jsonl")
+GROUP_KEYS = ("step", "bank", "tab", "run")
+
+def read_trace(path):
+    events = []
+    with open(path, encoding="utf-8") as f:
+        for n, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                print(f"[WARN] {path}:{n}: not JSON, skipped")
+    return events
+
+def run_order(events):
+    """Run ids, oldest first."""
+    first = {}
+    for ev in events:
+        first[ev["run"]] = min(first.get(ev["run"], math.inf), ev["start"])
+    return sorted(first, key=first.get)
+
+def percentile(sorted_ms, q):
+    # nearest rank, so every reported value is one that was measured
+    return sorted_ms[max(0, math.ceil(q / 100 * len(sorted_ms)) - 1)]
+
+def summary(events, by=("step",)):
+    groups = {}
+    for ev in events:
+        groups.setdefault(tuple(ev.get(k) for k in by), []).append(ev)
+    rows = []
+    for key, evs in groups.items():
+        ms = sorted(ev["ms"] for ev in evs)
+        rows.append({
+            "key": key, "n": len(ms), "failed": sum(1 for ev in evs if not ev.get("ok", True)),
+            "total": sum(ms), "p50": percentile(ms, 50), "p90": percentile(ms, 90),
+            "p99": percentile(ms, 99), "max": ms[-1],
+        })
+    rows.sort(key=lambda r: r["total"], reverse=True)
+    return rows
+
+def _cmd_summary(events, args):
+    by = tuple(k.strip() for k in args.by.split(",") if k.strip())
+    for k in by:
+        if k not in GROUP_KEYS:
+            sys.exit(f"[FAIL] --by: unknown key {k!r}; choose from {', '.join(GROUP_KEYS)}")
+    if args.step:
+        events = [ev for ev in events if ev["step"].startswith(args.step)]
+    rows = summary(events, by)
+    if not rows:
+        print("[WARN] No matching spans")
+        return
+    label = " / ".join(by)
+    print(f"{label[:48]:48}{'n':>7}{'fail':>6}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}{'total s':>10}")
+    for r in rows:
+        name = " / ".join("-" if v is None else str(v) for v in r["key"])
+        print(f"{name[:48]:48}{r['n']:7}{r['failed']:6}{r['p50']:10.0f}{r['p90']:10.0f}"
+              f"{r['p99']:10.0f}{r['max']:10.0f}{r['total'] / 1000:10.1f}")
+
+def _cmd_runs(events, args):
+    by_run = {}
+    for ev in events:
+        by_run.setdefault(ev["run"], []).append(ev)
+    print(f"{'run':28}{'started':>21}{'banks':>7}{'spans':>7}{'fail':>6}{'wall s':>9}{'bank p90 s':>12}")
+    for run in run_order(events):
+        evs = by_run[run]
+        start = min(ev["start"] for ev in evs)
+        wall = max(ev["start"] + ev["ms"] / 1000 for ev in evs) - start
+        banks = sorted(ev["ms"] for ev in evs if ev["step"] == "scrape_bank")
+        p90 = f"{percentile(banks, 90) / 1000:12.1f}" if banks else f"{'-':>12}"
+        print(f"{run[:28]:28}{datetime.fromtimestamp(start).strftime('%Y-%m-%d %H:%M:%S'):>21}"
+              f"{len(banks):7}{len(evs):7}{sum(1 for ev in evs if not ev.get('ok', True)):6}{wall:9.1f}{p90}")
+
+def main(argv=None):
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--trace", default=TRACE_FILE, help="JSONL trace file (default: TRACE_FILE)")
+    common.add_argument("--runs", type=int, default=0, help="only the last N runs (0 = all)")
+    ap = argparse.ArgumentParser(description="Aggregate the scrape span trace")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    s = sub.add_parser("summary", parents=[common], help="per-stage percentiles across runs")
+    s.add_argument("--by", default="step", help=f"comma-separated grouping from {', '.join(GROUP_KEYS)}")
+    s.add_argument("--step", default="", help="only steps starting with this prefix")
+    sub.add_parser("runs", parents=[common], help="one line per run")
+    args = ap.parse_args(argv)
+
+    try:
+        events = read_trace(args.trace)
+    except OSError as e:
+        print(f"[FAIL] Cannot read trace: {e}")
+        return 1
+    if args.runs > 0:
+        keep = set(run_order(events)[-args.runs:])
+        events = [ev for ev in events if ev["run"] in keep]
+    print(f"[OK] {len(events)} spans from {len(set(ev['run'] for ev in events))} runs in {args.trace}")
+    {"summary": _cmd_summary, "runs": _cmd_runs}[args.cmd](events, args)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())